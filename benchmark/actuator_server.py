@@ -0,0 +1,214 @@
+# This file is part of WADAS project.
+#
+# WADAS is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# WADAS is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with WADAS. If not, see <https://www.gnu.org/licenses/>.
+#
+# Author(s): Stefano Dell'Osa, Alessandro Palla, Cesare Di Mauro, Antonio Farina
+# Date: 2026-10-18
+# Description: Benchmark of command delivery to many actuators polling the actuator server.
+
+import argparse
+import logging
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+
+import requests
+import urllib3
+import uvicorn
+from OpenSSL import crypto
+
+from wadas.domain.actuator import Actuator
+from wadas.domain.actuator_server_app import app, metrics
+from wadas.domain.roadsign_actuator import RoadSignActuator
+
+
+def generate_certificate(directory):
+    """Generate a self-signed certificate, returning certificate and key paths"""
+
+    key = crypto.PKey()
+    key.generate_key(crypto.TYPE_RSA, 2048)
+    cert = crypto.X509()
+    cert.get_subject().CN = "localhost"
+    cert.set_serial_number(0)
+    cert.gmtime_adj_notBefore(0)
+    cert.gmtime_adj_notAfter(24 * 60 * 60)
+    cert.set_issuer(cert.get_subject())
+    cert.set_pubkey(key)
+    cert.sign(key, "sha256")
+
+    cert_path, key_path = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(crypto.dump_certificate(crypto.FILETYPE_PEM, cert))
+    with open(key_path, "wb") as f:
+        f.write(crypto.dump_privatekey(crypto.FILETYPE_PEM, key))
+    return cert_path, key_path
+
+
+def start_server(port, cert_path=None, key_path=None):
+    """Start the actuator server app in a thread, returning the server and its thread id"""
+
+    config = uvicorn.Config(
+        app=app,
+        host="127.0.0.1",
+        port=port,
+        ssl_certfile=cert_path,
+        ssl_keyfile=key_path,
+        log_level="warning",
+        timeout_graceful_shutdown=1,
+    )
+    server = uvicorn.Server(config)
+    thread_ids = []
+
+    def run():
+        thread_ids.append(threading.get_ident())
+        server.run()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, thread_ids[0]
+
+
+def actuator_client(url, wait, poll_interval, stop, sent_times, latencies):
+    """Poll an actuator endpoint until stop is set, measuring command delivery latency"""
+
+    session = requests.Session()
+    params = {"wait": wait} if wait else {}
+    while not stop.is_set():
+        try:
+            response = session.get(url, params=params, verify=False, timeout=wait + 10)
+        except requests.RequestException:
+            if stop.is_set():
+                break
+            raise
+        if stop.is_set():
+            break
+        if response.json().get("cmd", True) is not None:
+            latencies.append(time.monotonic() - sent_times.popleft())
+        if not wait:
+            stop.wait(poll_interval)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(fraction * len(values)), len(values) - 1)] if values else float("nan")
+
+
+def main(num_actuators, duration, poll_interval, wait, command_rate, tls, port):
+    logging.getLogger("wadas").setLevel(logging.WARNING)
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+    Actuator.actuators = {
+        f"roadsign_{idx}": RoadSignActuator(f"roadsign_{idx}", True) for idx in range(num_actuators)
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        cert_path, key_path = generate_certificate(directory) if tls else (None, None)
+        server, server_thread, server_thread_id = start_server(port, cert_path, key_path)
+        base_url = f"{'https' if tls else 'http'}://127.0.0.1:{port}/api/v1/actuators"
+
+        stop = threading.Event()
+        sent_times = defaultdict(deque)
+        latencies = []
+        clients = [
+            threading.Thread(
+                target=actuator_client,
+                args=(
+                    f"{base_url}/{actuator_id}",
+                    wait,
+                    poll_interval,
+                    stop,
+                    sent_times[actuator_id],
+                    latencies,
+                ),
+                daemon=True,
+            )
+            for actuator_id in Actuator.actuators
+        ]
+        for client in clients:
+            client.start()
+
+        # Detection events send commands to random actuators while they are polling
+        metrics.reset()
+        server_clock = time.pthread_getcpuclockid(server_thread_id)
+        start_cpu_time, start = time.clock_gettime(server_clock), time.monotonic()
+        rng = random.Random(0)
+        while (elapsed := time.monotonic() - start) < duration:
+            actuator_id = rng.choice(list(Actuator.actuators))
+            sent_times[actuator_id].append(time.monotonic())
+            Actuator.actuators[actuator_id].send_command(RoadSignActuator.Commands.DISPLAY_ON)
+            time.sleep(rng.expovariate(command_rate))
+        server_cpu_time = time.clock_gettime(server_clock) - start_cpu_time
+        stats = metrics.get_stats()
+
+        # Release pending long polls before shutting the server down
+        stop.set()
+        for actuator in Actuator.actuators.values():
+            for listener in list(actuator.command_listeners):
+                listener()
+        for client in clients:
+            client.join()
+        server.should_exit = True
+        server_thread.join()
+
+    mode = f"long polling, wait {wait} s" if wait else f"polling every {poll_interval} s"
+    print(
+        f"Actuators: {num_actuators}, {mode}, TLS: {'on' if tls else 'off'},"
+        f" commands: {command_rate}/s, duration: {elapsed:.1f} s"
+    )
+    print(f"Requests: {stats['requests'] / elapsed:.1f}/s, commands delivered: {len(latencies)}")
+    if latencies:
+        print(
+            f"Delivery latency: p50 {percentile(latencies, 0.5) * 1000:.1f} ms,"
+            f" p99 {percentile(latencies, 0.99) * 1000:.1f} ms,"
+            f" mean {statistics.mean(latencies) * 1000:.1f} ms"
+        )
+    if stats["requests"]:
+        print(
+            f"Server CPU per request: {server_cpu_time / stats['requests'] * 1000:.3f} ms"
+            f" (handler only {stats['handler_cpu_time_per_request'] * 1000:.3f} ms),"
+            f" server CPU load {server_cpu_time / elapsed * 100:.1f}%"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--actuators", type=int, default=200, help="Number of actuators")
+    parser.add_argument("--duration", type=float, default=20, help="Benchmark duration, seconds")
+    parser.add_argument(
+        "--poll-interval", type=float, default=1, help="Seconds between polls of each actuator"
+    )
+    parser.add_argument(
+        "--wait", type=float, default=0, help="Long polling wait in seconds, 0 to poll"
+    )
+    parser.add_argument(
+        "--commands", type=float, default=5, help="Commands sent per second to random actuators"
+    )
+    parser.add_argument("--tls", action="store_true", help="Serve actuators over HTTPS")
+    parser.add_argument("--port", type=int, default=8444, help="Actuator server port")
+    args = parser.parse_args()
+
+    main(
+        args.actuators,
+        args.duration,
+        args.poll_interval,
+        args.wait,
+        args.commands,
+        args.tls,
+        args.port,
+    )
@@ -0,0 +1,105 @@
+# This file is part of WADAS project.
+#
+# WADAS is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# WADAS is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with WADAS. If not, see <https://www.gnu.org/licenses/>.
+#
+# Author(s): Stefano Dell'Osa, Alessandro Palla, Cesare Di Mauro, Antonio Farina
+# Date: 2026-10-18
+# Description: Benchmark of the classifier crops preprocessing, per crop vs batched, with PIL
+# or OpenCV resizing.
+
+import argparse
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+
+from wadas.ai.models import Classifier
+
+
+def random_boxes(rng, width, height, num_boxes, min_size, max_size):
+    """Generate random xyxy boxes fully contained in the image"""
+    sizes = rng.uniform(min_size, max_size, (num_boxes, 2))
+    x0 = rng.uniform(0, width - sizes[:, 0])
+    y0 = rng.uniform(0, height - sizes[:, 1])
+    return np.stack([x0, y0, x0 + sizes[:, 0], y0 + sizes[:, 1]], axis=1).astype(np.float32)
+
+
+def timeit(fn, iterations):
+    """Return the average execution time of fn, in seconds"""
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def main(image_path, num_boxes, min_size, max_size, iterations, device):
+    rng = np.random.default_rng(0)
+    if image_path:
+        img = Image.open(image_path).convert("RGB")
+    else:
+        # Smooth random image, as camera images are, upscaled from a low resolution noise
+        img = Image.fromarray(rng.integers(0, 256, (54, 96, 3), dtype=np.uint8)).resize(
+            (1920, 1080), Image.BICUBIC
+        )
+    boxes = random_boxes(rng, img.width, img.height, num_boxes, min_size, max_size)
+
+    classifier = Classifier(device)
+
+    def per_crop():
+        return torch.concatenate(
+            [classifier.preprocessImage(img.crop(xyxy)) for xyxy in boxes], axis=0
+        )
+
+    def batched():
+        return classifier.preprocessCrops(img, boxes)
+
+    def fast_batched():
+        classifier.fast_preprocessing = True
+        try:
+            return classifier.preprocessCrops(img, boxes)
+        finally:
+            classifier.fast_preprocessing = False
+
+    max_diff = (per_crop() - batched()).abs().max().item()
+    fast_diff = (per_crop() - fast_batched()).abs()
+    before = timeit(per_crop, iterations)
+    after = timeit(batched, iterations)
+    fast = timeit(fast_batched, iterations)
+    inference = timeit(lambda: classifier.predictOnBatch(batched()), iterations)
+
+    print(f"Image: {img.width}x{img.height}, crops: {num_boxes}, iterations: {iterations}")
+    print(f"Per crop preprocessing: {before / num_boxes * 1000:.3f} ms/crop")
+    print(f"Batched preprocessing:  {after / num_boxes * 1000:.3f} ms/crop")
+    print(f"Speedup: {before / after:.2f}x, max abs difference: {max_diff:.2e}")
+    print(f"Batched OpenCV preprocessing: {fast / num_boxes * 1000:.3f} ms/crop")
+    print(
+        f"Speedup: {before / fast:.2f}x, max abs difference: {fast_diff.max().item():.2e},"
+        f" mean abs difference: {fast_diff.mean().item():.2e}"
+    )
+    print(f"Classification (incl. batched preprocessing): {inference * 1000:.3f} ms/batch")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--image", type=str, default=None, help="Image path (default: random)")
+    parser.add_argument("--boxes", type=int, default=8, help="Number of crops per image")
+    parser.add_argument("--min-size", type=int, default=60, help="Minimum crop side in pixels")
+    parser.add_argument("--max-size", type=int, default=400, help="Maximum crop side in pixels")
+    parser.add_argument("--iterations", type=int, default=50, help="Timed iterations")
+    parser.add_argument("--device", type=str, default="CPU", help="Classifier device")
+    args = parser.parse_args()
+
+    main(args.image, args.boxes, args.min_size, args.max_size, args.iterations, args.device)
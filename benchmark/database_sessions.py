@@ -0,0 +1,173 @@
+# This file is part of WADAS project.
+#
+# WADAS is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# WADAS is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with WADAS. If not, see <https://www.gnu.org/licenses/>.
+#
+# Author(s): Stefano Dell'Osa, Alessandro Palla, Cesare Di Mauro, Antonio Farina
+# Date: 2026-10-18
+# Description: Benchmark of the database round-trips needed to persist a detection event.
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+from collections import Counter
+from unittest.mock import patch
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from wadas.domain.actuation_event import ActuationEvent
+from wadas.domain.database import DataBase
+from wadas.domain.db_writer import DBWriter
+from wadas.domain.detection_event import DetectionEvent
+from wadas.domain.ftp_camera import FTPCamera
+from wadas.domain.roadsign_actuator import RoadSignActuator
+from wadas.domain.utils import get_precise_timestamp
+
+
+def legacy_create_session(retry_count=0):
+    """Session creation before pooled sessions: a new session factory and a connection
+    check for each session"""
+
+    engine = DataBase.get_engine()
+    with engine.connect():
+        pass
+    return sessionmaker(bind=engine)()
+
+
+def count_round_trips(engine, counter, latency):
+    """Count the operations that cost a round-trip to a MySQL or MariaDB server, simulating
+    latency seconds for each of them.
+    Each pool checkout costs a ping as pool_pre_ping is enabled for server databases, and each
+    connection returned to the pool is reset with a rollback."""
+
+    def round_trip(kind):
+        def listener(*args, **kwargs):
+            counter.update([kind])
+            time.sleep(latency)
+
+        return listener
+
+    listeners = [
+        (engine, "before_cursor_execute", round_trip("statements")),
+        (engine, "commit", round_trip("commits")),
+        (engine.pool, "checkout", round_trip("checkouts")),
+        (engine.pool, "reset", round_trip("resets")),
+    ]
+    for listener in listeners:
+        event.listen(*listener)
+    return listeners
+
+
+def persist_events(num_events, classified_animals, mode):
+    """Persist detection events with an actuation event each, returning the time per event
+    spent by the caller.
+    Events are stored either with an insert of the detection event, an update with its
+    classification and an insert of the actuation event, or in one transaction, or by the
+    write-behind db writer."""
+
+    db = DataBase.get_instance()
+    db_writer = DBWriter()
+    if mode == "write_behind":
+        db_writer.start()
+    start = time.perf_counter()
+    for idx in range(num_events):
+        detection_event = DetectionEvent(
+            "camera",
+            get_precise_timestamp(),
+            f"image_{idx}.jpg",
+            f"detection_{idx}.jpg",
+            {},
+            True,
+            f"classification_{idx}.jpg",
+            [{"classification": ("chamois", 0.9)}] * classified_animals,
+        )
+        actuation_event = ActuationEvent(
+            "roadsign",
+            get_precise_timestamp(),
+            detection_event,
+            RoadSignActuator.Commands.DISPLAY_ON,
+        )
+        if mode == "write_behind":
+            db_writer.put(db.detection_event_record(detection_event, True, [actuation_event]))
+        elif mode == "unit_of_work":
+            db.persist_detection_event(detection_event, True, [actuation_event])
+        else:
+            db.insert_into_db(detection_event)
+            db.update_detection_event(detection_event)
+            db.insert_into_db(actuation_event)
+    elapsed = time.perf_counter() - start
+    # Events still pending are flushed once processing is done
+    db_writer.stop()
+    return elapsed / num_events
+
+
+def run(description, num_events, classified_animals, mode, latency):
+    counter = Counter()
+    listeners = count_round_trips(DataBase.get_engine(), counter, latency)
+    if mode == "connection_check":
+        with patch.object(DataBase, "create_session", legacy_create_session):
+            elapsed = persist_events(num_events, classified_animals, mode)
+    else:
+        elapsed = persist_events(num_events, classified_animals, mode)
+    for listener in listeners:
+        event.remove(*listener)
+
+    per_event = {key: value / num_events for key, value in counter.items()}
+    round_trips = sum(per_event.values())
+    details = ", ".join(f"{key} {value:.1f}" for key, value in sorted(per_event.items()))
+    print(
+        f"{description}: {round_trips:.1f} round-trips per event ({details}),"
+        f" caller waits {elapsed * 1000:.2f} ms per event"
+    )
+
+
+def main(num_events, classified_animals, latency):
+    logging.getLogger("wadas").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directory:
+        DataBase.initialize(
+            DataBase.DBTypes.SQLITE, os.path.join(directory, "wadas.db"), None, "", "", log=False
+        )
+        DataBase.get_instance().create_database()
+        DataBase.insert_into_db(FTPCamera("camera", "ftp_folder"))
+        DataBase.insert_into_db(RoadSignActuator("roadsign", True))
+
+        print(
+            f"Detection events: {num_events}, classified animals: {classified_animals},"
+            f" simulated latency: {latency * 1000:.1f} ms per round-trip"
+        )
+        for description, mode in (
+            ("Connection check", "connection_check"),
+            ("Pooled sessions ", "pooled_sessions"),
+            ("Unit of work    ", "unit_of_work"),
+            ("Write-behind    ", "write_behind"),
+        ):
+            run(description, num_events, classified_animals, mode, latency)
+        DataBase.destroy_instance()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=200, help="Persisted detection events")
+    parser.add_argument(
+        "--animals", type=int, default=2, help="Classified animals per detection event"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0, help="Simulated db latency per round-trip, ms"
+    )
+    args = parser.parse_args()
+
+    main(args.events, args.animals, args.latency / 1000)
@@ -0,0 +1,183 @@
+# This file is part of WADAS project.
+#
+# WADAS is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# WADAS is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with WADAS. If not, see <https://www.gnu.org/licenses/>.
+#
+# Author(s): Stefano Dell'Osa, Alessandro Palla, Cesare Di Mauro, Antonio Farina
+# Date: 2026-10-18
+# Description: Benchmark of the web server detection events queries on a large database,
+# before and after the db schema upgrade adding the time and filter indexes.
+
+import argparse
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, update
+
+from wadas.domain.database import DataBase
+from wadas.domain.db_model import ActuationEvent as ORMActuationEvent
+from wadas.domain.db_model import ClassifiedAnimals as ORMClassifiedAnimals
+from wadas.domain.db_model import DBMetadata as ORMDBMetadata
+from wadas.domain.db_model import DetectionEvent as ORMDetectionEvent
+from wadas.domain.ftp_camera import FTPCamera
+from wadas.domain.roadsign_actuator import RoadSignActuator
+from wadas_webserver.database import Database
+from wadas_webserver.view_model import DetectionsRequest
+
+# Indexes added by the schema upgrade, missing in databases of previous versions
+UPGRADE_INDEXES = {
+    "ix_detection_events_time",
+    "ix_classified_animals_detection_event",
+    "ix_classified_animals_animal_detection_event",
+    "ix_actuation_events_detection_event",
+}
+ANIMALS = ["chamois", "red deer", "roe deer", "wild boar", "fox", "badger", "wolf", "bear"]
+START_DATE = datetime(2025, 1, 1)
+
+
+def create_previous_version_db(num_events, num_cameras, chunk_size=50000):
+    """Create a db of the previous WADAS version, without the upgrade indexes, with num_events
+    detection events spread over a year. Each event has one or two classified animals, and
+    one out of ten an actuation event."""
+
+    db = DataBase.get_instance()
+    db.create_database()
+    for camera_idx in range(num_cameras):
+        DataBase.insert_into_db(FTPCamera(f"camera_{camera_idx}", "ftp_folder"))
+    DataBase.insert_into_db(RoadSignActuator("roadsign", True))
+    DataBase.populate_db("BENCHMARK")
+
+    engine = DataBase.get_engine()
+    for table in (ORMDetectionEvent, ORMClassifiedAnimals, ORMActuationEvent):
+        for index in table.__table__.indexes:
+            if index.name in UPGRADE_INDEXES:
+                index.drop(engine)
+    DataBase.run_query(update(ORMDBMetadata).values(version="v0.8.3"))
+
+    rng = random.Random(0)
+    actuator_id = DataBase.get_actuator_id("roadsign")
+    step = timedelta(days=365) / num_events
+    with engine.begin() as conn:
+        for chunk_start in range(0, num_events, chunk_size):
+            detection_events, classified_animals, actuation_events = [], [], []
+            for idx in range(chunk_start + 1, min(chunk_start + chunk_size, num_events) + 1):
+                time_stamp = START_DATE + step * idx
+                detection_events.append(
+                    {
+                        "db_id": idx,
+                        "camera_id": rng.randint(1, num_cameras),
+                        "time_stamp": time_stamp,
+                        "original_image": f"image_{idx}.jpg",
+                        "detection_img_path": f"detection_{idx}.jpg",
+                        "detected_animals": 1,
+                        "classification": True,
+                        "classification_img_path": f"classification_{idx}.jpg",
+                    }
+                )
+                classified_animals.extend(
+                    {
+                        "detection_event_id": idx,
+                        "classified_animal": rng.choice(ANIMALS),
+                        "probability": rng.random(),
+                    }
+                    for _ in range(rng.randint(1, 2))
+                )
+                if idx % 10 == 0:
+                    actuation_events.append(
+                        {
+                            "actuator_id": actuator_id,
+                            "time_stamp": time_stamp,
+                            "detection_event_id": idx,
+                            "command": RoadSignActuator.Commands.DISPLAY_ON.value,
+                        }
+                    )
+            conn.execute(insert(ORMDetectionEvent), detection_events)
+            conn.execute(insert(ORMClassifiedAnimals), classified_animals)
+            conn.execute(insert(ORMActuationEvent), actuation_events)
+
+
+def timeit(fn, iterations):
+    """Return the median execution time of fn, in seconds"""
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def run_queries(webserver_db, iterations):
+    """Time the detection events page requested by the web server for different filters"""
+
+    last_week = START_DATE + timedelta(days=358)
+    filters = {
+        "No filter       ": DetectionsRequest(),
+        "Last week       ": DetectionsRequest(date_from=last_week),
+        "Camera          ": DetectionsRequest(camera_ids=[1]),
+        "Camera, week    ": DetectionsRequest(camera_ids=[1], date_from=last_week),
+        "Animal          ": DetectionsRequest(classified_animals=["wolf"]),
+        "Animal, week    ": DetectionsRequest(classified_animals=["wolf"], date_from=last_week),
+        "Page 100        ": DetectionsRequest(offset=2000),
+    }
+    for description, detection_filter in filters.items():
+        elapsed = timeit(
+            lambda request=detection_filter: webserver_db.get_detection_events_by_filter(request),
+            iterations,
+        )
+        count, _ = webserver_db.get_detection_events_by_filter(detection_filter)
+        print(f"  {description}: {elapsed * 1000:9.2f} ms ({count} events)")
+
+
+def main(num_events, num_cameras, iterations):
+    logging.getLogger("wadas").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directory:
+        DataBase.initialize(
+            DataBase.DBTypes.SQLITE, os.path.join(directory, "wadas.db"), None, "", "", log=False
+        )
+        start = time.perf_counter()
+        create_previous_version_db(num_events, num_cameras)
+        print(
+            f"Detection events: {num_events}, cameras: {num_cameras},"
+            f" db created in {time.perf_counter() - start:.1f} s"
+        )
+        webserver_db = Database(DataBase.get_instance().get_connection_string())
+
+        print(f"Db version {DataBase.get_db_version()}, median of {iterations} queries:")
+        run_queries(webserver_db, iterations)
+
+        start = time.perf_counter()
+        DataBase.upgrade_db()
+        print(
+            f"Db upgraded to version {DataBase.get_db_version()}"
+            f" in {time.perf_counter() - start:.1f} s, median of {iterations} queries:"
+        )
+        run_queries(webserver_db, iterations)
+
+        webserver_db.engine.dispose()
+        DataBase.destroy_instance()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=1000000, help="Stored detection events")
+    parser.add_argument("--cameras", type=int, default=20, help="Number of cameras")
+    parser.add_argument("--iterations", type=int, default=5, help="Timed iterations")
+    args = parser.parse_args()
+
+    main(args.events, args.cameras, args.iterations)
@@ -0,0 +1,105 @@
+# This file is part of WADAS project.
+#
+# WADAS is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# WADAS is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with WADAS. If not, see <https://www.gnu.org/licenses/>.
+#
+# Author(s): Stefano Dell'Osa, Alessandro Palla, Cesare Di Mauro, Antonio Farina
+# Date: 2026-10-18
+# Description: Benchmark of USB camera motion analysis cost per frame.
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from wadas.domain.motion_analyzer import MotionAnalyzer
+
+
+def read_clip(clip_path, num_frames):
+    """Return up to num_frames frames of a recorded clip"""
+
+    frames = []
+    video = cv2.VideoCapture(clip_path)
+    while len(frames) < num_frames:
+        success, frame = video.read()
+        if not success:
+            break
+        frames.append(frame)
+    video.release()
+    return frames
+
+
+def synthetic_clip(num_frames, width, height):
+    """Return frames of a noisy static scene crossed by a box"""
+
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 60, (height, width, 3), dtype=np.uint8)
+    size = height // 4
+    top, bottom = height // 2, height // 2 + size
+    frames = []
+    for idx in range(num_frames):
+        frame = background.copy()
+        x = idx * (width - size) // max(num_frames - 1, 1)
+        right = x + size
+        frame[top:bottom, x:right] = 200
+        frames.append(frame)
+    return frames
+
+
+def time_analysis(frames, analysis_width, grayscale):
+    """Return the average CPU and wall time of analyzing a frame, in seconds"""
+
+    analyzer = MotionAnalyzer(analysis_width=analysis_width, grayscale=grayscale)
+    start = time.perf_counter()
+    for frame in frames:
+        analyzer.analyze(frame)
+    elapsed = time.perf_counter() - start
+    return analyzer.get_stats()["average_cpu_time"], elapsed / len(frames)
+
+
+def main(clips, num_frames, analysis_widths):
+    if clips:
+        sources = {clip: read_clip(clip, num_frames) for clip in clips}
+    else:
+        sources = {"synthetic 3840x2160": synthetic_clip(num_frames, 3840, 2160)}
+
+    for name, frames in sources.items():
+        if not frames:
+            print(f"{name}: no frames read")
+            continue
+        height, width = frames[0].shape[:2]
+        print(f"{name}: {len(frames)} frames {width}x{height}")
+        configurations = [(0, False)] + [
+            (analysis_width, grayscale)
+            for analysis_width in analysis_widths
+            for grayscale in (False, True)
+        ]
+        for analysis_width, grayscale in configurations:
+            cpu_time, wall_time = time_analysis(frames, analysis_width, grayscale)
+            print(
+                f"  width {analysis_width or width:>5}, {'gray ' if grayscale else 'color'}:"
+                f" {cpu_time * 1000:8.2f} ms CPU, {wall_time * 1000:8.2f} ms wall per frame"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("clips", nargs="*", help="Recorded clips, a synthetic 4K clip if none")
+    parser.add_argument("--frames", type=int, default=100, help="Analyzed frames per clip")
+    parser.add_argument(
+        "--widths", type=int, nargs="+", default=[1280, 640, 320], help="Analysis widths"
+    )
+    args = parser.parse_args()
+
+    main(args.clips, args.frames, args.widths)
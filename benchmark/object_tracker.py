@@ -0,0 +1,95 @@
+# This file is part of WADAS project.
+#
+# WADAS is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# WADAS is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with WADAS. If not, see <https://www.gnu.org/licenses/>.
+#
+# Author(s): Stefano Dell'Osa, Alessandro Palla, Cesare Di Mauro, Antonio Farina
+# Date: 2026-10-18
+# Description: Microbenchmark of the object tracker on crowded scenes.
+
+import argparse
+import time
+
+import numpy as np
+
+from wadas.ai.object_tracker import ObjectTracker, compute_iou, compute_iou_matrix
+
+
+def herd_frames(rng, num_animals, num_classes, num_frames, width, height):
+    """Generate the detections of a herd moving across the frame, with some missed animals"""
+    sizes = rng.uniform(40, 160, (num_animals, 2))
+    positions = rng.uniform(0, 1, (num_animals, 2)) * ([width, height] - sizes)
+    speeds = rng.normal(0, 4, (num_animals, 2))
+
+    frames = []
+    for _ in range(num_frames):
+        positions = np.clip(positions + speeds, 0, [width, height] - sizes)
+        visible = rng.random(num_animals) > 0.1
+        frames.append(
+            [
+                {
+                    "xyxy": [int(v) for v in (*position, *(position + size))],
+                    "class_probs": {
+                        f"class_{idx}": prob
+                        for idx, prob in enumerate(rng.dirichlet(np.ones(num_classes)))
+                    },
+                }
+                for position, size, is_visible in zip(positions, sizes, visible)
+                if is_visible
+            ]
+        )
+    return frames
+
+
+def timeit(fn, iterations):
+    """Return the average execution time of fn, in seconds"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def main(num_animals, num_classes, num_frames, iterations):
+    rng = np.random.default_rng(0)
+    frames = herd_frames(rng, num_animals, num_classes, num_frames, 1920, 1080)
+
+    boxes1 = np.array([det["xyxy"] for det in frames[0]], dtype=np.float64)
+    boxes2 = np.array([det["xyxy"] for det in frames[1]], dtype=np.float64)
+    pairwise = timeit(lambda: [[compute_iou(b1, b2) for b2 in boxes2] for b1 in boxes1], iterations)
+    vectorised = timeit(lambda: compute_iou_matrix(boxes1, boxes2), iterations)
+
+    def track():
+        tracker = ObjectTracker(max_missed=10)
+        for detections in frames:
+            tracker.update(detections, (1080, 1920))
+
+    tracking = timeit(track, iterations)
+
+    print(
+        f"Animals: {num_animals}, classes: {num_classes}, frames: {num_frames},"
+        f" iterations: {iterations}"
+    )
+    print(f"IoU matrix {len(boxes1)}x{len(boxes2)}, pairwise loop: {pairwise * 1000:.3f} ms")
+    print(f"IoU matrix {len(boxes1)}x{len(boxes2)}, vectorised:    {vectorised * 1000:.3f} ms")
+    print(f"Tracker update: {tracking / num_frames * 1000:.3f} ms/frame")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--animals", type=int, default=40, help="Number of animals in the herd")
+    parser.add_argument("--classes", type=int, default=26, help="Number of animal classes")
+    parser.add_argument("--frames", type=int, default=100, help="Number of tracked frames")
+    parser.add_argument("--iterations", type=int, default=5, help="Timed iterations")
+    args = parser.parse_args()
+
+    main(args.animals, args.classes, args.frames, args.iterations)
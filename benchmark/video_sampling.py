@@ -0,0 +1,90 @@
+# This file is part of WADAS project.
+#
+# WADAS is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# WADAS is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with WADAS. If not, see <https://www.gnu.org/licenses/>.
+#
+# Author(s): Stefano Dell'Osa, Alessandro Palla, Cesare Di Mauro, Antonio Farina
+# Date: 2026-10-18
+# Description: Benchmark of the video frames sampling strategies.
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from wadas.domain.ai_model import AiModel
+
+
+def create_sample_video(output_path, width, height, fps, seconds):
+    """Write a synthetic clip with a moving square over a noisy background"""
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    video = cv2.VideoWriter(str(output_path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    for idx in range(fps * seconds):
+        frame = background.copy()
+        x = idx * 8 % (width - 100)
+        cv2.rectangle(frame, (x, height // 3), (x + 100, height // 3 + 100), (30, 200, 60), -1)
+        video.write(frame)
+    video.release()
+
+
+def main(video_path, video_fps, iterations):
+    AiModel.video_fps = video_fps
+    video = cv2.VideoCapture(str(video_path))
+    total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+    print(
+        f"Video: {video_path}, {total_frames} frames at {video.get(cv2.CAP_PROP_FPS):.2f} fps,"
+        f" sampled at {video_fps} fps"
+    )
+    video.release()
+
+    reference = None
+    for strategy in AiModel.VideoSamplingStrategies:
+        AiModel.video_sampling_strategy = strategy
+        start = time.perf_counter()
+        for _ in range(iterations):
+            frames = [
+                (np.asarray(frame), count) for frame, count in AiModel.get_video_frames(video_path)
+            ]
+        elapsed = (time.perf_counter() - start) / iterations
+
+        if reference is None:
+            reference = frames
+        identical = len(frames) == len(reference) and all(
+            count == ref_count and np.array_equal(frame, ref_frame)
+            for (frame, count), (ref_frame, ref_count) in zip(frames, reference)
+        )
+        print(
+            f"{strategy.value:>5}: {len(frames)} frames in {elapsed * 1000:.1f} ms,"
+            f" {len(frames) / elapsed:.1f} sampled frames/s,"
+            f" {total_frames / elapsed:.1f} video frames/s, same frames as read: {identical}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--video", type=str, default=None, help="Video path (default: synthetic)")
+    parser.add_argument("--video-fps", type=float, default=1, help="Sampling frame rate")
+    parser.add_argument("--iterations", type=int, default=3, help="Timed iterations")
+    args = parser.parse_args()
+
+    if args.video:
+        main(args.video, args.video_fps, args.iterations)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sample_path = Path(tmp_dir, "sample.mp4")
+            create_sample_video(sample_path, 1280, 720, 30, 20)
+            main(str(sample_path), args.video_fps, args.iterations)
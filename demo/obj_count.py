@@ -32,17 +32,8 @@ def main(video_path):
         classes=[0],  # count specific classes
     )
 
-    # Process video
-    frames = []
-    while cap.isOpened():
-        success, im0 = cap.read()
-
-        if not success:
-            break
-
-        frames.append(im0)
-
-    results = counter.process_frames(frames)
+    # Process video, streaming its frames
+    results = counter.process_video(video_path)
     print(results)  # access the output
 
     cap.release()
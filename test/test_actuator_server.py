@@ -1,6 +1,7 @@
 import json
 import os
 import tempfile
+import threading
 import time
 
 import pytest
@@ -9,7 +10,7 @@ import util
 from fastapi.testclient import TestClient
 
 from wadas.domain.actuator import Actuator
-from wadas.domain.actuator_server_app import app
+from wadas.domain.actuator_server_app import app, metrics
 from wadas.domain.fastapi_actuator_server import FastAPIActuatorServer
 from wadas.domain.roadsign_actuator import RoadSignActuator
 
@@ -21,6 +22,8 @@ HTTPS_PORT = 8443
 @pytest.fixture
 def mock_actuators(monkeypatch):
     class MockActuator:
+        last_command_latency = None
+
         def get_command(self):
             return json.dumps({"cmd": "test_string"})
 
@@ -60,6 +63,54 @@ def test_get_actuator_command_non_existing(mock_actuators):
     assert response.json() == {"detail": "Actuator does not exist"}
 
 
+def test_get_actuator_command_long_poll(monkeypatch, actuator):
+    monkeypatch.setattr(Actuator, "actuators", {actuator.id: actuator})
+
+    # No command is sent meanwhile
+    response = client.get("/api/v1/actuators/123", params={"wait": 0.1})
+    assert response.json() == {"cmd": None}
+
+    # Waiting actuator is woken up as soon as a command is sent
+    threading.Timer(0.2, actuator.send_command, (RoadSignActuator.Commands.DISPLAY_ON,)).start()
+    start = time.monotonic()
+    response = client.get("/api/v1/actuators/123", params={"wait": 10})
+    assert response.json() == {"display": True}
+    assert time.monotonic() - start < 5
+    assert not actuator.command_listeners
+
+
+def test_actuators_activity_listeners(actuator):
+    activity = threading.Event()
+    Actuator.activity_listeners.add(activity.set)
+    try:
+        actuator.send_command(RoadSignActuator.Commands.DISPLAY_ON)
+        assert activity.is_set()
+        activity.clear()
+        assert actuator.get_command() == RoadSignActuator.Commands.DISPLAY_ON.value
+        assert activity.is_set()
+    finally:
+        Actuator.activity_listeners.discard(activity.set)
+
+
+def test_server_metrics(monkeypatch, actuator):
+    monkeypatch.setattr(Actuator, "actuators", {actuator.id: actuator})
+    metrics.reset()
+
+    actuator.send_command(RoadSignActuator.Commands.DISPLAY_ON)
+    client.get("/api/v1/actuators/123")
+    client.get("/api/v1/actuators/123", params={"wait": 0.01})
+    client.get("/api/v1/actuators/999")
+
+    stats = client.get("/api/v1/metrics").json()
+    assert stats["requests"] == 3
+    assert stats["unknown_actuator_requests"] == 1
+    assert stats["commands_delivered"] == 1
+    assert stats["long_polls"] == 1
+    assert stats["long_poll_timeouts"] == 1
+    assert stats["waiting_actuators"] == 0
+    assert 0 <= stats["delivery_latency_p50"] == stats["delivery_latency_p99"] < 5
+
+
 def test_server_serialize():
     server = FastAPIActuatorServer("127.0.0.1", 443, "mycert.pem", "mykey.pem")
     serialized_data = server.serialize()
@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+
+from wadas.ai.utils import prefetch, split_in_batches
+
+
+def test_split_in_batches():
+    assert list(split_in_batches(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(split_in_batches([], 3)) == []
+
+
+@pytest.mark.parametrize("depth", [0, 1, 4, 100])
+def test_prefetch(depth):
+    assert list(prefetch(range(50), depth)) == list(range(50))
+
+
+def test_prefetch_runs_in_background():
+    threads = []
+
+    def items():
+        for i in range(5):
+            threads.append(threading.current_thread())
+            yield i
+
+    assert list(prefetch(items(), 2)) == list(range(5))
+    assert threading.current_thread() not in threads
+
+
+def test_prefetch_error():
+    def items():
+        yield 1
+        raise ValueError("Decoding error")
+
+    iterator = prefetch(items(), 2)
+    assert next(iterator) == 1
+    with pytest.raises(ValueError, match="Decoding error"):
+        next(iterator)
+
+
+def test_prefetch_stop():
+    produced = []
+
+    def items():
+        for i in range(1000):
+            produced.append(i)
+            yield i
+
+    iterator = prefetch(items(), 2)
+    assert [next(iterator) for _ in range(3)] == [0, 1, 2]
+    iterator.close()
+
+    # Producer stops as soon as the consumer does, with at most depth items buffered ahead
+    assert len(produced) <= 3 + 2 + 1
+    assert not any(thread.name == "prefetch" for thread in threading.enumerate())
+
+
+def test_prefetch_closes_items():
+    closed = threading.Event()
+
+    def items():
+        try:
+            yield from range(1000)
+        finally:
+            closed.set()
+
+    iterator = prefetch(items(), 2)
+    assert next(iterator) == 0
+    iterator.close()
+
+    # Items source is closed by the producer when the consumer stops early
+    assert closed.is_set()
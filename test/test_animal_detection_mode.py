@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+from queue import Queue
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from wadas.domain.animal_detection_mode import AnimalDetectionAndClassificationMode
+from wadas.domain.camera import media_queue
+from wadas.domain.operation_mode import OperationMode
+from wadas.domain.utils import get_batch_from_queue
+
+
+@pytest.fixture
+def operation_mode():
+    mode = AnimalDetectionAndClassificationMode(classification=False)
+    mode.ai_model = SimpleNamespace(
+        detection_pipeline=SimpleNamespace(enable_concurrent_inference=lambda: None)
+    )
+    yield mode
+    OperationMode.media_workers = 1
+    OperationMode.media_batch_size = 1
+    while not media_queue.empty():
+        media_queue.get()
+
+
+def test_media_workers_preserve_camera_order(operation_mode):
+    num_cameras, num_media = 3, 8
+    for idx in range(num_media):
+        for camera_id in range(num_cameras):
+            media_queue.put(
+                {
+                    "media_path": f"camera_{camera_id}_{idx}.jpg",
+                    "media_id": f"camera_{camera_id}_{idx}.jpg",
+                    "camera_id": str(camera_id),
+                }
+            )
+
+    detection_threads = set()
+    notified, actuated, persisted = [], [], []
+    queue_sizes = []
+
+    def detect(cur_media, classify=False, persist=True):
+        assert not persist
+        detection_threads.add(threading.current_thread().name)
+        queue_sizes.append(media_queue.qsize())
+        camera_id = cur_media["camera_id"]
+        # Media of the last camera take longer to be processed
+        time.sleep(0.02 if camera_id == str(num_cameras - 1) else 0.001)
+        return SimpleNamespace(
+            camera_id=camera_id,
+            media_path=cur_media["media_path"],
+            classification=False,
+            classification_img_path="",
+            classified_animals=[],
+        )
+
+    def stop_when_queue_is_empty():
+        operation_mode.process_queue = not media_queue.empty()
+
+    with (
+        patch.object(operation_mode, "_detect", side_effect=detect),
+        patch.object(operation_mode, "check_for_termination_requests", stop_when_queue_is_empty),
+        patch.object(
+            operation_mode,
+            "send_notification",
+            side_effect=lambda event, message: notified.append(event.media_path),
+        ),
+        patch.object(
+            operation_mode,
+            "actuate",
+            side_effect=lambda event, persist=True: actuated.append(event.media_path) or [],
+        ),
+        patch.object(
+            operation_mode,
+            "_persist_detection_event",
+            side_effect=lambda event, actuation_events=(): persisted.append(event.media_path),
+        ),
+        patch.object(operation_mode, "_show_processed_results"),
+    ):
+        operation_mode._run_media_workers(num_cameras)
+
+    assert len(detection_threads) == num_cameras
+    # Media exceeding the bounded worker queues are left in media queue
+    max_dispatched = num_cameras * (OperationMode.media_worker_queue_size + 1)
+    assert queue_sizes[0] >= num_cameras * num_media - max_dispatched
+    for processed in (notified, actuated, persisted):
+        assert len(processed) == num_cameras * num_media
+        for camera_id in range(num_cameras):
+            assert [path for path in processed if path.startswith(f"camera_{camera_id}_")] == [
+                f"camera_{camera_id}_{idx}.jpg" for idx in range(num_media)
+            ]
+
+
+def test_get_batch_from_queue():
+    queue = Queue()
+    assert get_batch_from_queue(queue, 4, 0.01, timeout=0.01) == []
+
+    for idx in range(6):
+        queue.put(idx)
+    assert get_batch_from_queue(queue, 4, 0.01, timeout=0.01) == [0, 1, 2, 3]
+    # Batch is returned after max_wait even if not full
+    start = time.monotonic()
+    assert get_batch_from_queue(queue, 4, 0.05, timeout=0.01) == [4, 5]
+    assert time.monotonic() - start < 1
+
+
+def test_detect_batch_preserves_media_order(operation_mode):
+    media_batch = [
+        {"media_path": path, "media_id": path, "camera_id": "0"}
+        for path in ("a.jpg", "b.mp4", "c.jpg", "d.png")
+    ]
+
+    def detect_images(images, persist=True):
+        assert [cur_media["media_path"] for cur_media in images] == ["a.jpg", "c.jpg", "d.png"]
+        return [
+            cur_media["media_path"] if cur_media["media_path"] != "c.jpg" else None
+            for cur_media in images
+        ]
+
+    with (
+        patch.object(operation_mode, "_detect_images", side_effect=detect_images),
+        patch.object(
+            operation_mode,
+            "_detect",
+            side_effect=lambda cur_media, classify=False, persist=True: cur_media["media_path"],
+        ) as detect,
+    ):
+        assert operation_mode._detect_batch(media_batch) == ["a.jpg", "b.mp4", None, "d.png"]
+        detect.assert_called_once()
+
+        # A single media is processed as before micro-batching
+        detect.reset_mock()
+        assert operation_mode._detect_batch(media_batch[:1]) == ["a.jpg"]
+        detect.assert_called_once()
+
+
+def test_show_processed_results_updates_last_detection(operation_mode):
+    detection_event = SimpleNamespace(
+        classification=True,
+        detection_img_path="detection_output/image.jpg",
+        classification_img_path="classification_output/image.jpg",
+        classified_animals=[{"classification": ["chamois", 0.9]}],
+    )
+    with patch.object(operation_mode, "update_image"), patch.object(operation_mode, "update_info"):
+        operation_mode._show_processed_results(detection_event)
+        assert operation_mode.get_last_detection() == ("classification_output/image.jpg", "chamois")
+
+        # Classified animals of previous events are not shown along with a detection
+        detection_event.classification_img_path = ""
+        detection_event.classified_animals = None
+        operation_mode._show_processed_results(detection_event)
+        assert operation_mode.get_last_detection() == ("detection_output/image.jpg", "")
+
+
+def test_execution_completed_logs_media_queue_stats(operation_mode, caplog):
+    media_queue.put({"media_path": "a.jpg", "media_id": "a.jpg", "camera_id": "0"})
+    media_queue.get()
+
+    with (
+        caplog.at_level(logging.INFO, logger="wadas.domain.operation_mode"),
+        patch.object(operation_mode, "run_finished"),
+    ):
+        operation_mode.execution_completed()
+
+    stats = media_queue.get_stats()
+    assert f"Media queue statistics: {stats}" in caplog.messages
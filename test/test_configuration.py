@@ -6,6 +6,7 @@ from packaging.version import Version
 
 from wadas._version import __version__
 from wadas.ai.object_counter import TrackingRegion
+from wadas.ai.openvino_model import DEFAULT_PERFORMANCE_PROFILE
 from wadas.domain.actuator import Actuator
 from wadas.domain.ai_model import AiModel
 from wadas.domain.camera import Camera, cameras
@@ -13,11 +14,13 @@ from wadas.domain.configuration import (
     load_configuration_from_file,
     save_configuration_to_file,
 )
+from wadas.domain.db_writer import DBWriter
 from wadas.domain.email_notifier import EmailNotifier
 from wadas.domain.fastapi_actuator_server import FastAPIActuatorServer
 from wadas.domain.feeder_actuator import FeederActuator
 from wadas.domain.ftp_camera import FTPCamera
 from wadas.domain.ftps_server import DummyAuthorizer, FTPsServer, TLS_FTP_WADAS_Handler
+from wadas.domain.media_queue import MediaQueue
 from wadas.domain.notifier import Notifier
 from wadas.domain.operation_mode import OperationMode
 from wadas.domain.roadsign_actuator import RoadSignActuator
@@ -41,7 +44,25 @@ def init():
     AiModel.detection_device = "auto"
     AiModel.classification_device = "auto"
     AiModel.video_fps = 1
+    AiModel.detection_batch_size = 8
+    AiModel.classification_batch_size = 32
+    AiModel.video_sampling_strategy = AiModel.VideoSamplingStrategies.GRAB
+    AiModel.video_prefetch_depth = 8
+    AiModel.detection_performance_profile = dict(DEFAULT_PERFORMANCE_PROFILE)
+    AiModel.classification_performance_profile = dict(DEFAULT_PERFORMANCE_PROFILE)
+    AiModel.classification_fast_preprocessing = False
     OperationMode.cur_operation_mode = None
+    OperationMode.cur_operation_mode_type = None
+    OperationMode.media_workers = 1
+    OperationMode.media_batch_size = 1
+    OperationMode.media_batch_wait = 0.05
+    OperationMode.db_write_behind = True
+    DBWriter.batch_size = 50
+    DBWriter.flush_interval = 0.5
+    DBWriter.max_queue_size = 1000
+    MediaQueue.max_size = 200
+    MediaQueue.max_age = 0
+    MediaQueue.shedding_policy = MediaQueue.SheddingPolicies.DROP_OLDEST
     Tunnel.tunnels = None
 
 
@@ -165,19 +186,44 @@ def test_save_empty_config(mock_file, init):
 actuators: []
 ai_model:
   ai_class_threshold: 0
+  ai_classification_batch_size: 32
   ai_classification_device: auto
+  ai_classification_fast_preprocessing: false
   ai_classification_model_version: DFv1.2
+  ai_classification_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_detect_threshold: 0
+  ai_detection_batch_size: 8
   ai_detection_device: auto
   ai_detection_model_version: MDV5-yolov5
+  ai_detection_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_language: ''
   ai_video_fps: 1
+  ai_video_prefetch_depth: 8
+  ai_video_sampling_strategy: grab
 camera_detection_params: {{}}
 cameras: []
 database: ''
 ftps_server: ''
 notification: ''
-operation_mode: ''
+operation_mode:
+  db_write_batch_size: 50
+  db_write_behind: true
+  db_write_interval: 0.5
+  db_write_queue_size: 1000
+  media_batch_size: 1
+  media_batch_wait: 0.05
+  media_max_age: 0
+  media_queue_size: 200
+  media_shedding_policy: drop_oldest
+  media_workers: 1
 tunnels: []
 uuid: 39f89e5c-56bb-4ab3-8cb0-dd8450cc8ede
 version: {__version__}
@@ -325,19 +371,44 @@ def test_save_actuator_server_config(mock_file, init):
 actuators: []
 ai_model:
   ai_class_threshold: 0
+  ai_classification_batch_size: 32
   ai_classification_device: auto
+  ai_classification_fast_preprocessing: false
   ai_classification_model_version: DFv1.2
+  ai_classification_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_detect_threshold: 0
+  ai_detection_batch_size: 8
   ai_detection_device: auto
   ai_detection_model_version: MDV5-yolov5
+  ai_detection_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_language: ''
   ai_video_fps: 1
+  ai_video_prefetch_depth: 8
+  ai_video_sampling_strategy: grab
 camera_detection_params: {{}}
 cameras: []
 database: ''
 ftps_server: ''
 notification: ''
-operation_mode: ''
+operation_mode:
+  db_write_batch_size: 50
+  db_write_behind: true
+  db_write_interval: 0.5
+  db_write_queue_size: 1000
+  media_batch_size: 1
+  media_batch_wait: 0.05
+  media_max_age: 0
+  media_queue_size: 200
+  media_shedding_policy: drop_oldest
+  media_workers: 1
 tunnels: []
 uuid: 39f89e5c-56bb-4ab3-8cb0-dd8450cc8ede
 version: {__version__}
@@ -447,19 +518,44 @@ actuators:
   type: Road Sign
 ai_model:
   ai_class_threshold: 0
+  ai_classification_batch_size: 32
   ai_classification_device: auto
+  ai_classification_fast_preprocessing: false
   ai_classification_model_version: DFv1.2
+  ai_classification_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_detect_threshold: 0
+  ai_detection_batch_size: 8
   ai_detection_device: auto
   ai_detection_model_version: MDV5-yolov5
+  ai_detection_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_language: ''
   ai_video_fps: 1
+  ai_video_prefetch_depth: 8
+  ai_video_sampling_strategy: grab
 camera_detection_params: {{}}
 cameras: []
 database: ''
 ftps_server: ''
 notification: ''
-operation_mode: ''
+operation_mode:
+  db_write_batch_size: 50
+  db_write_behind: true
+  db_write_interval: 0.5
+  db_write_queue_size: 1000
+  media_batch_size: 1
+  media_batch_wait: 0.05
+  media_max_age: 0
+  media_queue_size: 200
+  media_shedding_policy: drop_oldest
+  media_workers: 1
 tunnels: []
 uuid: 39f89e5c-56bb-4ab3-8cb0-dd8450cc8ede
 version: {__version__}
@@ -518,11 +614,214 @@ def test_load_ai_model_config(mock_file, init):
     assert AiModel.detection_device == "auto"
     assert AiModel.classification_device == "auto"
     assert AiModel.video_fps == 1
+    assert AiModel.video_sampling_strategy == AiModel.VideoSamplingStrategies.GRAB
+    assert AiModel.video_prefetch_depth == 8
+    assert AiModel.detection_batch_size == 8
+    assert AiModel.classification_batch_size == 32
+    assert AiModel.detection_performance_profile == DEFAULT_PERFORMANCE_PROFILE
+    assert AiModel.classification_performance_profile == DEFAULT_PERFORMANCE_PROFILE
+    assert AiModel.classification_fast_preprocessing is False
     assert OperationMode.cur_operation_mode is None
     assert OperationMode.cur_operation_mode_type is None
     assert Tunnel.tunnels is None
 
 
+@patch(
+    "builtins.open",
+    new_callable=OpenStringMock,
+    read_data=f"""
+actuator_server:
+actuators: []
+ai_model:
+  ai_class_threshold: 0.98
+  ai_detect_threshold: 0.76
+  ai_language: it
+  ai_detection_batch_size: 16
+  ai_classification_batch_size: 64
+  ai_video_sampling_strategy: seek
+  ai_video_prefetch_depth: 4
+  ai_detection_device: auto
+  ai_detection_model_version: MDV5-yolov5
+  ai_detection_performance_profile:
+    num_streams: 4
+    performance_hint: THROUGHPUT
+  ai_classification_device: auto
+  ai_classification_fast_preprocessing: true
+  ai_classification_model_version: DFv1.2
+  ai_classification_performance_profile:
+    enable_cpu_pinning: true
+    inference_num_threads: 2
+    num_streams: 0
+    performance_hint: LATENCY
+  ai_video_fps: 1
+cameras: []
+camera_detection_params: {{}}
+database: ''
+ftps_server: []
+notification: []
+operation_mode:
+tunnels: []
+uuid: 39f89e5c-56bb-4ab3-8cb0-dd8450cc8ede
+version: {__version__}
+""",
+)
+def test_load_ai_model_performance_profile_config(mock_file, init):
+    assert load_configuration_from_file("")["errors_on_load"] is False
+    assert AiModel.detection_batch_size == 16
+    assert AiModel.classification_batch_size == 64
+    assert AiModel.video_sampling_strategy == AiModel.VideoSamplingStrategies.SEEK
+    assert AiModel.video_prefetch_depth == 4
+    assert AiModel.classification_fast_preprocessing is True
+    assert AiModel.detection_performance_profile == {
+        "performance_hint": "THROUGHPUT",
+        "num_streams": 4,
+        "inference_num_threads": 0,
+        "enable_cpu_pinning": None,
+    }
+    assert AiModel.classification_performance_profile == {
+        "performance_hint": "LATENCY",
+        "num_streams": 0,
+        "inference_num_threads": 2,
+        "enable_cpu_pinning": True,
+    }
+
+
+@patch(
+    "builtins.open",
+    new_callable=OpenStringMock,
+    read_data=f"""
+actuator_server:
+actuators: []
+ai_model:
+  ai_class_threshold: 0.98
+  ai_detect_threshold: 0.76
+  ai_language: it
+  ai_detection_device: auto
+  ai_detection_model_version: MDV5-yolov5
+  ai_classification_device: auto
+  ai_classification_model_version: DFv1.2
+  ai_video_fps: 1
+cameras: []
+camera_detection_params: {{}}
+database: ''
+ftps_server: []
+notification: []
+operation_mode:
+  type: Animal Detection and Classification Mode
+  media_workers: 4
+  media_batch_size: 8
+  media_batch_wait: 0.2
+  media_queue_size: 50
+  media_max_age: 30
+  media_shedding_policy: skip_classification
+  db_write_behind: false
+  db_write_batch_size: 20
+  db_write_interval: 2
+  db_write_queue_size: 100
+tunnels: []
+uuid: 39f89e5c-56bb-4ab3-8cb0-dd8450cc8ede
+version: {__version__}
+""",
+)
+def test_load_operation_mode_media_workers_config(mock_file, init):
+    assert load_configuration_from_file("")["errors_on_load"] is False
+    assert (
+        OperationMode.cur_operation_mode_type
+        == OperationMode.OperationModeTypes.AnimalDetectionAndClassificationMode
+    )
+    assert OperationMode.media_workers == 4
+    assert OperationMode.media_batch_size == 8
+    assert OperationMode.media_batch_wait == 0.2
+    assert MediaQueue.max_size == 50
+    assert MediaQueue.max_age == 30
+    assert MediaQueue.shedding_policy == MediaQueue.SheddingPolicies.SKIP_CLASSIFICATION
+    assert OperationMode.db_write_behind is False
+    assert DBWriter.batch_size == 20
+    assert DBWriter.flush_interval == 2
+    assert DBWriter.max_queue_size == 100
+
+
+@patch(
+    "builtins.open",
+    new_callable=OpenStringMock,
+    read_data=f"""
+actuator_server:
+actuators: []
+ai_model:
+  ai_class_threshold: 0.98
+  ai_detect_threshold: 0.76
+  ai_language: it
+  ai_detection_device: auto
+  ai_detection_model_version: MDV5-yolov5
+  ai_classification_device: auto
+  ai_classification_model_version: DFv1.2
+  ai_video_fps: 1
+cameras: []
+camera_detection_params: {{}}
+database: ''
+ftps_server: []
+notification: []
+operation_mode:
+  media_workers: 4
+  media_queue_size: 50
+  db_write_batch_size: 20
+tunnels: []
+uuid: 39f89e5c-56bb-4ab3-8cb0-dd8450cc8ede
+version: {__version__}
+""",
+)
+def test_load_media_settings_without_operation_mode_config(mock_file, init):
+    assert load_configuration_from_file("")["errors_on_load"] is False
+    assert OperationMode.cur_operation_mode_type is None
+    assert OperationMode.media_workers == 4
+    assert MediaQueue.max_size == 50
+    assert DBWriter.batch_size == 20
+
+
+@patch(
+    "builtins.open",
+    new_callable=OpenStringMock,
+    read_data=f"""
+actuator_server:
+actuators: []
+ai_model:
+  ai_class_threshold: 0.98
+  ai_detect_threshold: 0.76
+  ai_language: it
+  ai_detection_device: auto
+  ai_detection_model_version: MDV5-yolov5
+  ai_classification_device: auto
+  ai_classification_model_version: DFv1.2
+  ai_video_fps: 1
+cameras: []
+camera_detection_params: {{}}
+database: ''
+ftps_server: []
+notification: []
+operation_mode: ''
+tunnels: []
+uuid: 39f89e5c-56bb-4ab3-8cb0-dd8450cc8ede
+version: {__version__}
+""",
+)
+def test_load_missing_operation_mode_resets_media_settings_config(mock_file, init):
+    # Values of a previously loaded configuration
+    OperationMode.media_workers = 4
+    OperationMode.media_batch_size = 8
+    OperationMode.db_write_behind = False
+    DBWriter.max_queue_size = 100
+    MediaQueue.max_age = 30
+    MediaQueue.shedding_policy = MediaQueue.SheddingPolicies.SKIP_CLASSIFICATION
+
+    assert load_configuration_from_file("")["errors_on_load"] is False
+    assert OperationMode.media_workers == 1
+    assert OperationMode.media_batch_size == 1
+    assert OperationMode.db_write_behind is True
+    assert DBWriter.max_queue_size == 1000
+    assert MediaQueue.max_age == 0
+    assert MediaQueue.shedding_policy == MediaQueue.SheddingPolicies.DROP_OLDEST
+
+
 @patch("builtins.open", new_callable=OpenStringMock, create=True)
 def test_save_ai_model_config(mock_file, init):
     AiModel.classification_model_version = "MDV5-yolov5"
@@ -540,19 +839,44 @@ def test_save_ai_model_config(mock_file, init):
 actuators: []
 ai_model:
   ai_class_threshold: 0.98
+  ai_classification_batch_size: 32
   ai_classification_device: GPU
+  ai_classification_fast_preprocessing: false
   ai_classification_model_version: DFv1.2
+  ai_classification_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_detect_threshold: 0.76
+  ai_detection_batch_size: 8
   ai_detection_device: CPU
   ai_detection_model_version: MDV5-yolov5
+  ai_detection_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_language: it
   ai_video_fps: 1
+  ai_video_prefetch_depth: 8
+  ai_video_sampling_strategy: grab
 camera_detection_params: {{}}
 cameras: []
 database: ''
 ftps_server: ''
 notification: ''
-operation_mode: ''
+operation_mode:
+  db_write_batch_size: 50
+  db_write_behind: true
+  db_write_interval: 0.5
+  db_write_queue_size: 1000
+  media_batch_size: 1
+  media_batch_wait: 0.05
+  media_max_age: 0
+  media_queue_size: 200
+  media_shedding_policy: drop_oldest
+  media_workers: 1
 tunnels: []
 uuid: 39f89e5c-56bb-4ab3-8cb0-dd8450cc8ede
 version: {__version__}
@@ -640,13 +964,28 @@ def test_save_camera_detection_params_config(mock_file, init):
 actuators: []
 ai_model:
   ai_class_threshold: 0
+  ai_classification_batch_size: 32
   ai_classification_device: auto
+  ai_classification_fast_preprocessing: false
   ai_classification_model_version: DFv1.2
+  ai_classification_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_detect_threshold: 0
+  ai_detection_batch_size: 8
   ai_detection_device: auto
   ai_detection_model_version: MDV5-yolov5
+  ai_detection_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_language: ''
   ai_video_fps: 1
+  ai_video_prefetch_depth: 8
+  ai_video_sampling_strategy: grab
 camera_detection_params:
   detection_per_second: 12
   min_contour_area: 345
@@ -656,7 +995,17 @@ cameras: []
 database: ''
 ftps_server: ''
 notification: ''
-operation_mode: ''
+operation_mode:
+  db_write_batch_size: 50
+  db_write_behind: true
+  db_write_interval: 0.5
+  db_write_queue_size: 1000
+  media_batch_size: 1
+  media_batch_wait: 0.05
+  media_max_age: 0
+  media_queue_size: 200
+  media_shedding_policy: drop_oldest
+  media_workers: 1
 tunnels: []
 uuid: 39f89e5c-56bb-4ab3-8cb0-dd8450cc8ede
 version: {__version__}
@@ -696,6 +1045,8 @@ cameras:
   enabled: false
   id: cvbdfg
   index: 0
+  motion_cpu_budget: 0
+  motion_roi: []
   name: ASUS USB2.0 Webcam
   path: {}
   pid: 10371
@@ -707,6 +1058,8 @@ cameras:
   enabled: true
   id: cvbdfg2
   index: 1
+  motion_cpu_budget: 0
+  motion_roi: []
   name: ASUS USB3.1 Webcam
   path: {}
   pid: 10372
@@ -1209,13 +1562,28 @@ def test_save_cameras_config(mock_file, init):
 actuators: []
 ai_model:
   ai_class_threshold: 0
+  ai_classification_batch_size: 32
   ai_classification_device: auto
+  ai_classification_fast_preprocessing: false
   ai_classification_model_version: DFv1.2
+  ai_classification_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_detect_threshold: 0
+  ai_detection_batch_size: 8
   ai_detection_device: auto
   ai_detection_model_version: MDV5-yolov5
+  ai_detection_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_language: ''
   ai_video_fps: 1
+  ai_video_prefetch_depth: 8
+  ai_video_sampling_strategy: grab
 camera_detection_params: {{}}
 cameras:
 - actuators: []
@@ -1234,6 +1602,8 @@ cameras:
   enabled: false
   id: cvbdfg
   index: 0
+  motion_cpu_budget: 0
+  motion_roi: []
   name: ASUS USB2.0 Webcam
   path: {}
   pid: 10371
@@ -1245,6 +1615,8 @@ cameras:
   enabled: true
   id: cvbdfg2
   index: 1
+  motion_cpu_budget: 0
+  motion_roi: []
   name: ASUS USB3.1 Webcam
   path: {}
   pid: 10372
@@ -1253,7 +1625,17 @@ cameras:
 database: ''
 ftps_server: ''
 notification: ''
-operation_mode: ''
+operation_mode:
+  db_write_batch_size: 50
+  db_write_behind: true
+  db_write_interval: 0.5
+  db_write_queue_size: 1000
+  media_batch_size: 1
+  media_batch_wait: 0.05
+  media_max_age: 0
+  media_queue_size: 200
+  media_shedding_policy: drop_oldest
+  media_workers: 1
 tunnels: []
 uuid: 39f89e5c-56bb-4ab3-8cb0-dd8450cc8ede
 version: {}
@@ -1441,13 +1823,28 @@ def test_save_ftps_server_config(mock_file, init):
 actuators: []
 ai_model:
   ai_class_threshold: 0
+  ai_classification_batch_size: 32
   ai_classification_device: auto
+  ai_classification_fast_preprocessing: false
   ai_classification_model_version: DFv1.2
+  ai_classification_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_detect_threshold: 0
+  ai_detection_batch_size: 8
   ai_detection_device: auto
   ai_detection_model_version: MDV5-yolov5
+  ai_detection_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_language: ''
   ai_video_fps: 1
+  ai_video_prefetch_depth: 8
+  ai_video_sampling_strategy: grab
 camera_detection_params: {{}}
 cameras: []
 database: ''
@@ -1463,7 +1860,17 @@ ftps_server:
   ssl_certificate: /Documents/ssl/eshare_crt.pem
   ssl_key: /Documents/ssl/eshare_key.pem
 notification: ''
-operation_mode: ''
+operation_mode:
+  db_write_batch_size: 50
+  db_write_behind: true
+  db_write_interval: 0.5
+  db_write_queue_size: 1000
+  media_batch_size: 1
+  media_batch_wait: 0.05
+  media_max_age: 0
+  media_queue_size: 200
+  media_shedding_policy: drop_oldest
+  media_workers: 1
 tunnels: []
 uuid: 39f89e5c-56bb-4ab3-8cb0-dd8450cc8ede
 version: {__version__}
@@ -1761,13 +2168,28 @@ def test_save_notification_config(mock_file, init):
 actuators: []
 ai_model:
   ai_class_threshold: 0
+  ai_classification_batch_size: 32
   ai_classification_device: auto
+  ai_classification_fast_preprocessing: false
   ai_classification_model_version: DFv1.2
+  ai_classification_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_detect_threshold: 0
+  ai_detection_batch_size: 8
   ai_detection_device: auto
   ai_detection_model_version: MDV5-yolov5
+  ai_detection_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_language: ''
   ai_video_fps: 1
+  ai_video_prefetch_depth: 8
+  ai_video_sampling_strategy: grab
 camera_detection_params: {{}}
 cameras: []
 database: ''
@@ -1781,7 +2203,17 @@ notification:
     sender_email: development@wadas.org
     smtp_hostname: smtp.wadas.org
     smtp_port: 123
-operation_mode: ''
+operation_mode:
+  db_write_batch_size: 50
+  db_write_behind: true
+  db_write_interval: 0.5
+  db_write_queue_size: 1000
+  media_batch_size: 1
+  media_batch_wait: 0.05
+  media_max_age: 0
+  media_queue_size: 200
+  media_shedding_policy: drop_oldest
+  media_workers: 1
 tunnels: []
 uuid: 39f89e5c-56bb-4ab3-8cb0-dd8450cc8ede
 version: {__version__}
@@ -1801,13 +2233,28 @@ def test_save_enabled_notification_config(mock_file, init):
 actuators: []
 ai_model:
   ai_class_threshold: 0
+  ai_classification_batch_size: 32
   ai_classification_device: auto
+  ai_classification_fast_preprocessing: false
   ai_classification_model_version: DFv1.2
+  ai_classification_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_detect_threshold: 0
+  ai_detection_batch_size: 8
   ai_detection_device: auto
   ai_detection_model_version: MDV5-yolov5
+  ai_detection_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_language: ''
   ai_video_fps: 1
+  ai_video_prefetch_depth: 8
+  ai_video_sampling_strategy: grab
 camera_detection_params: {{}}
 cameras: []
 database: ''
@@ -1821,7 +2268,17 @@ notification:
     sender_email: development@wadas.org
     smtp_hostname: smtp.wadas.org
     smtp_port: 123
-operation_mode: ''
+operation_mode:
+  db_write_batch_size: 50
+  db_write_behind: true
+  db_write_interval: 0.5
+  db_write_queue_size: 1000
+  media_batch_size: 1
+  media_batch_wait: 0.05
+  media_max_age: 0
+  media_queue_size: 200
+  media_shedding_policy: drop_oldest
+  media_workers: 1
 tunnels: []
 uuid: 39f89e5c-56bb-4ab3-8cb0-dd8450cc8ede
 version: {__version__}
@@ -1896,19 +2353,44 @@ def test_save_test_model_mode_config(mock_file, init):
 actuators: []
 ai_model:
   ai_class_threshold: 0
+  ai_classification_batch_size: 32
   ai_classification_device: auto
+  ai_classification_fast_preprocessing: false
   ai_classification_model_version: DFv1.2
+  ai_classification_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_detect_threshold: 0
+  ai_detection_batch_size: 8
   ai_detection_device: auto
   ai_detection_model_version: MDV5-yolov5
+  ai_detection_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_language: ''
   ai_video_fps: 1
+  ai_video_prefetch_depth: 8
+  ai_video_sampling_strategy: grab
 camera_detection_params: {{}}
 cameras: []
 database: ''
 ftps_server: ''
 notification: ''
 operation_mode:
+  db_write_batch_size: 50
+  db_write_behind: true
+  db_write_interval: 0.5
+  db_write_queue_size: 1000
+  media_batch_size: 1
+  media_batch_wait: 0.05
+  media_max_age: 0
+  media_queue_size: 200
+  media_shedding_policy: drop_oldest
+  media_workers: 1
   type: Test Model Mode
 tunnels: []
 uuid: 39f89e5c-56bb-4ab3-8cb0-dd8450cc8ede
@@ -1972,19 +2454,44 @@ def test_save_animal_detection_mode_config(mock_file, init):
 actuators: []
 ai_model:
   ai_class_threshold: 0
+  ai_classification_batch_size: 32
   ai_classification_device: auto
+  ai_classification_fast_preprocessing: false
   ai_classification_model_version: DFv1.2
+  ai_classification_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_detect_threshold: 0
+  ai_detection_batch_size: 8
   ai_detection_device: auto
   ai_detection_model_version: MDV5-yolov5
+  ai_detection_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_language: ''
   ai_video_fps: 1
+  ai_video_prefetch_depth: 8
+  ai_video_sampling_strategy: grab
 camera_detection_params: {{}}
 cameras: []
 database: ''
 ftps_server: ''
 notification: ''
 operation_mode:
+  db_write_batch_size: 50
+  db_write_behind: true
+  db_write_interval: 0.5
+  db_write_queue_size: 1000
+  media_batch_size: 1
+  media_batch_wait: 0.05
+  media_max_age: 0
+  media_queue_size: 200
+  media_shedding_policy: drop_oldest
+  media_workers: 1
   type: Animal Detection Mode
 tunnels: []
 uuid: 39f89e5c-56bb-4ab3-8cb0-dd8450cc8ede
@@ -2050,19 +2557,44 @@ def test_save_animal_detection_and_classification_mode_config(mock_file, init):
 actuators: []
 ai_model:
   ai_class_threshold: 0
+  ai_classification_batch_size: 32
   ai_classification_device: auto
+  ai_classification_fast_preprocessing: false
   ai_classification_model_version: DFv1.2
+  ai_classification_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_detect_threshold: 0
+  ai_detection_batch_size: 8
   ai_detection_device: auto
   ai_detection_model_version: MDV5-yolov5
+  ai_detection_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_language: ''
   ai_video_fps: 1
+  ai_video_prefetch_depth: 8
+  ai_video_sampling_strategy: grab
 camera_detection_params: {{}}
 cameras: []
 database: ''
 ftps_server: ''
 notification: ''
 operation_mode:
+  db_write_batch_size: 50
+  db_write_behind: true
+  db_write_interval: 0.5
+  db_write_queue_size: 1000
+  media_batch_size: 1
+  media_batch_wait: 0.05
+  media_max_age: 0
+  media_queue_size: 200
+  media_shedding_policy: drop_oldest
+  media_workers: 1
   type: Animal Detection and Classification Mode
 tunnels: []
 uuid: 39f89e5c-56bb-4ab3-8cb0-dd8450cc8ede
@@ -2131,13 +2663,28 @@ def test_save_custom_species_classification_mode_config(mock_file, init):
 actuators: []
 ai_model:
   ai_class_threshold: 0
+  ai_classification_batch_size: 32
   ai_classification_device: auto
+  ai_classification_fast_preprocessing: false
   ai_classification_model_version: DFv1.2
+  ai_classification_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_detect_threshold: 0
+  ai_detection_batch_size: 8
   ai_detection_device: auto
   ai_detection_model_version: MDV5-yolov5
+  ai_detection_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_language: ''
   ai_video_fps: 1
+  ai_video_prefetch_depth: 8
+  ai_video_sampling_strategy: grab
 camera_detection_params: {{}}
 cameras: []
 database: ''
@@ -2145,6 +2692,16 @@ ftps_server: ''
 notification: ''
 operation_mode:
   custom_target_species: chamois
+  db_write_batch_size: 50
+  db_write_behind: true
+  db_write_interval: 0.5
+  db_write_queue_size: 1000
+  media_batch_size: 1
+  media_batch_wait: 0.05
+  media_max_age: 0
+  media_queue_size: 200
+  media_shedding_policy: drop_oldest
+  media_workers: 1
   type: Custom Species Classification Mode
 tunnels: []
 uuid: 39f89e5c-56bb-4ab3-8cb0-dd8450cc8ede
@@ -2231,13 +2788,28 @@ def test_save_tunnel_config(mock_file, init):
 actuators: []
 ai_model:
   ai_class_threshold: 0
+  ai_classification_batch_size: 32
   ai_classification_device: auto
+  ai_classification_fast_preprocessing: false
   ai_classification_model_version: DFv1.2
+  ai_classification_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_detect_threshold: 0
+  ai_detection_batch_size: 8
   ai_detection_device: auto
   ai_detection_model_version: MDV5-yolov5
+  ai_detection_performance_profile:
+    enable_cpu_pinning: null
+    inference_num_threads: 0
+    num_streams: 0
+    performance_hint: LATENCY
   ai_language: ''
   ai_video_fps: 1
+  ai_video_prefetch_depth: 8
+  ai_video_sampling_strategy: grab
 camera_detection_params: {{}}
 cameras: []
 database: ''
@@ -2245,6 +2817,16 @@ ftps_server: ''
 notification: ''
 operation_mode:
   custom_target_species: chamois
+  db_write_batch_size: 50
+  db_write_behind: true
+  db_write_interval: 0.5
+  db_write_queue_size: 1000
+  media_batch_size: 1
+  media_batch_wait: 0.05
+  media_max_age: 0
+  media_queue_size: 200
+  media_shedding_policy: drop_oldest
+  media_workers: 1
   type: Custom Species Classification Mode
 tunnels:
 - camera_entrance_1: camera_entrance1
@@ -2,15 +2,17 @@ import datetime
 import logging
 
 import pytest
-from sqlalchemy import update
+from sqlalchemy import event, inspect, update
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm.session import Session
 
 from wadas._version import __dbversion__
-from wadas.domain.database import DataBase, SQLiteDataBase
+from wadas.domain.actuation_event import ActuationEvent as DomainActuationEvent
+from wadas.domain.database import DataBase, MySQLDataBase, SQLiteDataBase
 from wadas.domain.db_model import (
     ActuationEvent,
     Actuator,
+    Base,
     Camera,
     ClassifiedAnimals,
     DBMetadata,
@@ -18,9 +20,14 @@ from wadas.domain.db_model import (
     FeederActuator,
     FTPCamera,
     RoadSignActuator,
+    TunnelCountEvent,
     USBCamera,
     camera_actuator_association,
 )
+from wadas.domain.detection_event import DetectionEvent as DomainDetectionEvent
+from wadas.domain.ftp_camera import FTPCamera as DomainFTPCamera
+from wadas.domain.roadsign_actuator import RoadSignActuator as DomainRoadSignActuator
+from wadas.domain.utils import get_precise_timestamp
 
 logger = logging.getLogger(__name__)
 
@@ -145,6 +152,46 @@ def test_create_session(init):
     assert DataBase.initialize(DataBase.DBTypes.SQLITE, ":memory:", None, "", "") is True
     session = DataBase.create_session()
     assert isinstance(session, Session) is True
+    assert session.get_bind() is DataBase.wadas_db_engine
+    assert DataBase.create_session() is not session
+
+    # Sessions are bound to the new engine once the db is initialized again
+    DataBase.destroy_instance()
+    assert DataBase.initialize(DataBase.DBTypes.SQLITE, ":memory:", None, "", "") is True
+    assert DataBase.create_session().get_bind() is DataBase.wadas_db_engine
+
+
+def test_pool_settings(init, monkeypatch):
+    monkeypatch.setattr(MySQLDataBase, "get_password", lambda self: "password")
+    data = {
+        "host": "localhost",
+        "port": 3306,
+        "type": "MySQL",
+        "username": "user",
+        "database_name": "wadas",
+        "enabled": True,
+        "version": __dbversion__,
+        "pool_size": 2,
+        "max_overflow": 1,
+        "pool_pre_ping": True,
+        "pool_recycle": 60,
+    }
+    try:
+        assert DataBase.deserialize(data) is True
+        pool = DataBase.get_engine().pool
+        assert pool.size() == 2
+        assert pool._max_overflow == 1
+        assert pool._pre_ping is True
+        assert pool._recycle == 60
+        assert DataBase.get_instance().serialize() == data
+
+        # Default settings are used by configurations without pool settings
+        for key in DataBase.serialize_pool_settings():
+            del data[key]
+        assert DataBase.deserialize(data) is True
+        assert DataBase.get_engine().pool.size() == 5
+    finally:
+        DataBase.destroy_instance()
 
 
 def test_no_db_uuid_without_session(init):
@@ -191,6 +238,37 @@ def test_run_query(db):
     assert db.get_db_uuid() == "NEW_FAKE_UUID"
 
 
+def test_upgrade_db(db):
+    db, session = db
+    db.populate_db("FAKE_UUID")
+    # Simulate a db created by a previous version, without the detection events time index
+    # and the tunnel count events table
+    engine = DataBase.get_engine()
+    next(
+        index
+        for index in DetectionEvent.__table__.indexes
+        if index.name == "ix_detection_events_time"
+    ).drop(engine)
+    TunnelCountEvent.__table__.drop(engine)
+    DataBase.run_query(update(DBMetadata).values(version="v0.8.3"))
+    assert "ix_detection_events_time" not in {
+        index["name"] for index in inspect(engine).get_indexes("detection_events")
+    }
+    assert "tunnel_count_events" not in inspect(engine).get_table_names()
+
+    assert db.upgrade_db() is True
+    assert db.get_db_version() == __dbversion__
+    assert DataBase.wadas_db.version == __dbversion__
+    assert "tunnel_count_events" in inspect(engine).get_table_names()
+    for table in ("detection_events", "classified_animals", "actuation_events"):
+        assert {index["name"] for index in inspect(engine).get_indexes(table)} == {
+            index.name for index in Base.metadata.tables[table].indexes
+        }
+
+    # Up to date db is left untouched
+    assert db.upgrade_db() is True
+
+
 def test_connection_string(db):
     db, session = db
     assert db is not None
@@ -231,6 +309,7 @@ def test_empty_database(db):
     assert session.query(FeederActuator).count() == 0
     assert session.query(FTPCamera).count() == 0
     assert session.query(RoadSignActuator).count() == 0
+    assert session.query(TunnelCountEvent).count() == 0
     assert session.query(USBCamera).count() == 0
     assert session.query(camera_actuator_association).count() == 0
 
@@ -248,3 +327,112 @@ def test_create_metadata(db):
     assert time_delta.seconds == 0
     assert row.description == "WADAS database"
     assert row.project_uuid == "FAKE_UUID"
+
+
+def test_persist_detection_event(db):
+    db, session = db
+    db.insert_into_db(DomainFTPCamera("camera", "ftp_folder"))
+    db.insert_into_db(DomainRoadSignActuator("roadsign", True))
+    detection_event = DomainDetectionEvent(
+        "camera",
+        get_precise_timestamp(),
+        "image.jpg",
+        "detection.jpg",
+        {"detections": None},
+        True,
+        "classification.jpg",
+        [{"classification": ("chamois", 0.9)}, {"classification": ("roe deer", 0.7)}],
+    )
+    actuation_events = [
+        DomainActuationEvent(
+            actuator_id,
+            get_precise_timestamp(),
+            detection_event,
+            DomainRoadSignActuator.Commands.DISPLAY_ON,
+        )
+        for actuator_id in ("roadsign", "unknown")
+    ]
+
+    commits = []
+    event.listen(DataBase.get_engine(), "commit", lambda conn: commits.append(conn))
+    assert db.persist_detection_event(detection_event, True, actuation_events) is True
+    assert len(commits) == 1
+
+    orm_detection_event = session.query(DetectionEvent).one()
+    assert orm_detection_event.camera.camera_id == "camera"
+    assert orm_detection_event.classification_img_path == "classification.jpg"
+    assert [
+        (row.classified_animal, row.probability) for row in orm_detection_event.classified_animals
+    ] == [("chamois", 0.9), ("roe deer", 0.7)]
+    # Actuation events of actuators not in db are skipped
+    assert [row.actuator.actuator_id for row in orm_detection_event.actuation_events] == [
+        "roadsign"
+    ]
+
+    # Detection events of cameras not in db are not stored
+    detection_event.camera_id = "unknown"
+    assert db.persist_detection_event(detection_event) is False
+    assert session.query(DetectionEvent).count() == 1
+
+
+def test_id_cache(db):
+    db, session = db
+    db.insert_into_db(DomainFTPCamera("camera", "ftp_folder"))
+    db.insert_into_db(DomainRoadSignActuator("roadsign", True))
+    db.populate_db("FAKE_UUID")
+    DataBase.camera_ids.reset_stats()
+    DataBase.actuator_ids.reset_stats()
+
+    statements = []
+    event.listen(
+        DataBase.get_engine(), "before_cursor_execute", lambda *args: statements.append(args)
+    )
+    camera_db_id = session.query(Camera.db_id).scalar()
+    actuator_db_id = session.query(Actuator.db_id).scalar()
+    statements.clear()
+    assert db.get_camera_id("camera") == camera_db_id
+    assert db.get_actuator_id("roadsign") == actuator_db_id
+    assert not statements
+    # Unknown ids are looked up in db each time
+    assert db.get_camera_id("unknown") is None
+    assert db.get_camera_id("unknown") is None
+    assert len(statements) == 2
+
+    stats = DataBase.get_id_cache_stats()
+    assert stats["cameras"]["hits"] == 1
+    assert stats["cameras"]["misses"] == 2
+    assert stats["cameras"]["size"] == 1
+    assert stats["actuators"]["hit_rate"] == 1.0
+
+    # Deleted cameras are removed from cache
+    assert db.update_camera_by_db_id(camera_db_id, True, delete_camera=True) is True
+    assert db.get_camera_id("camera") is None
+    assert DataBase.get_id_cache_stats()["cameras"]["invalidations"] == 1
+
+
+def test_id_cache_lookup_during_deletion(db, monkeypatch):
+    db, session = db
+    db.insert_into_db(DomainFTPCamera("camera", "ftp_folder"))
+    db.insert_into_db(DomainRoadSignActuator("roadsign", True))
+    db.populate_db("FAKE_UUID")
+    camera_db_id = session.query(Camera.db_id).scalar()
+    actuator_db_id = session.query(Actuator.db_id).scalar()
+    DataBase.camera_ids.invalidate()
+    DataBase.actuator_ids.invalidate()
+
+    run_query = DataBase.run_query
+
+    def lookup_before_query(stmt):
+        # Detection events looked up while the deletion is not committed yet
+        db.get_camera_id("camera")
+        db.get_actuator_id("roadsign")
+        return run_query(stmt)
+
+    monkeypatch.setattr(DataBase, "run_query", lookup_before_query)
+    assert db.update_camera_by_db_id(camera_db_id, True, delete_camera=True) is True
+    assert db.update_actuator_by_db_id(actuator_db_id, True, delete_actuator=True) is True
+    monkeypatch.setattr(DataBase, "run_query", run_query)
+
+    # Db ids of deleted camera and actuator are not kept in cache
+    assert db.get_camera_id("camera") is None
+    assert db.get_actuator_id("roadsign") is None
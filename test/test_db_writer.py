@@ -0,0 +1,161 @@
+import threading
+
+import pytest
+
+from wadas.domain.database import DataBase
+from wadas.domain.db_model import DetectionEvent
+from wadas.domain.db_writer import DBWriter
+from wadas.domain.detection_event import DetectionEvent as DomainDetectionEvent
+from wadas.domain.ftp_camera import FTPCamera
+from wadas.domain.utils import get_precise_timestamp
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    if DataBase.get_instance():
+        DataBase.destroy_instance()
+    # The writer thread needs a db shared among connections
+    assert DataBase.initialize(DataBase.DBTypes.SQLITE, str(tmp_path / "wadas.db"), None, "", "")
+    assert DataBase.get_instance().create_database()
+    DataBase.insert_into_db(FTPCamera("camera", "ftp_folder"))
+    monkeypatch.setattr(DBWriter, "spool_dir", tmp_path / "spool")
+    monkeypatch.setattr(DBWriter, "retry_delay", 0)
+    yield DataBase.get_instance()
+    DataBase.destroy_instance()
+
+
+def record(idx):
+    return DataBase.detection_event_record(
+        DomainDetectionEvent(
+            "camera", get_precise_timestamp(), f"image_{idx}.jpg", "", {"detections": None}
+        )
+    )
+
+
+def stored_images():
+    session = DataBase.create_session()
+    try:
+        return [row.original_image for row in session.query(DetectionEvent).all()]
+    finally:
+        session.close()
+
+
+def test_batches_flushed_on_stop(db, monkeypatch):
+    monkeypatch.setattr(DBWriter, "batch_size", 3)
+    monkeypatch.setattr(DBWriter, "flush_interval", 0.05)
+    writer = DBWriter()
+    for idx in range(7):
+        writer.put(record(idx))
+    writer.start()
+    writer.stop()
+
+    assert stored_images() == [f"image_{idx}.jpg" for idx in range(7)]
+    stats = writer.get_stats()
+    assert stats["queued"] == stats["written"] == 7
+    assert stats["batches"] == 3
+    assert stats["pending"] == 0
+
+
+def test_bad_record_does_not_lose_batch(db, monkeypatch):
+    monkeypatch.setattr(DBWriter, "flush_interval", 0.05)
+    bad_record = dict(record(1), original_image=None)
+    writer = DBWriter()
+    for cur_record in (record(0), bad_record, record(2)):
+        writer.put(cur_record)
+    writer.start()
+    writer.stop()
+
+    assert stored_images() == ["image_0.jpg", "image_2.jpg"]
+    stats = writer.get_stats()
+    assert stats["written"] == 2
+    assert stats["dropped"] == 1
+    assert stats["spooled"] == 0
+
+
+def test_spool_when_db_unreachable(db, monkeypatch):
+    with monkeypatch.context() as m:
+        m.setattr(DataBase, "persist_detection_events", lambda records: None)
+        writer = DBWriter()
+        writer.start()
+        writer.put(record(0))
+        writer.put(record(1))
+        writer.stop()
+
+    stats = writer.get_stats()
+    assert stats["retries"] == DataBase.max_reconn_retries
+    assert stats["spooled"] == 2
+    assert len(list(DBWriter.spool_dir.glob("*.json"))) == 1
+    assert stored_images() == []
+
+    # Spooled records are written first once the db is reachable
+    writer = DBWriter()
+    writer.start()
+    writer.put(record(2))
+    writer.stop()
+    assert stored_images() == ["image_0.jpg", "image_1.jpg", "image_2.jpg"]
+    assert writer.get_stats()["replayed"] == 2
+    assert not list(DBWriter.spool_dir.glob("*.json"))
+
+
+def test_spool_when_queue_full(db, monkeypatch):
+    monkeypatch.setattr(DBWriter, "max_queue_size", 1)
+    writer = DBWriter()
+    writer.put(record(0))
+    writer.put(record(1))
+    assert writer.get_stats()["spooled"] == 1
+
+    writer.start()
+    writer.stop()
+    assert sorted(stored_images()) == ["image_0.jpg", "image_1.jpg"]
+
+
+def test_spool_not_blocked_by_replay(db, monkeypatch):
+    monkeypatch.setattr(DBWriter, "max_queue_size", 1)
+    writer = DBWriter()
+    writer._spool([record(0)])
+    writer.put(record(1))
+
+    replaying, db_released = threading.Event(), threading.Event()
+    persist_detection_events = DataBase.persist_detection_events
+
+    def slow_persist_detection_events(records):
+        replaying.set()
+        db_released.wait(5)
+        return persist_detection_events(records)
+
+    monkeypatch.setattr(DataBase, "persist_detection_events", slow_persist_detection_events)
+    replay_thread = threading.Thread(target=writer._replay_spool)
+    replay_thread.start()
+    try:
+        assert replaying.wait(5)
+        # Queue is full: the record is spooled while the replay waits for the db
+        put_thread = threading.Thread(target=writer.put, args=(record(2),))
+        put_thread.start()
+        put_thread.join(1)
+        assert not put_thread.is_alive()
+        assert writer.get_stats()["spooled"] == 2
+    finally:
+        db_released.set()
+        replay_thread.join()
+    monkeypatch.setattr(DataBase, "persist_detection_events", persist_detection_events)
+
+    assert stored_images() == ["image_0.jpg"]
+    # The record spooled during the replay is written at the next one
+    assert writer.spool_pending
+    writer.start()
+    writer.stop()
+    assert sorted(stored_images()) == ["image_0.jpg", "image_1.jpg", "image_2.jpg"]
+    assert not list(DBWriter.spool_dir.glob("*.json"))
+
+
+def test_replay_spool_with_bad_record(db):
+    writer = DBWriter()
+    writer._spool([record(0), dict(record(1), original_image=None), record(2)])
+
+    writer.start()
+    writer.stop()
+    assert stored_images() == ["image_0.jpg", "image_2.jpg"]
+    stats = writer.get_stats()
+    assert stats["replayed"] == 2
+    assert stats["dropped"] == 1
+    assert not list(DBWriter.spool_dir.glob("*.json"))
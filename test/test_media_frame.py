@@ -0,0 +1,87 @@
+import gc
+import os
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from wadas.domain.ai_model import AiModel
+from wadas.domain.media_frame import MediaFrame
+
+
+class FakePipeline:
+    """Detection pipeline detecting an animal in the images brighter than 100"""
+
+    def run_detection(self, imgs, threshold):
+        results = [
+            {"detections": SimpleNamespace(xyxy=[[0, 0, 1, 1]] if np.mean(img) > 100 else [])}
+            for img in imgs
+        ]
+        return results if len(results) > 1 else results[0]
+
+
+def test_frames_are_reference_counted():
+    image = np.zeros((48, 64, 3), dtype=np.uint8)
+    live_frames = MediaFrame.live_frames()
+
+    frames = [MediaFrame.create(image, live_frames + 2) for _ in range(3)]
+    assert frames[2] is None
+    assert MediaFrame.live_frames() == live_frames + 2
+
+    cur_media = {"frame": frames[0]}
+    frames.clear()
+    gc.collect()
+    assert MediaFrame.live_frames() == live_frames + 1
+    cur_media.clear()
+    assert MediaFrame.live_frames() == live_frames
+
+
+def test_concurrent_frames_limit():
+    image = np.zeros((48, 64, 3), dtype=np.uint8)
+    max_frames = MediaFrame.live_frames() + 10
+    barrier = threading.Barrier(8)
+    created = []
+
+    def create_frames():
+        barrier.wait()
+        created.extend(MediaFrame.create(image, max_frames) for _ in range(50))
+
+    threads = [threading.Thread(target=create_frames) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(frame is not None for frame in created) == 10
+    assert MediaFrame.live_frames() == max_frames
+
+
+def test_failed_frame_creation():
+    class BrokenFrame(MediaFrame):
+        def __init__(self, image, reserved=False):
+            raise MemoryError
+
+    live_frames = MediaFrame.live_frames()
+    with pytest.raises(MemoryError):
+        BrokenFrame.create(np.zeros((48, 64, 3), dtype=np.uint8), live_frames + 1)
+    gc.collect()
+    assert MediaFrame.live_frames() == live_frames
+
+
+def test_frames_written_on_detection(tmp_path):
+    ai_model = AiModel.__new__(AiModel)
+    ai_model.detection_pipeline = FakePipeline()
+    bright = MediaFrame(np.full((48, 64, 3), 200, dtype=np.uint8))
+    dark = MediaFrame(np.zeros((48, 64, 3), dtype=np.uint8))
+    paths = [str(tmp_path / "bright.jpg"), str(tmp_path / "dark.jpg")]
+
+    with patch("wadas.domain.ai_model.pw_utils.save_detection_images") as save_detection_images:
+        outputs = ai_model.process_images(paths, True, [bright, dark])
+
+    assert outputs[0][1] == os.path.join("detection_output", "bright.jpg")
+    assert outputs[1][1] == ""
+    save_detection_images.assert_called_once()
+    assert os.path.isfile(paths[0])
+    assert not os.path.exists(paths[1])
@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+from queue import Empty
+
+import pytest
+
+from wadas.domain.media_queue import MediaQueue
+
+
+def media(camera_id, idx):
+    return {
+        "media_path": f"camera_{camera_id}_{idx}.jpg",
+        "media_id": f"camera_{camera_id}_{idx}.jpg",
+        "camera_id": camera_id,
+    }
+
+
+def paths(queue):
+    return [queue.get_nowait()["media_path"] for _ in range(queue.qsize())]
+
+
+@pytest.fixture
+def init():
+    MediaQueue.max_size = 200
+    MediaQueue.max_age = 0
+    MediaQueue.shedding_policy = MediaQueue.SheddingPolicies.DROP_OLDEST
+    yield
+    MediaQueue.max_size = 200
+    MediaQueue.max_age = 0
+    MediaQueue.shedding_policy = MediaQueue.SheddingPolicies.DROP_OLDEST
+
+
+def test_camera_fairness(init):
+    queue = MediaQueue()
+    for idx in range(4):
+        queue.put(media("chatty", idx))
+    queue.put(media("quiet", 0))
+
+    assert paths(queue) == [
+        "camera_chatty_0.jpg",
+        "camera_quiet_0.jpg",
+        "camera_chatty_1.jpg",
+        "camera_chatty_2.jpg",
+        "camera_chatty_3.jpg",
+    ]
+    assert queue.empty()
+
+
+def test_priority_cameras(init):
+    queue = MediaQueue(lambda camera_id: camera_id == "roadsign")
+    queue.put(media("cam", 0))
+    queue.put(media("cam", 1))
+    queue.put(media("roadsign", 0))
+
+    assert paths(queue) == ["camera_roadsign_0.jpg", "camera_cam_0.jpg", "camera_cam_1.jpg"]
+
+
+def media_file(tmp_path, camera_id, idx, ext="jpg"):
+    cur_media = media(camera_id, idx)
+    cur_media["media_path"] = str(tmp_path / f"camera_{camera_id}_{idx}.{ext}")
+    open(cur_media["media_path"], "wb").close()
+    return cur_media
+
+
+def test_drop_oldest_of_busiest_camera(init, tmp_path):
+    MediaQueue.max_size = 4
+    queue = MediaQueue(lambda camera_id: camera_id == "roadsign")
+    queue.put(media_file(tmp_path, "roadsign", 0))
+    for idx in range(3):
+        queue.put(media_file(tmp_path, "chatty", idx))
+    queue.put(media_file(tmp_path, "quiet", 0))
+
+    assert queue.qsize() == 4
+    assert [os.path.basename(path) for path in paths(queue)] == [
+        "camera_roadsign_0.jpg",
+        "camera_chatty_1.jpg",
+        "camera_quiet_0.jpg",
+        "camera_chatty_2.jpg",
+    ]
+    # The file of the dropped media is removed
+    assert sorted(os.listdir(tmp_path)) == [
+        "camera_chatty_1.jpg",
+        "camera_chatty_2.jpg",
+        "camera_quiet_0.jpg",
+        "camera_roadsign_0.jpg",
+    ]
+    stats = queue.get_stats()
+    assert stats["dropped"] == 1
+    assert stats["max_depth"] == 4
+    assert stats["served"] == 4
+
+
+def test_expired_media(init, tmp_path):
+    MediaQueue.max_age = 0.05
+    queue = MediaQueue()
+    expired = media_file(tmp_path, "cam", 0)
+    frame = object()
+    expired_frame = dict(media("cam", 1), frame=frame)
+    queue.put(expired)
+    queue.put(expired_frame)
+    time.sleep(0.1)
+    queue.put(media("cam", 2))
+
+    assert queue.get(timeout=0.1)["media_path"] == "camera_cam_2.jpg"
+    assert queue.get_stats()["expired"] == 2
+    # Expired media files are removed and in-memory frames released
+    assert not os.path.exists(expired["media_path"])
+    assert "frame" not in expired_frame
+
+
+@pytest.mark.parametrize(
+    "policy, key, value, shed_media",
+    [
+        # Only videos are downsampled
+        (MediaQueue.SheddingPolicies.DOWNSAMPLE_VIDEO, "video_fps_scale", 0.5, 1),
+        (MediaQueue.SheddingPolicies.SKIP_CLASSIFICATION, "skip_classification", True, 2),
+    ],
+)
+def test_shedding_policies(init, policy, key, value, shed_media):
+    MediaQueue.max_size = 10
+    MediaQueue.shedding_policy = policy
+    queue = MediaQueue()
+    for idx in range(9):
+        queue.put(media("cam", idx))
+    queue.put(dict(media("cam", 9), media_path="camera_cam_9.mp4"))
+
+    shed = [cur_media for cur_media in (queue.get_nowait() for _ in range(10)) if key in cur_media]
+    assert [cur_media[key] for cur_media in shed] == [value] * shed_media
+    assert queue.get_stats()["shed"] == shed_media
+
+
+def test_skip_cameras(init):
+    queue = MediaQueue(lambda camera_id: camera_id == "roadsign")
+    queue.put(media("roadsign", 0))
+    queue.put(media("cam", 0))
+    queue.put(media("cam", 1))
+    queue.put(media("other", 0))
+
+    assert queue.get_nowait(skip_cameras={"roadsign"})["media_path"] == "camera_cam_0.jpg"
+    assert queue.get_nowait(skip_cameras={"roadsign"})["media_path"] == "camera_other_0.jpg"
+    with pytest.raises(Empty):
+        queue.get(timeout=0.01, skip_cameras={"roadsign", "cam"})
+    # Media of skipped cameras are still served first once they are not skipped anymore
+    assert paths(queue) == ["camera_roadsign_0.jpg", "camera_cam_1.jpg"]
+
+
+def test_get_timeout(init):
+    queue = MediaQueue()
+    with pytest.raises(Empty):
+        queue.get(timeout=0.01)
+    with pytest.raises(Empty):
+        queue.get_nowait()
+
+    threading.Timer(0.05, queue.put, (media("cam", 0),)).start()
+    assert queue.get(timeout=5)["media_path"] == "camera_cam_0.jpg"
+    assert queue.get_stats()["depth"] == 0
@@ -1,4 +1,5 @@
 from pathlib import Path
+from unittest.mock import patch
 
 import numpy as np
 import pytest
@@ -84,6 +85,25 @@ def test_detection(detection_pipeline):
     assert results["detections"].confidence.dtype == np.float32
 
 
+def test_detection_batch(detection_pipeline):
+    """Test batched detection returns the same results as per-image detection."""
+
+    img = Image.open(requests.get(TEST_URL, stream=True).raw).convert("RGB")
+    imgs = [img, img.resize((640, 480)), img]
+    single_results = [detection_pipeline.run_detection(_img, 0.5) for _img in imgs]
+
+    detection_pipeline.detection_batch_size = 2
+    batch_results = detection_pipeline.run_detection(imgs, 0.5)
+
+    assert len(batch_results) == len(imgs)
+    for results, expected in zip(batch_results, single_results):
+        assert np.allclose(results["detections"].xyxy, expected["detections"].xyxy)
+        assert np.allclose(
+            results["detections"].confidence, expected["detections"].confidence, atol=1e-4
+        )
+        assert results["labels"] == expected["labels"]
+
+
 def test_detection_non_animal(detection_pipeline):
     # This image does contain two dogs and a human.
     # Check that the detection pipeline returns only the dogs.
@@ -170,6 +190,65 @@ def test_classification_dog_overlapping(detection_pipeline):
     assert classified_animals[0]["xyxy"] == [554, 368, 1045, 616]
 
 
+def test_classification_preprocess_crops(detection_pipeline):
+    rng = np.random.default_rng(0)
+    img = Image.fromarray(rng.integers(0, 256, (720, 1280, 3), dtype=np.uint8))
+    boxes = np.array(
+        [[10.4, 20.6, 300.2, 200.7], [500, 300, 560, 330], [0, 0, 1280, 720]], dtype=np.float32
+    )
+    classifier = detection_pipeline.classifier
+
+    expected = torch.concatenate([classifier.preprocessImage(img.crop(xyxy)) for xyxy in boxes])
+    batch = classifier.preprocessCrops(img, boxes)
+
+    assert batch.shape == (3, 3, Classifier.CROP_SIZE, Classifier.CROP_SIZE)
+    assert batch.dtype == torch.float32
+    assert torch.allclose(batch, expected, atol=1e-6)
+
+
+def test_classification_fast_preprocess_crops():
+    rng = np.random.default_rng(0)
+    # Smooth image, as camera images are, upscaled from a low resolution noise
+    img = Image.fromarray(rng.integers(0, 256, (36, 64, 3), dtype=np.uint8)).resize(
+        (1280, 720), Image.BICUBIC
+    )
+    boxes = np.array(
+        [[10.4, 20.6, 300.2, 200.7], [500, 300, 560, 330], [0, 0, 1280, 720]], dtype=np.float32
+    )
+    with patch("wadas.ai.models.OVModel"):
+        classifier = Classifier("CPU")
+    expected = classifier.preprocessCrops(img, boxes)
+
+    classifier.fast_preprocessing = True
+    batch = classifier.preprocessCrops(img, boxes)
+
+    assert batch.shape == expected.shape
+    assert batch.dtype == torch.float32
+    # OpenCV interpolation differs slightly from PIL bicubic filter
+    assert (batch - expected).abs().mean() < 0.02
+    assert torch.allclose(batch, expected, atol=0.15)
+
+
+def test_classification_batch(detection_pipeline):
+    img = Image.open(requests.get(TEST_URL, stream=True).raw).convert("RGB")
+    images = [img, img.transpose(Image.FLIP_LEFT_RIGHT), img]
+    results = detection_pipeline.run_detection(images, 0.5)
+
+    # Batches smaller than the number of crops, so that they span across images
+    detection_pipeline.classification_batch_size = 2
+    batched = detection_pipeline.classify(images, results, 0.5)
+    detection_pipeline.classification_batch_size = 0
+    per_image = detection_pipeline.classify(images, results, 0.5)
+
+    assert len(batched) == len(per_image) == len(images)
+    for batched_animals, animals in zip(batched, per_image):
+        assert len(batched_animals) == len(animals)
+        for batched_animal, animal in zip(batched_animals, animals):
+            assert batched_animal["xyxy"] == animal["xyxy"]
+            assert batched_animal["classification"][0] == animal["classification"][0]
+            assert batched_animal["class_probs"] == pytest.approx(animal["class_probs"], abs=1e-4)
+
+
 @pytest.fixture(scope="module")
 def ov_model(version="MDV5-yolov5"):
     model_name = NAME_TO_PATH.get(version)
@@ -0,0 +1,61 @@
+import time
+
+import numpy as np
+import pytest
+
+from wadas.domain.motion_analyzer import MotionAnalyzer
+
+
+def frames_with_moving_box(width, height, num_frames=12):
+    """Return frames of a static background crossed by a box, a fifth of the frame wide"""
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 60, (height, width, 3), dtype=np.uint8)
+    size = width // 5
+    frames = [background.copy() for _ in range(num_frames)]
+    x, y = width // 2, height // 3
+    right, bottom = x + size, y + size
+    frames[-1][y:bottom, x:right] = 255
+    return frames
+
+
+@pytest.mark.parametrize("analysis_width, grayscale", [(0, False), (320, True), (160, False)])
+def test_analyze_downscaled(analysis_width, grayscale):
+    analyzer = MotionAnalyzer(analysis_width=analysis_width, grayscale=grayscale)
+    frames = frames_with_moving_box(1280, 720)
+    for frame in frames:
+        analyzed_frame, contours = analyzer.analyze(frame)
+
+    expected_width = analysis_width or 1280
+    assert analyzed_frame.shape[1] == expected_width
+    assert analyzed_frame.ndim == (2 if grayscale else 3)
+    assert len(contours) == 1
+    x, y, w, h = analyzer.to_frame_box(contours[0])
+    # Box is found in full resolution coordinates, up to the analysis pixel size
+    tolerance = 1280 / expected_width + 1
+    assert abs(x - 640) <= tolerance and abs(y - 240) <= tolerance
+    assert abs(w - 256) <= 2 * tolerance and abs(h - 256) <= 2 * tolerance
+    assert analyzer.get_stats()["analyzed"] == len(frames)
+
+
+def test_min_contour_area_is_rescaled():
+    # Box area is 256x256 pixels at full resolution
+    frames = frames_with_moving_box(1280, 720)
+    for min_contour_area, expected in ((60000, 1), (70000, 0)):
+        analyzer = MotionAnalyzer(min_contour_area=min_contour_area, analysis_width=320)
+        for frame in frames:
+            _, contours = analyzer.analyze(frame)
+        assert len(contours) == expected
+
+
+def test_cpu_budget():
+    analyzer = MotionAnalyzer(cpu_budget=0.001)
+    frame = frames_with_moving_box(320, 240)[0]
+
+    assert analyzer.is_due()
+    analyzer.analyze(frame)
+    if analyzer.get_stats()["cpu_time"]:
+        assert not analyzer.is_due()
+        assert analyzer.get_stats()["skipped"] == 1
+    analyzer.next_analysis_time = time.monotonic()
+    assert analyzer.is_due()
+    assert MotionAnalyzer().is_due()
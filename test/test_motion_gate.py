@@ -0,0 +1,69 @@
+import cv2
+import numpy as np
+
+from wadas.domain.motion_gate import MotionGate, difference_hash
+
+
+def frame_with_box(x, y, value=255, size=40):
+    """Return a frame with a box whose brightness grows from left to right"""
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    bottom, right = y + size, x + size
+    frame[y:bottom, x:right] = np.linspace(value // 2, value, size)[:, None]
+    return frame
+
+
+def contours_of(frame):
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    contours, _ = cv2.findContours(gray, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return contours
+
+
+def test_difference_hash():
+    image = np.tile(np.arange(64, dtype=np.uint8), (32, 1))
+    assert difference_hash(image).all()
+    assert not difference_hash(image[:, ::-1]).any()
+
+
+def test_persistent_motion():
+    gate = MotionGate(persistence_frames=3)
+    frames = [frame_with_box(10 + idx * 5, 10) for idx in range(4)]
+
+    assert [gate.check(frame, contours_of(frame)) for frame in frames] == [
+        False,
+        False,
+        True,
+        True,
+    ]
+    # Persistence restarts when motion stops
+    assert not gate.check(frames[0], [])
+    assert not gate.check(frames[0], contours_of(frames[0]))
+
+    stats = gate.get_stats()
+    assert stats["frames"] == 6
+    assert stats["motion_frames"] == 5
+    assert stats["passed"] == 2
+    assert stats["not_persistent"] == 3
+
+
+def test_unchanged_motion_area():
+    gate = MotionGate(persistence_frames=1)
+    frame = frame_with_box(100, 100, 128)
+    # Noise in the texture of the motion area does not change its hash
+    noisy = frame_with_box(100, 100, 130)
+
+    assert gate.check(frame, contours_of(frame))
+    gate.set_reference(frame)
+    assert not gate.check(noisy, contours_of(noisy))
+    moved = frame_with_box(120, 100, 128)
+    assert gate.check(moved, contours_of(moved))
+    assert gate.get_stats()["unchanged"] == 1
+
+
+def test_roi():
+    gate = MotionGate([[(0, 0), (0.5, 0), (0.5, 1), (0, 1)]])
+    mask = np.full((240, 320), 255, dtype=np.uint8)
+
+    roi_mask = gate.apply_roi(mask)
+    assert roi_mask[:, :150].all()
+    assert not roi_mask[:, 170:].any()
+    assert MotionGate().apply_roi(mask) is mask
@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import cv2
+import numpy as np
+import pytest
+
+from wadas.ai.object_counter import ObjectCounter, TrackingRegion
+
+
+@pytest.fixture
+def video_path(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    video = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+    for idx in range(10):
+        video.write(np.full((48, 64, 3), idx * 20, dtype=np.uint8))
+    video.release()
+    return path
+
+
+class FrameCounter(ObjectCounter):
+    """Counter counting the frames it is called on, without any model"""
+
+    def __init__(self, frame_stride=1):
+        self.region = TrackingRegion.DOWN
+        self.region_initialized = False
+        self.prefetch_depth = 2
+        self.frame_stride = frame_stride
+        self.classwise_count = {}
+
+    def __call__(self, frame):
+        self.region_initialized = True
+        counts = self.classwise_count.setdefault("animal", {"IN": 0, "OUT": 0})
+        counts["IN"] += 1
+        return SimpleNamespace(classwise_count=self.classwise_count)
+
+
+@pytest.mark.parametrize("stride, expected", [(1, 10), (3, 4), (20, 1)])
+def test_read_video_frames_stride(video_path, stride, expected):
+    frames = list(ObjectCounter.read_video_frames(video_path, stride))
+    assert len(frames) == expected
+    assert all(frame.shape == (48, 64, 3) for frame in frames)
+
+
+def test_iter_counts():
+    counter = FrameCounter()
+    frames = (np.zeros((60, 120, 3), dtype=np.uint8) for _ in range(3))
+
+    counts = list(counter.iter_counts(frames))
+
+    assert counter.region == TrackingRegion.DOWN.to_region(120, 60)
+    assert [count["animal"]["IN"] for count in counts] == [1, 2, 3]
+
+
+def test_process_video(video_path):
+    assert FrameCounter().process_video(video_path) == {"animal": {"IN": 10, "OUT": 0}}
+    assert FrameCounter(frame_stride=2).process_video(video_path) == {"animal": {"IN": 5, "OUT": 0}}
+    assert FrameCounter().process_frames([]) == {}
+
+
+def test_video_capture_released_on_early_stop(video_path):
+    captures = []
+    video_capture_class = cv2.VideoCapture
+
+    def video_capture(path):
+        captures.append(MagicMock(wraps=video_capture_class(path)))
+        return captures[-1]
+
+    with patch("wadas.ai.object_counter.cv2.VideoCapture", video_capture):
+        frames = FrameCounter().get_video_frames(video_path)
+        next(frames)
+        frames.close()
+
+    captures[0].release.assert_called_once()
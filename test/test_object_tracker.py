@@ -1,6 +1,11 @@
 import numpy as np
 
-from wadas.ai.object_tracker import KalmanFilter, ObjectTracker, compute_iou
+from wadas.ai.object_tracker import (
+    KalmanFilter,
+    ObjectTracker,
+    compute_iou,
+    compute_iou_matrix,
+)
 
 
 def test_kalman_filter_initialization():
@@ -28,6 +33,16 @@ def test_compute_iou():
     assert 0 <= iou <= 1
 
 
+def test_compute_iou_matrix():
+    rng = np.random.default_rng(0)
+    boxes1 = np.concatenate([rng.uniform(0, 100, (5, 2)), rng.uniform(100, 200, (5, 2))], axis=1)
+    boxes2 = np.concatenate([rng.uniform(0, 150, (3, 2)), rng.uniform(150, 250, (3, 2))], axis=1)
+    iou_matrix = compute_iou_matrix(boxes1, boxes2)
+    assert iou_matrix.shape == (5, 3)
+    assert np.allclose(iou_matrix, [[compute_iou(b1, b2) for b2 in boxes2] for b1 in boxes1])
+    assert compute_iou_matrix(boxes1, np.empty((0, 4))).shape == (5, 0)
+
+
 def test_object_tracker_initialization():
     ot = ObjectTracker()
     assert ot.trackers == {}
@@ -57,3 +72,56 @@ def test_object_tracker_update():
     assert "id" in updated_tracks[0]
     assert "classification" in updated_tracks[0]
     assert "xyxy" in updated_tracks[0]
+
+
+def test_object_tracker_update_many_tracks():
+    ot = ObjectTracker(max_missed=1)
+    boxes = [[x * 50, 0, x * 50 + 40, 40] for x in range(30)]
+    detections = [{"xyxy": box, "class_probs": {"class1": 0.9}} for box in boxes]
+    first_ids = [track["id"] for track in ot.update(detections, (480, 1920))]
+
+    # Shift boxes slightly and drop the last detection: tracks keep their ids
+    moved = [
+        {"xyxy": [x1 + 2, y1, x2 + 2, y2], "class_probs": {"class1": 0.9}}
+        for x1, y1, x2, y2 in boxes
+    ]
+    tracks = ot.update(moved[:-1], (480, 1920))
+    assert [track["id"] for track in tracks] == first_ids
+    assert len(ot.trackers) == 30
+
+    # The unmatched track is removed once max_missed is exceeded
+    ot.update(moved[:-1], (480, 1920))
+    assert len(ot.trackers) == 29
+
+
+def test_object_tracker_matches_kalman_filters():
+    ot = ObjectTracker(max_missed=2)
+    position_filter = KalmanFilter([105, 62, 0, 0], ot.process_var, ot.measurement_var)
+    class_filters = {
+        cls: KalmanFilter([p, 0], ot.class_process_var, ot.class_measurement_var)
+        for cls, p in (("deer", 0.6), ("boar", 0.4))
+    }
+
+    for step in range(6):
+        if step < 4:
+            xyxy = [100 + 3 * step, 50 + step, 110 + 3 * step, 74 + step]
+            class_probs = {"deer": 0.6 - 0.1 * step, "boar": 0.4 + 0.1 * step}
+            measurement = ot.compute_centroid(xyxy)
+            detections = [{"xyxy": xyxy, "class_probs": class_probs}]
+        else:
+            # Missed detections: filters are updated with their own prediction
+            measurement = position_filter.x[:2]
+            class_probs = {cls: class_filter.x[0] for cls, class_filter in class_filters.items()}
+            detections = []
+
+        (track,) = ot.update(detections, (480, 640))
+        x, y = position_filter.update(measurement)[:2]
+        probs = {cls: class_filters[cls].update([p])[0] for cls, p in class_probs.items()}
+
+        assert track["id"] == 0
+        assert track["xyxy"] == [int(x - 5), int(y - 12), int(x + 5), int(y + 12)]
+        assert track["classification"][0] == max(probs, key=probs.get)
+        assert track["classification"][1] == max(probs.values())
+
+    assert ot.update([], (480, 640)) == []
+    assert ot.trackers == {}
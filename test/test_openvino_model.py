@@ -0,0 +1,104 @@
+import threading
+
+import numpy as np
+import openvino as ov
+import pytest
+import torch
+from openvino import opset13 as ops
+
+from wadas.ai.openvino_model import OVModel, get_ov_config, get_static_batch_size
+
+
+def build_model(path, batch=-1):
+    """Save a tiny ReLU model with a static or dynamic batch dimension."""
+    param = ops.parameter(ov.PartialShape([batch, 4]), np.float32, name="input")
+    ov.save_model(ov.Model([ops.relu(param)], [param]), str(path))
+    return str(path)
+
+
+@pytest.fixture
+def dynamic_model(tmp_path):
+    return OVModel(build_model(tmp_path / "dynamic.xml"), "CPU")
+
+
+@pytest.fixture
+def static_model(tmp_path):
+    return OVModel(build_model(tmp_path / "static.xml", batch=1), "CPU", num_requests=2)
+
+
+def test_static_batch_size(dynamic_model, static_model):
+    assert dynamic_model.max_batch_size is None
+    assert static_model.max_batch_size == 1
+    assert get_static_batch_size(static_model.model) == 1
+
+
+def test_call_model(dynamic_model):
+    input_tensor = torch.randn(3, 4)
+    output = dynamic_model(input_tensor)
+    assert isinstance(output, torch.Tensor)
+    assert torch.equal(output, torch.relu(input_tensor))
+
+
+def test_call_model_static_batch(static_model):
+    input_tensor = torch.randn(5, 4)
+    output = static_model(input_tensor)
+    assert output.shape == (5, 4)
+    assert torch.equal(output, torch.relu(input_tensor))
+    assert static_model.num_requests == 2
+
+
+def test_submit(dynamic_model):
+    completed = []
+    event = threading.Event()
+
+    def callback(results):
+        completed.append(results)
+        event.set()
+
+    input_tensor = torch.randn(2, 4)
+    future = dynamic_model.submit(input_tensor, callback)
+    assert torch.equal(future.result(timeout=10), torch.relu(input_tensor))
+    assert event.wait(timeout=10)
+    assert torch.equal(completed[0], torch.relu(input_tensor))
+
+
+def test_submit_many(dynamic_model):
+    inputs = [torch.randn(1, 4) for _ in range(16)]
+    futures = [dynamic_model.submit(input_tensor) for input_tensor in inputs]
+    dynamic_model.wait_all()
+    for future, input_tensor in zip(futures, inputs):
+        assert future.done()
+        assert torch.equal(future.result(), torch.relu(input_tensor))
+
+
+def test_ov_config_default():
+    assert get_ov_config(None, "CPU") == {"PERFORMANCE_HINT": "LATENCY"}
+
+
+def test_ov_config_throughput():
+    profile = {
+        "performance_hint": "throughput",
+        "num_streams": 4,
+        "inference_num_threads": 8,
+        "enable_cpu_pinning": False,
+    }
+    assert get_ov_config(profile, "cpu") == {
+        "PERFORMANCE_HINT": "THROUGHPUT",
+        "NUM_STREAMS": "4",
+        "INFERENCE_NUM_THREADS": "8",
+        "ENABLE_CPU_PINNING": "NO",
+    }
+    # Threading properties are only applied to the CPU plugin
+    assert get_ov_config(profile, "GPU") == {"PERFORMANCE_HINT": "THROUGHPUT", "NUM_STREAMS": "4"}
+
+
+def test_ov_config_invalid_hint():
+    with pytest.raises(ValueError, match="Invalid performance hint"):
+        get_ov_config({"performance_hint": "FASTEST"}, "CPU")
+
+
+def test_model_performance_profile(tmp_path):
+    profile = {"performance_hint": "THROUGHPUT", "enable_cpu_pinning": False}
+    model = OVModel(build_model(tmp_path / "model.xml"), "CPU", performance_profile=profile)
+    assert str(model.model.get_property("PERFORMANCE_HINT")) == "THROUGHPUT"
+    assert model.model.get_property("ENABLE_CPU_PINNING") is False
@@ -0,0 +1,54 @@
+# This file is part of WADAS project.
+#
+# WADAS is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# WADAS is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with WADAS. If not, see <https://www.gnu.org/licenses/>.
+#
+# Author(s): Stefano Dell'Osa, Alessandro Palla, Cesare Di Mauro, Antonio Farina
+# Date: 2026-10-18
+# Description: Test for Test Model operation mode
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+
+from wadas.domain import test_model_mode
+
+
+def test_process_detected_results_classification_message():
+    mode = test_model_mode.TestModelMode()
+    det_results = {"detections": SimpleNamespace(xyxy=np.zeros((2, 4)))}
+
+    def classify(detection_event, persist=True):
+        detection_event.classification_img_path = "classification_output/image.jpg"
+        detection_event.classified_animals = [
+            {"classification": ["chamois", 0.9]},
+            {"classification": ["roe deer", 0.85]},
+        ]
+
+    with (
+        patch.object(mode, "_classify", side_effect=classify),
+        patch.object(mode, "check_for_termination_requests"),
+        patch.object(mode, "send_notification") as send_notification,
+        patch.object(mode, "update_image"),
+        patch.object(mode, "update_info") as update_info,
+    ):
+        mode.process_detected_results("image.jpg", det_results, "detection_output/image.jpg")
+
+    update_info.emit.assert_called_once()
+    assert mode.get_last_detection() == ("classification_output/image.jpg", "chamois, roe deer")
+    _detection_event, message = send_notification.call_args.args
+    assert message == (
+        "WADAS has classified 'chamois, roe deer' animal from camera "
+        "classification_output/image.jpg!"
+    )
@@ -0,0 +1,134 @@
+import os
+from collections import defaultdict
+from unittest.mock import MagicMock, patch
+
+import cv2
+import numpy as np
+import pytest
+
+from wadas.ai.object_counter import TrackingRegion
+from wadas.domain.camera import media_queue
+from wadas.domain.tunnel import Tunnel
+from wadas.domain.tunnel_count_event import TunnelCountEvent
+from wadas.domain.tunnel_mode import TunnelMode
+
+
+class FakeCounter:
+    """Counter counting an animal entering from the bottom for each frame, without any model"""
+
+    def __init__(self, **kwargs):
+        self.batches = []
+
+    def new_camera_state(self, region):
+        return {"region": region, "classwise_count": defaultdict(lambda: {"IN": 0, "OUT": 0})}
+
+    def get_video_frames(self, video_path):
+        return iter([np.zeros((48, 64, 3), dtype=np.uint8)] * 3)
+
+    def count_batch(self, frames, camera_states):
+        self.batches.append(len(frames))
+        for camera_state in camera_states:
+            camera_state["classwise_count"]["animal"]["IN"] += 1
+        return [dict(camera_state["classwise_count"]) for camera_state in camera_states]
+
+
+@pytest.fixture
+def tunnel_mode():
+    Tunnel.tunnels = [
+        Tunnel("tunnel", "cam1", "cam2", TrackingRegion.DOWN, TrackingRegion.UP),
+        Tunnel("disabled", "cam3", "cam4", enabled=False),
+    ]
+    with patch("wadas.domain.tunnel_mode.ObjectCounter", FakeCounter):
+        mode = TunnelMode()
+        mode._initialize_counter()
+        yield mode
+    Tunnel.tunnels = []
+    media_queue.clear()
+
+
+@pytest.mark.parametrize(
+    "direction, key",
+    [
+        (TrackingRegion.DOWN, "IN"),
+        (TrackingRegion.RIGHT, "IN"),
+        (TrackingRegion.UP, "OUT"),
+        (TrackingRegion.LEFT, "OUT"),
+    ],
+)
+def test_entering_count_key(direction, key):
+    assert TunnelMode.entering_count_key(direction) == key
+
+
+def test_entrances_of_enabled_tunnels(tunnel_mode):
+    assert set(tunnel_mode.entrances) == {"cam1", "cam2"}
+    assert tunnel_mode.entrances["cam2"][1] == TrackingRegion.UP
+
+
+def test_store_count_deltas(tunnel_mode):
+    db = MagicMock()
+    counts = tunnel_mode.entrances["cam2"][2]["classwise_count"]
+    with patch("wadas.domain.tunnel_mode.DataBase.get_enabled_db", return_value=db):
+        counts["animal"]["IN"] = 2
+        tunnel_mode._store_counts("cam2")
+        counts["animal"]["IN"] = 3
+        counts["animal"]["OUT"] = 1
+        tunnel_mode._store_counts("cam2")
+        tunnel_mode._store_counts("cam2")
+
+    events = [call.args[0] for call in db.insert_into_db.call_args_list]
+    assert [(event.direction, event.count) for event in events] == [
+        (TunnelCountEvent.Directions.EXITING, 2),
+        (TunnelCountEvent.Directions.EXITING, 1),
+        (TunnelCountEvent.Directions.ENTERING, 1),
+    ]
+    assert all(event.tunnel_id == "tunnel" and event.camera_id == "cam2" for event in events)
+
+
+def test_run_batches_frames_across_cameras(tunnel_mode, tmp_path):
+    image_path = str(tmp_path / "frame.jpg")
+    cv2.imwrite(image_path, np.zeros((48, 64, 3), dtype=np.uint8))
+    for camera_id, media_path in (
+        ("cam1", "clip.mp4"),
+        ("cam1", image_path),
+        ("cam2", "clip.mp4"),
+        ("other", "clip.mp4"),
+    ):
+        media_queue.put({"media_path": media_path, "media_id": media_path, "camera_id": camera_id})
+
+    stored = []
+    calls = iter(range(10))
+    queue_sizes = []
+
+    def stop_after_some_iterations():
+        queue_sizes.append(media_queue.qsize())
+        tunnel_mode.process_queue = next(calls) < 9
+
+    with (
+        patch.object(tunnel_mode, "check_for_termination_requests", stop_after_some_iterations),
+        patch.object(tunnel_mode, "_initialize_counter"),
+        patch.object(tunnel_mode, "start_db_writer") as start_db_writer,
+        patch.object(tunnel_mode, "_initialize_cameras"),
+        patch.object(tunnel_mode, "start_actuator_server"),
+        patch.object(tunnel_mode, "execution_completed"),
+        patch(
+            "wadas.domain.tunnel_mode.DataBase.get_enabled_db",
+            return_value=MagicMock(insert_into_db=stored.append),
+        ),
+    ):
+        tunnel_mode.run()
+
+    start_db_writer.assert_called_once()
+    # The frames of both cameras are counted together, the image after the video of cam1
+    assert tunnel_mode.object_counter.batches == [2, 2, 2, 1]
+    # The image of cam1 is left in media queue until the video of cam1 is counted
+    assert queue_sizes == [4, 4, 1, 1, 1, 1, 0, 0, 0, 0]
+    # Counted media files are removed
+    assert not os.path.exists(image_path)
+    assert sorted((event.camera_id, event.count) for event in stored) == [
+        ("cam1", 1),
+        ("cam1", 3),
+        ("cam2", 3),
+    ]
+    assert {event.direction for event in stored if event.camera_id == "cam1"} == {
+        TunnelCountEvent.Directions.ENTERING
+    }
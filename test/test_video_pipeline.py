@@ -18,7 +18,9 @@
 # Description: Test for AI video pipeline
 
 import os
+from unittest.mock import MagicMock, patch
 
+import cv2
 import numpy as np
 import pytest
 
@@ -33,6 +35,8 @@ def init():
     AiModel.detection_device = "auto"
     AiModel.classification_device = "auto"
     AiModel.video_fps = 1
+    AiModel.video_sampling_strategy = AiModel.VideoSamplingStrategies.GRAB
+    AiModel.detection_batch_size = 8
 
 
 def test_video_detection_and_classification(init):
@@ -133,3 +137,110 @@ def test_offline_video_detection_and_classification_empty(init):
     animals = [animal for frame_animals in tracked_animals for animal in frame_animals]
 
     assert len(animals) == 0
+
+
+def test_offline_video_processing_window_size(init):
+    # This one is the video of a bear
+    VIDEO_URL = "https://videos.pexels.com/video-files/7723475/7723475-hd_1920_1080_25fps.mp4"
+
+    # Frames are processed in windows of detection batch size: results must not depend on it
+    AiModel.detection_batch_size = 3
+    tracked_animals, video_path = AiModel().process_video_offline(
+        VIDEO_URL, classification=True, save_processed_video=True
+    )
+    AiModel.detection_batch_size = 1
+    single_frame_tracked_animals, _ = AiModel().process_video_offline(VIDEO_URL)
+
+    assert len(tracked_animals) == len(single_frame_tracked_animals) > 0
+    for animals, single_frame_animals in zip(tracked_animals, single_frame_tracked_animals):
+        assert [animal["id"] for animal in animals] == [
+            animal["id"] for animal in single_frame_animals
+        ]
+        assert [animal["classification"][0] for animal in animals] == [
+            animal["classification"][0] for animal in single_frame_animals
+        ]
+
+    # Preview video is written incrementally and contains every analyzed frame
+    video = cv2.VideoCapture(video_path)
+    assert int(video.get(cv2.CAP_PROP_FRAME_COUNT)) == len(tracked_animals)
+    video.release()
+
+
+@pytest.mark.parametrize(
+    "strategy", [AiModel.VideoSamplingStrategies.GRAB, AiModel.VideoSamplingStrategies.SEEK]
+)
+def test_video_frames_sampling_strategy(init, tmp_path, strategy):
+    video_path = str(tmp_path / "sample.mp4")
+    video = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*"mp4v"), 10, (160, 120))
+    for idx in range(45):
+        frame = np.full((120, 160, 3), idx * 5, dtype=np.uint8)
+        video.write(frame)
+    video.release()
+
+    AiModel.video_fps = 2
+    AiModel.video_sampling_strategy = AiModel.VideoSamplingStrategies.READ
+    expected = [(np.asarray(frame), count) for frame, count in AiModel.get_video_frames(video_path)]
+    AiModel.video_sampling_strategy = strategy
+    frames = [(np.asarray(frame), count) for frame, count in AiModel.get_video_frames(video_path)]
+
+    assert [count for _, count in frames] == [0, 5, 10, 15, 20, 25, 30, 35, 40]
+    assert [count for _, count in expected] == [count for _, count in frames]
+    for (frame, _), (expected_frame, _) in zip(frames, expected):
+        assert np.array_equal(frame, expected_frame)
+
+
+def test_video_frames_released_on_early_stop(init, tmp_path):
+    video_path = str(tmp_path / "sample.mp4")
+    video = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*"mp4v"), 10, (160, 120))
+    for _ in range(10):
+        video.write(np.zeros((120, 160, 3), dtype=np.uint8))
+    video.release()
+
+    captures = []
+    video_capture_class = cv2.VideoCapture
+
+    def video_capture(path):
+        captures.append(MagicMock(wraps=video_capture_class(path)))
+        return captures[-1]
+
+    with patch("wadas.domain.ai_model.cv2.VideoCapture", video_capture):
+        frames = AiModel.get_video_frames(video_path)
+        next(frames)
+        frames.close()
+
+    captures[0].release.assert_called_once()
+
+
+def test_detect_video_windows_fill_classification_batch(init, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Number of detected animals per frame
+    boxes = [0, 1, 2, 0, 1, 0, 0, 3, 1, 1, 0, 2, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1]
+
+    def run_detection(frames, _threshold):
+        results = [{"detections": MagicMock(xyxy=np.zeros((boxes[idx], 4)))} for idx in frames]
+        return results[0] if len(results) == 1 else results
+
+    with patch("wadas.domain.ai_model.DetectionPipeline") as detection_pipeline:
+        detection_pipeline.return_value.detection_batch_size = 3
+        detection_pipeline.return_value.classification_batch_size = 4
+        detection_pipeline.return_value.run_detection.side_effect = run_detection
+        ai_model = AiModel()
+
+        windows = list(ai_model.detect_video_windows(range(len(boxes))))
+        # Detection windows are grouped until they hold a classification batch of crops,
+        # or as many frames as the classification batch size
+        assert [window for window, _ in windows] == [
+            [0, 1, 2, 3, 4, 5],
+            [6, 7, 8],
+            [9, 10, 11, 12, 13, 14],
+            [15, 16, 17, 18, 19, 20],
+            [21, 22],
+        ]
+        for window, detection_lists in windows:
+            assert [len(results["detections"].xyxy) for results in detection_lists] == [
+                boxes[idx] for idx in window
+            ]
+
+        # Without classification every detection window is yielded as is
+        windows = list(ai_model.detect_video_windows(range(len(boxes)), classification=False))
+        assert [len(window) for window, _ in windows] == [3, 3, 3, 3, 3, 3, 3, 2]
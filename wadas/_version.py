@@ -18,4 +18,7 @@
 # Description: module to keep track of WADAS version
 
 __version__ = "v0.8.3"
-__dbversion__ = __version__
+# Version of the db schema, bumped on schema changes (see DataBase.upgrade_db):
+# v0.8.4: detection events time and filter indexes
+# v0.8.5: tunnel_count_events table
+__dbversion__ = "v0.8.5"
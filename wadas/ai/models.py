@@ -17,17 +17,24 @@
 # Date: 2024-10-11
 # Description: This module implements OpenVINO related classes and functionalities.
 
+import threading
 from abc import ABC, abstractmethod
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
 
+import cv2
 import numpy as np
 import torch
+from PIL import Image
 from PytorchWildlife.data import transforms as pw_trans
 from PytorchWildlife.models import detection as pw_detection
 from torchvision.transforms import InterpolationMode, transforms
+from yolov5.utils.general import non_max_suppression
 
 from wadas.ai.openvino_model import OVModel
 from wadas.ai.ov_predictor import OVPredictor
+from wadas.ai.utils import split_in_batches
 
 txt_animalclasses = {
     "fr": [
@@ -157,6 +164,15 @@ class WadasAiModel(ABC):
         """Method to run detection model"""
         pass
 
+    def run_batch(self, img_arrays: list[np.ndarray], detection_threshold: float):
+        """Method to run detection model on a batch of images"""
+        return [self.run(img_array, detection_threshold) for img_array in img_arrays]
+
+    def enable_concurrent_inference(self, num_requests: int = 0):
+        """Allow the model to be run concurrently from several threads.
+        Models serializing their runs internally need no setup."""
+        return
+
     @staticmethod
     @abstractmethod
     def check_model():
@@ -173,9 +189,11 @@ class WadasAiModel(ABC):
 class OVMegaDetectorV5(pw_detection.MegaDetectorV5, WadasAiModel):
     """MegaDetectorV5 class for detection model"""
 
-    def __init__(self, device, model_name="MDV5-yolov5"):
+    def __init__(self, device, model_name="MDV5-yolov5", performance_profile=None):
         self.model = OVModel(
-            Path("detection", f"{model_name}_openvino_model", f"{model_name}.xml"), device
+            Path("detection", f"{model_name}_openvino_model", f"{model_name}.xml"),
+            device,
+            performance_profile=performance_profile,
         )
         self.device = "cpu"  # torch device, keep to CPU when using with OpenVINO
         self.transform = pw_trans.MegaDetector_v5_Transform(
@@ -186,6 +204,53 @@ class OVMegaDetectorV5(pw_detection.MegaDetectorV5, WadasAiModel):
         """Run detection model"""
         return self.single_image_detection(img_array, None, detection_threshold, None)
 
+    def enable_concurrent_inference(self, num_requests: int = 0):
+        """Allow the model to be run concurrently from several threads, sharing a pool of
+        num_requests infer requests (0 means the optimal number for the compiled model)"""
+        self.model.create_infer_queue(num_requests)
+
+    def run_batch(self, img_arrays: list[np.ndarray], detection_threshold: float):
+        """Run detection model on a batch of images with a single inference call.
+        Images are letterboxed into one tensor, NMS is applied per image and boxes are
+        scaled back to the original image sizes in one vectorised step.
+        """
+        img_sizes = [img_array.shape[:2] for img_array in img_arrays]
+        batch = torch.stack([self.transform(img_array) for img_array in img_arrays])
+
+        preds = self.model(batch)
+        if isinstance(preds, list):
+            preds = preds[0]
+        preds_lst = non_max_suppression(prediction=preds, conf_thres=detection_threshold)
+        counts = [len(img_preds) for img_preds in preds_lst]
+
+        boxes = self.scale_boxes(torch.cat(preds_lst, axis=0), img_sizes, counts)
+        return [
+            self.results_generation(img_preds.cpu().numpy(), None, None)
+            for img_preds in torch.split(boxes, counts)
+        ]
+
+    def scale_boxes(self, preds: torch.Tensor, img_sizes: list[tuple], counts: list[int]):
+        """Map boxes from the letterboxed model input back to their original image sizes.
+        This is the batched equivalent of yolov5 scale_coords: each row of preds belongs to
+        the image whose (height, width) is repeated counts times in img_sizes.
+        """
+        sizes = torch.tensor(img_sizes, dtype=torch.float64).repeat_interleave(
+            torch.tensor(counts), dim=0
+        )
+        height, width = sizes[:, 0], sizes[:, 1]
+        gain = torch.minimum(self.IMAGE_SIZE / height, self.IMAGE_SIZE / width)
+        pad_x = (self.IMAGE_SIZE - width * gain) / 2
+        pad_y = (self.IMAGE_SIZE - height * gain) / 2
+
+        coords = preds[:, :4].double()
+        coords[:, [0, 2]] -= pad_x[:, None]
+        coords[:, [1, 3]] -= pad_y[:, None]
+        coords /= gain[:, None]
+        coords[:, [0, 2]] = coords[:, [0, 2]].clamp(min=0).minimum(width[:, None])
+        coords[:, [1, 3]] = coords[:, [1, 3]].clamp(min=0).minimum(height[:, None])
+        preds[:, :4] = coords.to(preds.dtype).round()
+        return preds
+
     @staticmethod
     def check_model():
         """Check if detection model is initialized"""
@@ -206,8 +271,8 @@ class OVMegaDetectorV6(pw_detection.MegaDetectorV6, WadasAiModel, ABC):
 
     IMAGE_SIZE = 640
 
-    def __init__(self, device, model_name):
-        self.predictor = OVPredictor(ov_device=device)
+    def __init__(self, device, model_name, performance_profile=None):
+        self.predictor = OVPredictor(ov_device=device, performance_profile=performance_profile)
         self.device = "cpu"  # torch device, keep to CPU when using with OpenVINO
         self.model_name = model_name
         self.predictor.setup_model(
@@ -218,11 +283,30 @@ class OVMegaDetectorV6(pw_detection.MegaDetectorV6, WadasAiModel, ABC):
         self.predictor.args.save = (
             False  # Will see if we want to use ultralytics native inference saving functions.
         )
+        # Predictor holds per-run state, so concurrent batches are serialized
+        self.predictor_lock = threading.Lock()
 
     def run(self, img_array: np.ndarray, detection_threshold: float):
         """Run detection model"""
         return self.single_image_detection(img_array, None, detection_threshold, None)
 
+    def run_batch(self, img_arrays: list[np.ndarray], detection_threshold: float):
+        """Run detection model on a batch of images.
+        Images are split in chunks matching the batch size supported by the compiled model.
+        """
+        batch_size = self.predictor.model.max_batch_size or len(img_arrays)
+
+        results = []
+        with self.predictor_lock:
+            self.predictor.args.conf = detection_threshold
+            for chunk in split_in_batches(img_arrays, batch_size):
+                self.predictor.args.batch = len(chunk)
+                results.extend(
+                    self.results_generation(preds, None, None)
+                    for preds in self.predictor.stream_inference(chunk)
+                )
+        return results
+
 
 class OVMegaDetectorV6YOLO9(OVMegaDetectorV6):
     """MegaDetectorV6 YOLO9 class for detection model"""
@@ -264,9 +348,18 @@ class Classifier:
     """Classifier class for classification model"""
 
     CROP_SIZE = 182
+    MEAN = (0.4850, 0.4560, 0.4060)
+    STD = (0.2290, 0.2240, 0.2250)
 
-    def __init__(self, device):
-        self.model = OVModel(Path("classification", "DFv1.2_openvino_model", "DFv1.2.xml"), device)
+    def __init__(self, device, performance_profile=None, fast_preprocessing=False):
+        self.model = OVModel(
+            Path("classification", "DFv1.2_openvino_model", "DFv1.2.xml"),
+            device,
+            performance_profile=performance_profile,
+        )
+        # Crops are cropped and resized by OpenCV, faster than PIL but not bit-exact with
+        # preprocessImage
+        self.fast_preprocessing = fast_preprocessing
         self.transforms = transforms.Compose(
             [
                 transforms.Resize(
@@ -277,11 +370,18 @@ class Classifier:
                 ),
                 transforms.ToTensor(),
                 transforms.Normalize(
-                    mean=torch.tensor([0.4850, 0.4560, 0.4060]),
-                    std=torch.tensor([0.2290, 0.2240, 0.2250]),
+                    mean=torch.tensor(self.MEAN),
+                    std=torch.tensor(self.STD),
                 ),
             ]
         )
+        # Per-channel lookup table mapping every uint8 value to its normalized float value.
+        # It is computed with the same operations as ToTensor + Normalize, so that normalizing
+        # a whole batch of crops with a single lookup gives the very same values.
+        mean, std = torch.tensor(self.MEAN)[:, None], torch.tensor(self.STD)[:, None]
+        self.normalization_lut = (
+            (torch.arange(256, dtype=torch.float32).div(255).expand(3, -1) - mean) / std
+        ).numpy()
 
     @staticmethod
     def check_model():
@@ -295,6 +395,11 @@ class Classifier:
             Path("classification", "DFv1.2_openvino_model", "DFv1.2"), force
         )
 
+    def enable_concurrent_inference(self, num_requests: int = 0):
+        """Allow the model to be run concurrently from several threads, sharing a pool of
+        num_requests infer requests (0 means the optimal number for the compiled model)"""
+        self.model.create_infer_queue(num_requests)
+
     def predictOnBatch(self, batchtensor, withsoftmax=True):
         """Predict on a batch of images"""
         logits = self.model(batchtensor)
@@ -307,13 +412,79 @@ class Classifier:
         preprocessimage = self.transforms(croppedimage)
         return preprocessimage.unsqueeze(dim=0)
 
+    def cropAndResize(self, image, boxes) -> np.ndarray:
+        """Crop and resize the boxes of an RGB image array with OpenCV into a single uint8 batch
+        Crops are views of the image resized straight into the batch, with area interpolation
+        when shrinking, the closest to the antialiased bicubic filter of PIL, and bicubic
+        interpolation when enlarging.
+        """
+        size = (self.CROP_SIZE, self.CROP_SIZE)
+        crops = np.empty((len(boxes), self.CROP_SIZE, self.CROP_SIZE, 3), dtype=np.uint8)
+        for crop, xyxy in zip(crops, boxes):
+            # Box coordinates are rounded as PIL does
+            x0, y0, x1, y1 = (max(round(float(coord)), 0) for coord in xyxy)
+            region = image[y0:y1, x0:x1]
+            interpolation = (
+                cv2.INTER_AREA if min(region.shape[:2]) >= self.CROP_SIZE else cv2.INTER_CUBIC
+            )
+            cv2.resize(region, size, dst=crop, interpolation=interpolation)
+        return crops
+
+    def preprocessCrops(self, img, boxes) -> torch.Tensor:
+        """Crop, resize and normalize all the boxes of an image in a single batch
+        Crops are resized with the same bicubic filter used by preprocessImage or, with
+        fast_preprocessing, by cropAndResize from a single array of the image. They are stacked
+        into a single uint8 array and normalized at once through a lookup table.
+        """
+        if self.fast_preprocessing:
+            crops = self.cropAndResize(np.asarray(img), boxes)
+        else:
+            size = (self.CROP_SIZE, self.CROP_SIZE)
+            crops = np.stack(
+                [np.asarray(img.crop(xyxy).resize(size, Image.BICUBIC)) for xyxy in boxes]
+            )
+        channels = crops.transpose(3, 0, 1, 2)
+        return torch.from_numpy(
+            np.stack(
+                [lut.take(channel) for lut, channel in zip(self.normalization_lut, channels)], 1
+            )
+        )
+
     def predictOnImages(self, request, withsoftmax=True) -> torch.Tensor:
         img, results = request
         if results["detections"].xyxy.shape[0] == 0:
             return
         """Predict on a single image"""
-        tensor = torch.concatenate(
-            [self.preprocessImage(img.crop(xyxy)) for xyxy in results["detections"].xyxy],
-            axis=0,
-        )
+        tensor = self.preprocessCrops(img, results["detections"].xyxy)
         return self.predictOnBatch(tensor, withsoftmax=withsoftmax)
+
+    def predictOnImagesBatched(self, requests, batch_size, withsoftmax=True) -> list:
+        """Predict on the crops of several images gathered in fixed size batches
+        Crops are collected across all the (image, results) requests, classified batch_size at a
+        time and the logits are scattered back to the requests (None when no detections).
+        """
+        images = [img for img, _ in requests]
+        counts = [results["detections"].xyxy.shape[0] for _, results in requests]
+        crops = [
+            (idx, xyxy)
+            for idx, (_, results) in enumerate(requests)
+            for xyxy in results["detections"].xyxy
+        ]
+        if not crops:
+            return [None] * len(requests)
+
+        logits = []
+        for batch in split_in_batches(crops, batch_size):
+            # Crops of the same image are contiguous, so preprocess them together
+            tensor = torch.concatenate(
+                [
+                    self.preprocessCrops(images[idx], [xyxy for _, xyxy in group])
+                    for idx, group in groupby(batch, key=itemgetter(0))
+                ]
+            )
+            logits.append(self.predictOnBatch(tensor, withsoftmax=withsoftmax))
+
+        return [
+            image_logits if count else None
+            for image_logits, count in zip(torch.split(torch.concatenate(logits), counts), counts)
+        ]
@@ -1,13 +1,21 @@
+import copy
 import logging
 import os
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
 from enum import Enum
 
 import cv2
 import numpy as np
+import torch
 from PIL import Image
 from ultralytics import solutions
+from ultralytics.utils import YAML, IterableSimpleNamespace
+from ultralytics.utils.checks import check_yaml
 
+from wadas.ai.openvino_model import get_ov_config
 from wadas.ai.ov_predictor import __model_folder__, load_ov_model
+from wadas.ai.utils import prefetch
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +50,20 @@ class TrackingRegion(Enum):
 
 class ObjectCounter(solutions.ObjectCounter):
 
+    # Attributes holding the counting state of a camera, see new_camera_state
+    CAMERA_STATE_ATTRIBUTES = (
+        "region",
+        "region_initialized",
+        "r_s",
+        "track_history",
+        "counted_ids",
+        "classwise_count",
+        "in_count",
+        "out_count",
+    )
+    # Tracker of each camera counted through count_batch, ByteTrack only needs detection boxes
+    CAMERA_TRACKER_CONFIG = "bytetrack.yaml"
+
     def __init__(
         self,
         model: str,
@@ -51,6 +73,9 @@ class ObjectCounter(solutions.ObjectCounter):
         batch_size: int = 1,
         iou_threshold: float = 0.5,
         confidence_threshold: float = 0.3,
+        performance_profile: dict = None,
+        prefetch_depth: int = 8,
+        frame_stride: int = 1,
         **kwargs,
     ):
         """
@@ -63,6 +88,12 @@ class ObjectCounter(solutions.ObjectCounter):
             classes (list[int]): List of class indices to be counted.
             device (str, optional): Device to run the model on. Defaults to "auto".
             batch_size (int, optional): Number of images to process in a batch. Defaults to 1.
+            performance_profile (dict, optional): OpenVINO performance profile of the model.
+            prefetch_depth (int, optional): Number of video frames decoded in background ahead
+                                            of the model. 0 disables background decoding.
+                                            Defaults to 8.
+            frame_stride (int, optional): Only one video frame every frame_stride is
+                                          processed. Defaults to 1.
             **kwargs: Additional keyword arguments.
         """
         model = os.path.join(__model_folder__, model)
@@ -75,51 +106,180 @@ class ObjectCounter(solutions.ObjectCounter):
             conf=confidence_threshold,
             **kwargs,
         )
-        self.model.predictor.model.ov_compiled_model = load_ov_model(model, device)
+        self.model.predictor.model.ov_compiled_model = load_ov_model(
+            model, device, performance_profile
+        )
+        self.model.predictor.model.inference_mode = get_ov_config(performance_profile, device)[
+            "PERFORMANCE_HINT"
+        ]
         self.region = region
+        self.prefetch_depth = prefetch_depth
+        self.frame_stride = frame_stride
+        # Tracker and tracked detections of the camera being counted by count_batch
+        self.camera_tracker = None
+        self.tracked_result = None
+
+    def init_region(self, frame: np.ndarray):
+        """Method to set the tracking region from the size of the first frame"""
+
+        if not self.region_initialized:
+            if isinstance(self.region, TrackingRegion):
+                self.region = self.region.to_region(frame.shape[1], frame.shape[0])
+
+    def extract_tracks(self, im0: np.ndarray):
+        """Method to extract tracks of a frame, using the ones already tracked by count_batch
+        if any, otherwise tracking the frame with the model."""
+
+        if self.tracked_result is None:
+            super().extract_tracks(im0)
+            return
+
+        with self.profilers[0]:
+            self.tracks = self.tracked_result
+            self.track_data = self.tracks.boxes
+        if self.track_data and self.track_data.is_track:
+            self.boxes = self.track_data.xyxy.cpu()
+            self.clss = self.track_data.cls.cpu().tolist()
+            self.track_ids = self.track_data.id.int().cpu().tolist()
+            self.confs = self.track_data.conf.cpu().tolist()
+        else:
+            self.boxes, self.clss, self.track_ids, self.confs = [], [], [], []
+        # Forget tracks removed by the camera tracker, not to grow the history of long streams
+        self.forget_tracks([track.track_id for track in self.camera_tracker.removed_stracks_frame])
+
+    def new_camera_state(self, region: list[tuple[int, int]] | TrackingRegion) -> dict:
+        """Method returning the initial counting state of a camera, with its own tracker,
+        to count several cameras with the same model through count_batch."""
 
-    def process_frames(self, frames: list[np.ndarray]) -> dict:
+        # Trackers are imported on demand, as ultralytics does, due to their extra dependencies
+        from ultralytics.trackers.track import TRACKER_MAP
+
+        tracker_cfg = IterableSimpleNamespace(**YAML.load(check_yaml(self.CAMERA_TRACKER_CONFIG)))
+        return {
+            "region": region,
+            "region_initialized": False,
+            "r_s": None,
+            "track_history": defaultdict(list),
+            "counted_ids": set(),
+            "classwise_count": defaultdict(lambda: {"IN": 0, "OUT": 0}),
+            "in_count": 0,
+            "out_count": 0,
+            "tracker": TRACKER_MAP[tracker_cfg.tracker_type](args=tracker_cfg),
+        }
+
+    def count_batch(self, frames: list[np.ndarray], camera_states: list[dict]) -> list[dict]:
         """
-        Processes a single frame.
+        Counts objects in one frame of several cameras, running the model once on all the frames.
         Args:
-            frame (np.ndarray): Input frame.
+            frames (list[np.ndarray]): Next frame of each camera.
+            camera_states (list[dict]): Counting state of each camera, see new_camera_state.
+                                        It is updated with the tracks of the frame.
         Returns:
-            np.ndarray: Processed frame.
+            list[dict]: Classwise counts of each camera after its frame.
         """
 
-        # If region is not initialized, set it to the first frame size
-        if not self.region_initialized:
-            if isinstance(self.region, TrackingRegion):
-                self.region = self.region.to_region(frames[0].shape[1], frames[0].shape[0])
+        results = self.model.predict(
+            source=list(frames), classes=self.classes, verbose=False, **self.track_add_args
+        )
+
+        counts = []
+        for frame, result, camera_state in zip(frames, results, camera_states):
+            tracker = camera_state["tracker"]
+            detections = result.boxes.cpu().numpy()
+            if len(tracks := tracker.update(detections, frame)):
+                result = result[tracks[:, -1].astype(int)]
+                result.update(boxes=torch.as_tensor(tracks[:, :-1]))
+
+            # Count the tracked objects with the state of the camera
+            for attribute in self.CAMERA_STATE_ATTRIBUTES:
+                setattr(self, attribute, camera_state[attribute])
+            self.camera_tracker, self.tracked_result = tracker, result
+            try:
+                self.init_region(frame)
+                counts.append(copy.deepcopy(self(frame).classwise_count))
+            finally:
+                self.camera_tracker, self.tracked_result = None, None
+                for attribute in self.CAMERA_STATE_ATTRIBUTES:
+                    camera_state[attribute] = getattr(self, attribute)
+        return counts
+
+    def iter_counts(self, frames: Iterable[np.ndarray]) -> Iterator[dict]:
+        """
+        Tracks and counts objects frame by frame, as frames are consumed.
+        Args:
+            frames (Iterable[np.ndarray]): Input frames, e.g. a list or a frames generator.
+        Yields:
+            dict: Classwise counts after each processed frame.
+        """
+
+        for frame in frames:
+            # If region is not initialized, set it to the first frame size
+            self.init_region(frame)
+            results = self(frame)
+            yield copy.deepcopy(results.classwise_count)
+
+    def process_frames(self, frames: Iterable[np.ndarray]) -> dict:
+        """
+        Processes a sequence of frames, without keeping them in memory.
+        Args:
+            frames (Iterable[np.ndarray]): Input frames, e.g. a list or a frames generator.
+        Returns:
+            dict: Classwise counts at the end of the frames.
+        """
 
+        results = None
         for frame in frames:
+            # If region is not initialized, set it to the first frame size
+            self.init_region(frame)
             results = self(frame)
 
         # It will track the objects and count them at the end of the video
         # Result is in the form of a dictionary of classwise counts
-        return results.classwise_count
+        return results.classwise_count if results is not None else {}
+
+    def process_video(self, video_path) -> dict:
+        """Method to count objects in a video file, streaming its frames"""
+
+        logger.info("Running tunnel mode detection on video %s ...", video_path)
+        return self.process_frames(self.get_video_frames(video_path))
 
     def get_video_frames(self, video_path):
-        """Method to get frames from a video file"""
+        """Method to get frames from a video file, decoded in background"""
+
+        return prefetch(self.read_video_frames(video_path, self.frame_stride), self.prefetch_depth)
+
+    @staticmethod
+    def read_video_frames(video_path, stride=1):
+        """Method to read one frame every stride frames from a video file.
+        Skipped frames are grabbed without being decoded."""
 
         try:
-            if not (video := cv2.VideoCapture(video_path)).isOpened():
-                logger.error("Error opening video file %s. Aborting.", video_path)
-                return None, None
+            video = cv2.VideoCapture(video_path)
         except FileNotFoundError:
             logger.error("%s is not a valid video path. Aborting.", video_path)
-            return None, None
+            return
 
-        frames = []
-        while video.isOpened():
-            success, im0 = video.read()
+        # Video capture is released also when the consumer stops iterating early
+        try:
+            if not video.isOpened():
+                logger.error("Error opening video file %s. Aborting.", video_path)
+                return
 
-            if not success:
-                break
+            frame_count = 0
+            while video.isOpened():
+                if frame_count % stride:
+                    success, im0 = video.grab(), None
+                else:
+                    success, im0 = video.read()
 
-            frames.append(im0)
+                if not success:
+                    break
 
-        return frames
+                if im0 is not None:
+                    yield im0
+                frame_count += 1
+        finally:
+            video.release()
 
     def process_video_demo(self, video_path, save_detection_image: bool):
         """Method to process video in tunnel mode updating animals counter with frames feedback
@@ -127,14 +287,11 @@ class ObjectCounter(solutions.ObjectCounter):
 
         logger.info("Running tunnel mode detection on video %s ...", video_path)
 
-        frames = self.get_video_frames(video_path)
-
-        # If region is not initialized, set it to the first frame size
-        if not self.region_initialized:
-            if isinstance(self.region, TrackingRegion):
-                self.region = self.region.to_region(frames[0].shape[1], frames[0].shape[0])
+        results = None
+        for i, frame in enumerate(self.get_video_frames(video_path), 1):
+            # If region is not initialized, set it to the first frame size
+            self.init_region(frame)
 
-        for i, frame in enumerate(frames, 1):
             results = self(frame)
             if save_detection_image:
                 # Saving the detection results
@@ -151,4 +308,4 @@ class ObjectCounter(solutions.ObjectCounter):
 
         # It will track the objects and count them at the end of the video
         # Result is in the form of a dictionary of classwise counts
-        return results.classwise_count
+        return results.classwise_count if results is not None else {}
@@ -104,8 +104,36 @@ def compute_iou(box1: list[int], box2: list[int]) -> float:
     return inter_area / union_area
 
 
+def compute_iou_matrix(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """
+    Compute the pairwise Intersection over Union (IoU) of two sets of bounding boxes.
+    Parameters:
+    boxes1 (np.ndarray): An (N, 4) array of bounding boxes in the format [x1, y1, x2, y2].
+    boxes2 (np.ndarray): An (M, 4) array of bounding boxes in the format [x1, y1, x2, y2].
+    Returns:
+    np.ndarray: An (N, M) array with the IoU of each pair of bounding boxes.
+    """
+    boxes1 = np.asarray(boxes1, dtype=np.float64).reshape(-1, 4)
+    boxes2 = np.asarray(boxes2, dtype=np.float64).reshape(-1, 4)
+
+    top_left = np.maximum(boxes1[:, None, :2], boxes2[None, :, :2])
+    bottom_right = np.minimum(boxes1[:, None, 2:], boxes2[None, :, 2:])
+    inter_area = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+
+    boxes1_area = np.prod(boxes1[:, 2:] - boxes1[:, :2], axis=1)
+    boxes2_area = np.prod(boxes2[:, 2:] - boxes2[:, :2], axis=1)
+    union_area = boxes1_area[:, None] + boxes2_area[None, :] - inter_area
+
+    return inter_area / union_area
+
+
 class ObjectTracker:
-    """Tracks objects and smooths their class predictions over time"""
+    """Tracks objects and smooths their class predictions over time.
+    The Kalman state of all the tracks is kept in stacked arrays (one row per track) and
+    updated with a single vectorised step per frame. Results match a KalmanFilter per track
+    position and per class probability: since velocities are never measured and the
+    covariances start diagonal, each filter covariance stays a scaled identity and it is
+    stored as a single variance per track."""
 
     def __init__(
         self,
@@ -125,9 +153,18 @@ class ObjectTracker:
             max_missed (int): The maximum number of missed detections before
                               an object is considered lost.
         """
-        self.trackers = {}  # ObjectID -> (KalmanFilter, KalmanClassSmoother, missed_count)
+        self.trackers = {}  # ObjectID -> row of the track in the state arrays
         self.next_id = 0
 
+        # Tracks state
+        self.states = np.zeros((0, 4), dtype=np.float32)  # Position and speed [x, y, vx, vy]
+        self.sizes = np.zeros((0, 2), dtype=np.float32)  # Box size [h, w]
+        self.position_var = np.zeros(0)  # Position uncertainty
+        self.class_labels = None  # Class names, in class probabilities order
+        self.class_probs = np.zeros((0, 0), dtype=np.float32)  # Smoothed class probabilities
+        self.class_var = np.zeros(0)  # Class probabilities uncertainty
+        self.missed = np.zeros(0, dtype=int)  # Missed detections count
+
         # Kalman filter settings
         self.process_var = process_var
         self.measurement_var = measurement_var
@@ -147,6 +184,18 @@ class ObjectTracker:
 
         return (xyxy[0] + xyxy[2]) / 2, (xyxy[1] + xyxy[3]) / 2
 
+    def track_boxes(self) -> np.ndarray:
+        """
+        Compute the bounding boxes of the tracked objects from their smoothed position.
+        Returns:
+            np.ndarray: An (N, 4) array of bounding boxes in the format [x1, y1, x2, y2].
+        """
+
+        half_sizes = self.sizes[:, ::-1] / 2
+        return np.concatenate(
+            [self.states[:, :2] - half_sizes, self.states[:, :2] + half_sizes], axis=1
+        )
+
     def associate_detections(self, detections: list[dict[any]]) -> dict[int]:
         """
         Associates detected objects with existing trackers using the Hungarian algorithm.
@@ -165,22 +214,14 @@ class ObjectTracker:
         """
 
         if not self.trackers:
-            return {i: self.next_id + i for i in range(len(detections))}  # Assign new IDs
+            matches = {i: self.next_id + i for i in range(len(detections))}  # Assign new IDs
+            self.next_id += len(detections)
+            return matches
 
         # Compute IoU matrix
         track_ids = tuple(self.trackers)
-        track_boxes = []
-        for t in track_ids:
-            h, w = self.trackers[t][0].extra["h"], self.trackers[t][0].extra["w"]
-            x, y, _, __ = self.trackers[t][0].x
-            xyxy = [x - w / 2, y - h / 2, x + w / 2, y + h / 2]
-            track_boxes.append(xyxy)
-        detected_boxes = [det["xyxy"] for det in detections]
-
-        iou_matrix = np.zeros((len(track_boxes), len(detected_boxes)))
-        for i, track_box in enumerate(track_boxes):
-            for j, detected_box in enumerate(detected_boxes):
-                iou_matrix[i, j] = compute_iou(track_box, detected_box)
+        detected_boxes = np.array([det["xyxy"] for det in detections], dtype=np.float64)
+        iou_matrix = compute_iou_matrix(self.track_boxes(), detected_boxes)
 
         # Hungarian algorithm for optimal assignment
         row_ind, col_ind = linear_sum_assignment(-iou_matrix)
@@ -194,13 +235,38 @@ class ObjectTracker:
                 matches[c] = self.next_id
                 self.next_id += 1
 
+        assigned = set(col_ind.tolist())
         for j in range(len(detected_boxes)):
-            if j not in col_ind:
+            if j not in assigned:
                 matches[j] = self.next_id
                 self.next_id += 1
 
         return matches
 
+    @staticmethod
+    def kalman_step(
+        states: np.ndarray,
+        variances: np.ndarray,
+        measurements: np.ndarray,
+        process_var: float,
+        measurement_var: float,
+    ):
+        """
+        Run in place a Kalman update of stacked filters whose covariance is a scaled identity.
+        Args:
+            states (np.ndarray): An (N, D) array with the state of each filter.
+            variances (np.ndarray): An (N,) array with the variance of each filter.
+            measurements (np.ndarray): An (N, D) array with the measurement of each filter.
+            process_var (float): The process variance.
+            measurement_var (float): The measurement variance.
+        """
+
+        variances += process_var
+        gains = variances * (1 / (variances + measurement_var))
+        estimates = states.astype(np.float64)
+        states[:] = estimates + gains[:, None] * (measurements - estimates)
+        variances *= 1 - gains
+
     def update(self, detections: list[dict[any]], img_size: tuple[int]) -> list[dict[any]]:
         """
         Updates the object tracker with the given detections.
@@ -218,117 +284,88 @@ class ObjectTracker:
         frame_width, frame_height = img_size
         # Compute the detections
         matches = self.associate_detections(detections)
-
-        updated_tracks = []
-        for det_idx, obj_id in matches.items():
-            xyxy = detections[det_idx]["xyxy"]
-            class_probs = detections[det_idx]["class_probs"]
-
-            # Compute centroid
-            x, y = self.compute_centroid(xyxy)
-            h, w = xyxy[3] - xyxy[1], xyxy[2] - xyxy[0]
-
-            if obj_id not in self.trackers:
-                self.trackers[obj_id] = (
-                    KalmanFilter(
-                        [x, y, 0, 0], self.process_var, self.measurement_var, extra={"h": h, "w": w}
-                    ),  # Position tracker with speed
-                    {
-                        cls: KalmanFilter(
-                            [p, 0], self.class_process_var, self.class_measurement_var
-                        )
-                        for cls, p in class_probs.items()
-                    },  # Class smoothers
-                    0,  # Missed count
-                )
-            else:
-                self.trackers[obj_id][0].extra = {"h": h, "w": w}
-                self.trackers[obj_id] = (
-                    self.trackers[obj_id][0],
-                    self.trackers[obj_id][1],
-                    0,
-                )  # Reset missed count
-
-            # Update position
-            position_filter = self.trackers[obj_id][0]
-            smoothed_pos = position_filter.update([x, y])
-
-            # Convert smoothed_pos to xyxy
-            smoothed_pos = [
-                smoothed_pos[0] - w / 2,
-                smoothed_pos[1] - h / 2,
-                smoothed_pos[0] + w / 2,
-                smoothed_pos[1] + h / 2,
-            ]
-
-            # Convert to int
-            smoothed_pos = [int(p) for p in smoothed_pos]
-
-            # Update classification
-            class_filters = self.trackers[obj_id][1]
-            smoothed_probs = {
-                cls: class_filters[cls].update([p])[0] for cls, p in class_probs.items()
+        obj_ids = list(matches.values())
+        matched_detections = [detections[det_idx] for det_idx in matches]
+        if matched_detections and self.class_labels is None:
+            self.class_labels = tuple(matched_detections[0]["class_probs"])
+            self.class_probs = np.zeros((0, len(self.class_labels)), dtype=np.float32)
+
+        # Compute centroids, sizes and class probabilities of the detections
+        xyxy = np.array([det["xyxy"] for det in matched_detections], dtype=np.float64)
+        xyxy = xyxy.reshape(-1, 4)
+        centroids = (xyxy[:, :2] + xyxy[:, 2:]) / 2
+        sizes = np.stack([xyxy[:, 3] - xyxy[:, 1], xyxy[:, 2] - xyxy[:, 0]], axis=1)
+        class_probs = np.array(
+            [[det["class_probs"][cls] for cls in self.class_labels] for det in matched_detections],
+            dtype=np.float64,
+        ).reshape(len(matched_detections), self.class_probs.shape[1])
+
+        # Add a row for each new track, with speed and class probabilities speed set to 0
+        new_tracks = [idx for idx, obj_id in enumerate(obj_ids) if obj_id not in self.trackers]
+        for idx in new_tracks:
+            self.trackers[obj_ids[idx]] = len(self.trackers)
+        new_states = np.zeros((len(new_tracks), 4), dtype=np.float32)
+        new_states[:, :2] = centroids[new_tracks]
+        self.states = np.concatenate([self.states, new_states])
+        self.sizes = np.concatenate([self.sizes, np.zeros((len(new_tracks), 2), np.float32)])
+        self.position_var = np.concatenate([self.position_var, np.full(len(new_tracks), 100.0)])
+        self.class_probs = np.concatenate(
+            [self.class_probs, class_probs[new_tracks].astype(np.float32)]
+        )
+        self.class_var = np.concatenate([self.class_var, np.full(len(new_tracks), 100.0)])
+        self.missed = np.concatenate([self.missed, np.zeros(len(new_tracks), dtype=int)])
+
+        # Reset missed count of matched trackers and increment it for unmatched ones
+        track_ids = list(self.trackers)
+        matched_rows = np.array([self.trackers[obj_id] for obj_id in obj_ids], dtype=int)
+        is_matched = np.zeros(len(track_ids), dtype=bool)
+        is_matched[matched_rows] = True
+        self.sizes[matched_rows] = sizes
+        self.missed[matched_rows] = 0
+        self.missed[~is_matched] += 1
+        # Unmatched tracked objects are processed until they are lost
+        unmatched_rows = np.flatnonzero(~is_matched & (self.missed <= self.max_missed))
+        rows = np.concatenate([matched_rows, unmatched_rows])
+        num_matched = len(matched_rows)
+
+        # Update position, unmatched objects are measured at their predicted position
+        states = self.states[rows]
+        states[:, :2] += states[:, 2:]
+        position_var = self.position_var[rows]
+        self.kalman_step(
+            states[:, :2],
+            position_var,
+            np.concatenate([centroids, states[num_matched:, :2]]),
+            self.process_var,
+            self.measurement_var,
+        )
+
+        # Update classification, unmatched objects keep their smoothed class probabilities
+        probs = self.class_probs[rows]
+        class_var = self.class_var[rows]
+        self.kalman_step(
+            probs,
+            class_var,
+            np.concatenate([class_probs, probs[num_matched:]]),
+            self.class_process_var,
+            self.class_measurement_var,
+        )
+
+        # Remove lost tracks, keeping the remaining ones in output order
+        ids = [*obj_ids, *(track_ids[row] for row in unmatched_rows)]
+        self.trackers = {obj_id: row for row, obj_id in enumerate(ids)}
+        self.states, self.sizes, self.position_var = states, self.sizes[rows], position_var
+        self.class_probs, self.class_var, self.missed = probs, class_var, self.missed[rows]
+
+        # Convert smoothed positions to xyxy
+        smoothed_pos = self.track_boxes().astype(int).tolist()
+        # Build classification results
+        best_classes = np.argmax(probs, axis=1) if len(ids) else []
+        return [
+            {
+                "id": obj_id,
+                "classification": (self.class_labels[best_class], probs[row, best_class]),
+                "xyxy": smoothed_pos[row],
             }
-
-            # Build classification result
-            logits = np.array(list(smoothed_probs.values()))
-            labels = tuple(smoothed_probs)
-            classification_result = labels[np.argmax(logits)], max(logits)
-
-            updated_tracks.append(
-                {"id": obj_id, "classification": classification_result, "xyxy": smoothed_pos}
-            )
-
-        # Increment missed count for unmatched trackers
-        for obj_id in self.trackers:
-            if obj_id not in [track["id"] for track in updated_tracks]:
-                self.trackers[obj_id] = (
-                    self.trackers[obj_id][0],
-                    self.trackers[obj_id][1],
-                    self.trackers[obj_id][2] + 1,
-                )
-                if self.trackers[obj_id][2] <= self.max_missed:
-                    # Process unmatched tracked objects
-                    position_filter = self.trackers[obj_id][0]
-                    smoothed_pos = position_filter.update(position_filter.x[:2])
-
-                    # Convert smoothed_pos to xyxy
-                    h, w = position_filter.extra["h"], position_filter.extra["w"]
-                    smoothed_pos = [
-                        smoothed_pos[0] - w / 2,
-                        smoothed_pos[1] - h / 2,
-                        smoothed_pos[0] + w / 2,
-                        smoothed_pos[1] + h / 2,
-                    ]
-
-                    # Convert to int
-                    smoothed_pos = [int(p) for p in smoothed_pos]
-
-                    # Update classification
-                    class_filters = self.trackers[obj_id][1]
-                    smoothed_probs = {
-                        cls: class_filters[cls].update([class_filters[cls].x[0]])[0]
-                        for cls in class_filters
-                    }
-
-                    # Build classification result
-                    logits = np.array(list(smoothed_probs.values()))
-                    labels = tuple(smoothed_probs)
-                    classification_result = labels[np.argmax(logits)], max(logits)
-
-                    updated_tracks.append(
-                        {
-                            "id": obj_id,
-                            "classification": classification_result,
-                            "xyxy": smoothed_pos,
-                        }
-                    )
-
-        # Remove lost tracks
-        self.trackers = {
-            k["id"]: self.trackers[k["id"]]
-            for k in updated_tracks
-            if self.trackers[k["id"]][2] <= self.max_missed
-        }
-
-        return updated_tracks
+            for row, (obj_id, best_class) in enumerate(zip(ids, best_classes))
+        ]
@@ -18,7 +18,10 @@
 # Description: Module containing OpenVino class and methods.
 
 
+import logging
 import os
+import threading
+from concurrent.futures import Future
 
 import openvino as ov
 import openvino.properties as props
@@ -26,32 +29,145 @@ import torch
 import wadas_runtime as wadas
 from huggingface_hub import snapshot_download
 
+logger = logging.getLogger(__name__)
+
 core = ov.Core()
 core.set_property({props.cache_dir: "cache"})
 
 __model_folder__ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "model")
 
 
+PERFORMANCE_HINTS = ("LATENCY", "THROUGHPUT", "CUMULATIVE_THROUGHPUT")
+# Performance profile structure applied to compiled models:
+# {
+#    "performance_hint": <one of PERFORMANCE_HINTS>,
+#    "num_streams": <number of parallel execution streams, 0 lets OpenVINO decide>,
+#    "inference_num_threads": <number of CPU inference threads, 0 lets OpenVINO decide>,
+#    "enable_cpu_pinning": <pin inference threads to CPU cores, None lets OpenVINO decide>,
+# }
+DEFAULT_PERFORMANCE_PROFILE = {
+    "performance_hint": "LATENCY",
+    "num_streams": 0,
+    "inference_num_threads": 0,
+    "enable_cpu_pinning": None,
+}
+
+
+def get_ov_config(performance_profile: dict | None, device: str) -> dict[str, str]:
+    """Build the OpenVINO compile configuration out of a performance profile"""
+    profile = {**DEFAULT_PERFORMANCE_PROFILE, **(performance_profile or {})}
+    if (hint := str(profile["performance_hint"]).upper()) not in PERFORMANCE_HINTS:
+        raise ValueError(f"Invalid performance hint: {hint}")
+
+    config = {"PERFORMANCE_HINT": hint}
+    if profile["num_streams"]:
+        config["NUM_STREAMS"] = str(profile["num_streams"])
+    # Threading properties are only supported by the CPU plugin
+    if device.upper() == "CPU":
+        if profile["inference_num_threads"]:
+            config["INFERENCE_NUM_THREADS"] = str(profile["inference_num_threads"])
+        if profile["enable_cpu_pinning"] is not None:
+            config["ENABLE_CPU_PINNING"] = "YES" if profile["enable_cpu_pinning"] else "NO"
+    return config
+
+
+def get_static_batch_size(compiled_model) -> int | None:
+    """Return the batch size a compiled model was exported with, None if it is dynamic"""
+    batch_dim = compiled_model.inputs[0].get_partial_shape()[0]
+    return batch_dim.get_length() if batch_dim.is_static else None
+
+
 class OVModel:
-    def __init__(self, model_name, device):
-        """Base class for OpenVino models"""
+    def __init__(self, model_name, device, num_requests=0, performance_profile=None):
+        """Base class for OpenVino models
+        Args:
+            model_name (str): Path of the model, relative to the model folder.
+            device (str): OpenVINO device to compile the model on.
+            num_requests (int, optional): Number of asynchronous infer requests in the pool.
+                0 means the optimal number reported by the compiled model.
+            performance_profile (dict, optional): Performance profile to compile the model with,
+                see DEFAULT_PERFORMANCE_PROFILE.
+        """
         self.device = device
         self.model = wadas.load_and_compile_model(
             os.path.join(__model_folder__, model_name),
             device_name=device.upper(),
+            config=get_ov_config(performance_profile, device),
         )
+        self.max_batch_size = get_static_batch_size(self.model)
+        self.num_requests = num_requests
+        self.infer_queue = None
+        self.infer_queue_lock = threading.Lock()
 
     def get_available_device(self):
         """Get available devices"""
         return core.available_devices
 
-    def __call__(self, input: torch.Tensor) -> torch.Tensor | list[torch.Tensor]:
-        """Run model"""
-        results = [torch.tensor(t) for t in self.model(input).values()]
+    @staticmethod
+    def _to_tensors(outputs) -> torch.Tensor | list[torch.Tensor]:
+        """Convert model outputs to torch tensors, copying them out of OpenVINO buffers"""
+        results = [torch.tensor(t) for t in outputs.values()]
         if len(results) == 1:
             return results[0]
         return results
 
+    def create_infer_queue(self, num_requests: int = 0):
+        """Create the pool of asynchronous infer requests used by submit()"""
+        if not num_requests:
+            num_requests = self.model.get_property(props.optimal_number_of_infer_requests)
+        logger.debug("Creating OpenVINO infer queue with %s request(s).", num_requests)
+        self.infer_queue = ov.AsyncInferQueue(self.model, num_requests)
+        self.infer_queue.set_callback(self._on_request_completed)
+        self.num_requests = num_requests
+
+    def _on_request_completed(self, request, userdata):
+        """Completion callback of the infer queue, resolving the future of the request"""
+        future, callback = userdata
+        try:
+            results = self._to_tensors(request.results)
+            if callback:
+                callback(results)
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(results)
+
+    def submit(self, input: torch.Tensor, callback=None) -> Future:
+        """Run model asynchronously on the infer queue.
+        Blocks only while all the infer requests of the pool are busy.
+        Args:
+            input (torch.Tensor): Model input.
+            callback (callable, optional): Function called with the model outputs as soon as
+                the inference completes. It runs on an OpenVINO thread.
+        Returns:
+            Future: Future resolved with the model outputs.
+        """
+        with self.infer_queue_lock:
+            if self.infer_queue is None:
+                self.create_infer_queue(self.num_requests)
+            future = Future()
+            self.infer_queue.start_async(input, (future, callback))
+        return future
+
+    def wait_all(self):
+        """Wait for all the submitted inferences to complete"""
+        if self.infer_queue is not None:
+            self.infer_queue.wait_all()
+
+    def __call__(self, input: torch.Tensor) -> torch.Tensor | list[torch.Tensor]:
+        """Run model"""
+        if self.max_batch_size and input.shape[0] > self.max_batch_size:
+            # Model has a static batch dimension, run the chunks in parallel on the infer queue
+            futures = [self.submit(chunk) for chunk in torch.split(input, self.max_batch_size)]
+            chunks = [future.result() for future in futures]
+            if isinstance(chunks[0], torch.Tensor):
+                return torch.cat(chunks, dim=0)
+            return [torch.cat(outputs, dim=0) for outputs in zip(*chunks)]
+        if self.infer_queue is not None:
+            # Infer requests of the pool are shared by concurrent callers
+            return self.submit(input).result()
+        return self._to_tensors(self.model(input))
+
     @staticmethod
     def check_model(model_name):
         """Check if model is initialized"""
@@ -8,18 +8,22 @@ from ultralytics.models.yolo.detect import DetectionPredictor
 from ultralytics.nn.autobackend import AutoBackend
 from ultralytics.utils.torch_utils import select_device
 
-from wadas.ai.openvino_model import __model_folder__
+from wadas.ai.openvino_model import (
+    __model_folder__,
+    get_ov_config,
+    get_static_batch_size,
+)
 
 # Silence ultralytics logger
 logging.getLogger("ultralytics").setLevel(logging.ERROR)
 
 
-def load_ov_model(weights, device, inference_mode="LATENCY"):
+def load_ov_model(weights, device, performance_profile=None):
     w = str(weights[0] if isinstance(weights, list) else weights)
     w = Path(w)
     if not w.is_file():  # if not *.xml
         w = next(w.glob("*.xml"))  # get *.xml file from *_openvino_model dir
-    config = {"PERFORMANCE_HINT": inference_mode}
+    config = get_ov_config(performance_profile, device)
     return wadas.load_and_compile_model(str(w), str(w.with_suffix(".bin")), device, config)
 
 
@@ -36,20 +40,31 @@ class OVBackend(AutoBackend):
         batch=1,
         fuse=True,
         verbose=True,
+        performance_profile=None,
     ):
         super().__init__(weights, torch.device(device), dnn, data, fp16, batch, fuse, verbose)
         w = str(weights[0] if isinstance(weights, list) else weights)
         w = Path(w)
         if not w.is_file():  # if not *.xml
             w = next(w.glob("*.xml"))  # get *.xml file from *_openvino_model dir
-        self.inference_mode = "LATENCY"
-        self.ov_compiled_model = load_ov_model(w, ov_device, self.inference_mode)
+        # Throughput hints make ultralytics dispatch batch images to parallel infer requests
+        self.inference_mode = get_ov_config(performance_profile, ov_device)["PERFORMANCE_HINT"]
+        self.ov_compiled_model = load_ov_model(w, ov_device, performance_profile)
+
+    @property
+    def max_batch_size(self):
+        """Maximum number of images the compiled model accepts per inference, None if unbounded"""
+        if self.inference_mode != "LATENCY":
+            # Throughput modes dispatch each image of the batch to its own infer request
+            return None
+        return get_static_batch_size(self.ov_compiled_model)
 
 
 class OVPredictor(DetectionPredictor):
-    def __init__(self, *args, ov_device="AUTO", **kwargs):
+    def __init__(self, *args, ov_device="AUTO", performance_profile=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.ov_device = ov_device
+        self.performance_profile = performance_profile
 
     def setup_model(self, model, verbose):
         model = os.path.join(__model_folder__, model)
@@ -63,6 +78,7 @@ class OVPredictor(DetectionPredictor):
             batch=self.args.batch,
             fuse=True,
             verbose=verbose,
+            performance_profile=self.performance_profile,
         )
 
         self.device = self.model.device  # update device
@@ -30,6 +30,7 @@ from wadas.ai.models import (
     OVMegaDetectorV6YOLO10,
     txt_animalclasses,
 )
+from wadas.ai.utils import split_in_batches
 
 logger = logging.getLogger(__name__)
 
@@ -50,10 +51,18 @@ class DetectionPipeline:
         language="en",
         distributed_inference=False,
         megadetector_version="MDV5-yolov5",
+        detection_batch_size=8,
+        classification_batch_size=32,
+        detection_performance_profile=None,
+        classification_performance_profile=None,
+        classification_fast_preprocessing=False,
     ):
         self.detection_device = detection_device
         self.classification_device = classification_device
         self.distributed_inference = distributed_inference
+        self.detection_batch_size = max(int(detection_batch_size), 1)
+        # Zero disables cross-image batching: crops are classified one image at a time
+        self.classification_batch_size = max(int(classification_batch_size), 0)
         if self.distributed_inference:
             ray.init()
 
@@ -63,11 +72,19 @@ class DetectionPipeline:
             raise ValueError("Invalid MegaDetector version: " + megadetector_version)
 
         self.detection_model = self.initialize_model(
-            detection_csl, device=self.detection_device, model_name=megadetector_version
+            detection_csl,
+            device=self.detection_device,
+            model_name=megadetector_version,
+            performance_profile=detection_performance_profile,
         )
         # Load classification model
         logger.info("Loading classification model to device %s...", self.classification_device)
-        self.classifier = self.initialize_model(Classifier, device=self.classification_device)
+        self.classifier = self.initialize_model(
+            Classifier,
+            device=self.classification_device,
+            performance_profile=classification_performance_profile,
+            fast_preprocessing=classification_fast_preprocessing,
+        )
         # Get the index of the animal class of the detection model
         self.animal_class_idx = next(
             key for key, value in OVMegaDetectorV5.CLASS_NAMES.items() if value == "animal"
@@ -89,6 +106,15 @@ class DetectionPipeline:
             result = func(*args, **kwargs)
         return ray.get(result) if self.distributed_inference else result
 
+    def enable_concurrent_inference(self, num_requests: int = 0):
+        """Method to allow detection and classification to be run from several threads at once,
+        sharing the compiled models through a pool of infer requests."""
+        if self.distributed_inference:
+            # Remote models already process one call at a time
+            return
+        self.detection_model.enable_concurrent_inference(num_requests)
+        self.classifier.enable_concurrent_inference(num_requests)
+
     def set_language(self, language):
         if language not in txt_animalclasses:
             raise ValueError("Language not supported")
@@ -126,11 +152,14 @@ class DetectionPipeline:
         else:
             img_array = [np.array(img)]
 
-        # Performing the detection on the list of images
-        results_lst = self.run_model(
-            self.detection_model.run, img_array, detection_threshold=detection_threshold
+        # Performing the detection on batches of images, one inference call per batch
+        batches = list(split_in_batches(img_array, self.detection_batch_size))
+        batch_results_lst = self.run_model(
+            self.detection_model.run_batch, batches, detection_threshold=detection_threshold
         )
 
+        results_lst = [results for batch_results in batch_results_lst for results in batch_results]
+
         for results in results_lst:
             # Checks for non animal in results and filter them out
             animal_idx = np.where(results["detections"].class_id == self.animal_class_idx)
@@ -164,7 +193,15 @@ class DetectionPipeline:
 
         class_request = tuple(zip(img, results))
 
-        logits_lst = self.run_model(self.classifier.predictOnImages, class_request)
+        if self.classification_batch_size:
+            # Crops of all the images are classified together in fixed size batches
+            (logits_lst,) = self.run_model(
+                self.classifier.predictOnImagesBatched,
+                [class_request],
+                batch_size=self.classification_batch_size,
+            )
+        else:
+            logits_lst = self.run_model(self.classifier.predictOnImages, class_request)
         labels = txt_animalclasses[self.language]
         total_classification = []
         for logits, res in zip(logits_lst, results):
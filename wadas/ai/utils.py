@@ -0,0 +1,85 @@
+# This file is part of WADAS project.
+#
+# WADAS is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# WADAS is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with WADAS. If not, see <https://www.gnu.org/licenses/>.
+#
+# Author(s): Stefano Dell'Osa, Alessandro Palla, Cesare Di Mauro, Antonio Farina
+# Date: 2026-10-18
+# Description: Module containing AI related utility functions.
+
+import threading
+from itertools import islice
+from queue import Full, Queue
+
+_END_OF_ITEMS = object()
+
+
+def split_in_batches(items, batch_size: int):
+    """Split an iterable in consecutive lists of at most batch_size elements"""
+
+    iterator = iter(items)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def prefetch(items, depth: int):
+    """Iterate over an iterable from a background thread, buffering up to depth items ahead
+    of the consumer. Useful to overlap I/O bound producers (e.g. video decoding, which releases
+    the GIL) with model inference. A depth of 0 iterates in the calling thread.
+    """
+
+    if depth <= 0:
+        yield from items
+        return
+
+    buffer = Queue(maxsize=depth)
+    stopped = threading.Event()
+
+    def put(item):
+        # Wait for a free slot, giving up when the consumer stops iterating
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+        except Exception as e:
+            put((_END_OF_ITEMS, e))
+        else:
+            put((_END_OF_ITEMS, None))
+        finally:
+            # Release the resources held by the items source (e.g. a video capture) as soon as
+            # iteration ends, also when the consumer stops early
+            if close := getattr(items, "close", None):
+                close()
+
+    producer = threading.Thread(target=produce, name="prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is _END_OF_ITEMS:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stopped.set()
+        producer.join()
@@ -19,7 +19,9 @@
 
 import datetime
 import logging
+import time
 from abc import abstractmethod
+from collections import deque
 from enum import Enum
 from queue import Empty, Queue
 
@@ -32,6 +34,8 @@ class Actuator:
     """Base class of an actuator."""
 
     actuators = {}
+    # Callables notified of actuators activity, i.e. commands sent or fetched
+    activity_listeners = set()
 
     class ActuatorTypes(Enum):
         ROADSIGN = "Road Sign"
@@ -44,19 +48,40 @@ class Actuator:
         self.enabled = enabled
         self.stop_thread = False
         self.type = None
+        # Callables notified when a command is inserted into the queue, e.g. to wake up
+        # long-polling actuators
+        self.command_listeners = set()
+        # Time each queued command was sent, to measure how long it takes to be delivered
+        self.command_times = deque()
+        self.last_command_latency = None
+
+    @classmethod
+    def notify_activity(cls):
+        """Method to notify actuators activity to the listeners"""
+
+        for listener in list(cls.activity_listeners):
+            listener()
 
     def send_command(self, cmd: Enum):
         """Method to insert a command into the actuator queue"""
 
+        self.command_times.append(time.monotonic())
         self.cmd_queue.put(cmd.value)
+        for listener in list(self.command_listeners):
+            listener()
+        Actuator.notify_activity()
 
     def get_command(self):
         """Method to get the last command of the queue"""
         self.last_update = datetime.datetime.now()
+        Actuator.notify_activity()
         try:
-            return self.cmd_queue.get(block=False)
+            cmd = self.cmd_queue.get(block=False)
         except Empty:
             return None  # if there are no commands, return None
+        if self.command_times:
+            self.last_command_latency = time.monotonic() - self.command_times.popleft()
+        return cmd
 
     @abstractmethod
     def actuate(self, actuation_event: ActuationEvent):
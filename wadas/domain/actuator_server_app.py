@@ -17,8 +17,12 @@
 # Date: 2024-10-23
 # Description: FASTAPI app for HTTPS Actuator Server
 
+import asyncio
 import json
 import logging
+import threading
+import time
+from collections import deque
 
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import JSONResponse
@@ -33,15 +37,138 @@ app = FastAPI(docs_url=None, redoc_url=None, openapi_url=None)
 app.add_middleware(CORSMiddleware, allow_origins=["*"])
 
 
+# Maximum time, in seconds, an actuator request can wait for a command
+MAX_COMMAND_WAIT = 60
+
+
+class ActuatorServerMetrics:
+    """Counters of the requests served to actuators, to size the actuator server"""
+
+    # Number of most recent command delivery latencies percentiles are computed on
+    max_latencies = 10000
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Reset server counters"""
+
+        with self.lock:
+            self.stats = {
+                "requests": 0,
+                "unknown_actuator_requests": 0,
+                "commands_delivered": 0,
+                "long_polls": 0,
+                "long_poll_timeouts": 0,
+                "waiting_actuators": 0,
+                "handler_cpu_time": 0.0,
+            }
+            self.latencies = deque(maxlen=self.max_latencies)
+
+    def record_request(self, cpu_time, known_actuator=True):
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["handler_cpu_time"] += cpu_time
+            if not known_actuator:
+                self.stats["unknown_actuator_requests"] += 1
+
+    def record_delivery(self, latency):
+        with self.lock:
+            self.stats["commands_delivered"] += 1
+            if latency is not None:
+                self.latencies.append(latency)
+
+    def record_wait(self, started=True, timed_out=False):
+        with self.lock:
+            if started:
+                self.stats["long_polls"] += 1
+                self.stats["waiting_actuators"] += 1
+            else:
+                self.stats["waiting_actuators"] -= 1
+                self.stats["long_poll_timeouts"] += timed_out
+
+    def get_stats(self):
+        """Return a snapshot of server counters, along with the average handler CPU time per
+        request and the percentiles of command delivery latency, in seconds"""
+
+        with self.lock:
+            stats = dict(self.stats)
+            latencies = sorted(self.latencies)
+        stats["handler_cpu_time_per_request"] = (
+            stats["handler_cpu_time"] / stats["requests"] if stats["requests"] else 0.0
+        )
+        for name, percentile in (("p50", 0.5), ("p99", 0.99)):
+            stats[f"delivery_latency_{name}"] = (
+                latencies[min(int(percentile * len(latencies)), len(latencies) - 1)]
+                if latencies
+                else None
+            )
+        stats["delivery_latency_max"] = latencies[-1] if latencies else None
+        return stats
+
+
+metrics = ActuatorServerMetrics()
+
+
+async def wait_for_command(actuator: Actuator, timeout: float):
+    """Method to wait up to timeout seconds for a command to be sent to an actuator,
+    without polling its queue. Returns None if no command is sent meanwhile."""
+
+    loop = asyncio.get_running_loop()
+    command_sent = asyncio.Event()
+
+    def on_command():
+        # Commands are sent from detection threads
+        loop.call_soon_threadsafe(command_sent.set)
+
+    actuator.command_listeners.add(on_command)
+    metrics.record_wait()
+    timed_out = False
+    try:
+        # Check again for commands sent before listening
+        if cmd := actuator.get_command():
+            return cmd
+        await asyncio.wait_for(command_sent.wait(), timeout)
+    except asyncio.TimeoutError:
+        timed_out = True
+        return None
+    finally:
+        actuator.command_listeners.discard(on_command)
+        metrics.record_wait(started=False, timed_out=timed_out)
+    return actuator.get_command()
+
+
 @app.get("/api/v1/actuators/{actuator_id}")
-async def get_actuator_command(actuator_id: str):
-    """Method to give a command to an actuator when requested."""
+async def get_actuator_command(actuator_id: str, wait: float = 0):
+    """Method to give a command to an actuator when requested.
+    If wait is provided the request is held (long polling) up to wait seconds until a command
+    is available, so that actuators get commands as soon as they are sent."""
     logger.info("Connected remote actuator with ID: %s", actuator_id)
+    start_cpu_time = time.thread_time()
 
     if actuator_id in Actuator.actuators:
-        cmd = Actuator.actuators[actuator_id].get_command()
-        return JSONResponse(content=json.loads(cmd) if cmd else {"cmd": None}, status_code=200)
+        actuator = Actuator.actuators[actuator_id]
+        cmd = actuator.get_command()
+        if not cmd and wait > 0:
+            # CPU time is not accounted while waiting, as other requests are served meanwhile
+            cpu_time = time.thread_time() - start_cpu_time
+            cmd = await wait_for_command(actuator, min(wait, MAX_COMMAND_WAIT))
+            start_cpu_time = time.thread_time() - cpu_time
+        if cmd:
+            metrics.record_delivery(actuator.last_command_latency)
+        response = JSONResponse(content=json.loads(cmd) if cmd else {"cmd": None}, status_code=200)
+        metrics.record_request(time.thread_time() - start_cpu_time)
+        return response
 
     else:
         logger.info("No actuator found with ID: %s", actuator_id)
+        metrics.record_request(time.thread_time() - start_cpu_time, known_actuator=False)
         raise HTTPException(status_code=404, detail="Actuator does not exist")
+
+
+@app.get("/api/v1/metrics")
+async def get_metrics():
+    """Method to give actuator server metrics, see ActuatorServerMetrics."""
+
+    return JSONResponse(content=metrics.get_stats(), status_code=200)
@@ -20,6 +20,7 @@
 import logging
 import os
 from collections import defaultdict
+from enum import Enum
 from pathlib import Path
 
 import cv2
@@ -30,6 +31,8 @@ from PytorchWildlife import utils as pw_utils
 
 from wadas.ai import DetectionPipeline
 from wadas.ai.object_tracker import ObjectTracker
+from wadas.ai.openvino_model import DEFAULT_PERFORMANCE_PROFILE
+from wadas.ai.utils import prefetch, split_in_batches
 
 logger = logging.getLogger(__name__)
 ImageFile.LOAD_TRUNCATED_IMAGES = True
@@ -39,15 +42,28 @@ module_dir_path = Path(__file__).resolve().parent
 class AiModel:
     """Class containing AI Model functionalities (detection & classification)"""
 
+    class VideoSamplingStrategies(Enum):
+        READ = "read"  # Decode every frame, keeping one every downsample
+        GRAB = "grab"  # Grab skipped frames without decoding them
+        SEEK = "seek"  # Seek directly to the kept frames
+
     detection_device = "auto"
     classification_device = "auto"
     classification_threshold = 0.5
     detection_threshold = 0.5
     language = "en"
     video_fps = 1
+    video_sampling_strategy = VideoSamplingStrategies.GRAB
+    video_prefetch_depth = 8
+    detection_batch_size = 8
+    classification_batch_size = 32
     distributed_inference = False
     detection_model_version = "MDV5-yolov5"
     classification_model_version = "DFv1.2"
+    detection_performance_profile = dict(DEFAULT_PERFORMANCE_PROFILE)
+    classification_performance_profile = dict(DEFAULT_PERFORMANCE_PROFILE)
+    # Classifier crops are resized by OpenCV instead of PIL, faster but not bit-exact
+    classification_fast_preprocessing = False
 
     def __init__(self):
         # Initializing the MegaDetectorV5 model for image detection
@@ -65,6 +81,11 @@ class AiModel:
             language=AiModel.language,
             distributed_inference=AiModel.distributed_inference,
             megadetector_version=AiModel.detection_model_version,
+            detection_batch_size=AiModel.detection_batch_size,
+            classification_batch_size=AiModel.classification_batch_size,
+            detection_performance_profile=AiModel.detection_performance_profile,
+            classification_performance_profile=AiModel.classification_performance_profile,
+            classification_fast_preprocessing=AiModel.classification_fast_preprocessing,
         )
 
         self.original_image = ""
@@ -91,87 +112,157 @@ class AiModel:
         """Method to check if model is initialized."""
         return DetectionPipeline.download_models()
 
-    def process_image(self, img_path, save_detection_image: bool):
-        """Method to run detection model on provided image."""
-
-        logger.debug("Selected detection device: %s", AiModel.detection_device)
+    @staticmethod
+    def open_image(img_path):
+        """Method to open an image as RGB, returning None if it cannot be opened."""
 
         try:
             img = Image.open(img_path)
             img.load()
         except FileNotFoundError:
             logger.error("%s is not a valid image path. Aborting.", img_path)
-            return None, None
+            return None
         except UnidentifiedImageError:
             logger.error("%s is not a valid image file. Aborting.", img_path)
-            return None, None
+            return None
         except OSError:
             logger.error("%s could not be opened.", img_path)
-            return None, None
+            return None
 
-        logger.info("Running detection on image %s ...", img_path)
+        return img.convert("RGB")
 
-        img = img.convert("RGB")
+    def process_image(self, img_path, save_detection_image: bool, frame=None):
+        """Method to run detection model on provided image."""
 
-        results = self.detection_pipeline.run_detection(img, AiModel.detection_threshold)
-        detected_img_path = ""
+        return self.process_images([img_path], save_detection_image, [frame])[0]
 
-        if len(results["detections"].xyxy) > 0 and save_detection_image:
-            logger.info("Saving detection results...")
-            results["img_id"] = img_path
-            pw_utils.save_detection_images(
-                results, os.path.join(".", "detection_output"), overwrite=False
-            )
-            detected_img_path = os.path.join("detection_output", os.path.basename(img_path))
-        else:
-            logger.info("No detected animals for %s. Removing image.", img_path)
-            try:
-                os.remove(img_path)
-            except OSError:
-                logger.warning("Could not remove %s", img_path)
+    def process_images(self, img_paths, save_detection_image: bool, frames=None):
+        """Method to run detection model on provided images with a single batched detection.
+        Images can be provided as in-memory frames (see MediaFrame), which are only written
+        into their image path if animals are detected.
+        Returns a (results, detected_img_path) tuple per image, (None, None) for the images that
+        could not be opened."""
 
-        return results, detected_img_path
+        logger.debug("Selected detection device: %s", AiModel.detection_device)
 
-    def get_video_frames(self, video_path):
-        """Method to extract frames from video."""
+        frames = frames or [None] * len(img_paths)
+        outputs = [(None, None)] * len(img_paths)
+        imgs = {
+            idx: img
+            for idx, (img_path, frame) in enumerate(zip(img_paths, frames))
+            if (img := frame.to_pil() if frame is not None else self.open_image(img_path))
+        }
+        if not imgs:
+            return outputs
+
+        logger.info("Running detection on image(s) %s ...", ", ".join(map(str, img_paths)))
+
+        results_lst = self.detection_pipeline.run_detection(
+            list(imgs.values()), AiModel.detection_threshold
+        )
+        if len(imgs) == 1:
+            results_lst = [results_lst]
+
+        for idx, results in zip(imgs, results_lst):
+            img_path = img_paths[idx]
+            detected_img_path = ""
+
+            if len(results["detections"].xyxy) > 0 and save_detection_image:
+                # In-memory frames are persisted only now that animals are detected
+                if frames[idx] is not None and not frames[idx].save(img_path):
+                    continue
+                logger.info("Saving detection results...")
+                results["img_id"] = img_path
+                pw_utils.save_detection_images(
+                    results, os.path.join(".", "detection_output"), overwrite=False
+                )
+                detected_img_path = os.path.join("detection_output", os.path.basename(img_path))
+            elif frames[idx] is not None:
+                logger.info("No detected animals for %s. Discarding frame.", img_path)
+            else:
+                logger.info("No detected animals for %s. Removing image.", img_path)
+                try:
+                    os.remove(img_path)
+                except OSError:
+                    logger.warning("Could not remove %s", img_path)
+
+            outputs[idx] = results, detected_img_path
+
+        return outputs
+
+    @classmethod
+    def get_video_frames(cls, video_path, video_fps=None):
+        """Method to extract frames from video, sampled at video_fps (default: cls.video_fps)."""
         try:
             video = cv2.VideoCapture(video_path)
-            if not video.isOpened():
-                logger.error("Error opening video file %s. Aborting.", video_path)
-                return None, None
         except FileNotFoundError:
             logger.error("%s is not a valid video path. Aborting.", video_path)
             return None, None
 
-        fps = video.get(cv2.CAP_PROP_FPS)
-        if fps == 0:
-            logger.error("Error reading video FPS. Aborting.")
-            return None, None
+        # Video capture is released also when the consumer stops iterating early
+        try:
+            if not video.isOpened():
+                logger.error("Error opening video file %s. Aborting.", video_path)
+                return None, None
+
+            fps = video.get(cv2.CAP_PROP_FPS)
+            if fps == 0:
+                logger.error("Error reading video FPS. Aborting.")
+                return None, None
 
-        logger.debug("Video original FPS: %s", fps)
+            logger.debug("Video original FPS: %s", fps)
 
-        downsample = max(int(round(fps / self.video_fps)), 1)
+            downsample = max(int(round(fps / (video_fps or cls.video_fps))), 1)
 
-        logger.info("Effective FPS: %s", round(fps / downsample))
+            logger.info("Effective FPS: %s", round(fps / downsample))
 
-        # Initialize frame counter
-        frame_count = 0
-        while True:
-            ret, frame = video.read()
-            if not ret:
-                break
+            strategy = cls.video_sampling_strategy
+            logger.debug("Video sampling strategy: %s", strategy.value)
 
-            if frame_count % downsample:
-                # Skip frames based on downsample value
+            # Initialize frame counter
+            frame_count = 0
+            while True:
+                if strategy == cls.VideoSamplingStrategies.READ or not frame_count % downsample:
+                    ret, frame = video.read()
+                elif strategy == cls.VideoSamplingStrategies.GRAB:
+                    # Skipped frames are only grabbed, without being decoded
+                    ret, frame = video.grab(), None
+                else:
+                    # Jump straight to the next kept frame
+                    frame_count += downsample - frame_count % downsample
+                    video.set(cv2.CAP_PROP_POS_FRAMES, frame_count)
+                    ret, frame = video.read()
+                if not ret:
+                    break
+
+                if frame_count % downsample:
+                    # Skip frames based on downsample value
+                    frame_count += 1
+                    continue
+
+                # Convert frame to PIL image
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                frame = Image.fromarray(frame)
+
+                yield frame, frame_count
                 frame_count += 1
-                continue
+        finally:
+            video.release()
+
+    def open_preview_video(self, output_path, size, video_fps=None):
+        """Open an OpenCV video writer for preview frames of the given (width, height) size."""
 
-            # Convert frame to PIL image
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            frame = Image.fromarray(frame)
+        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+        return cv2.VideoWriter(str(output_path), fourcc, video_fps or self.video_fps, size)
 
-            yield frame, frame_count
-            frame_count += 1
+    @staticmethod
+    def write_preview_frames(video_writer, frames):
+        """Append a sequence of PIL.Image frames to an opened video writer."""
+
+        for frame in frames:
+            rgb_array = np.array(frame.convert("RGB"))
+            bgr_array = cv2.cvtColor(rgb_array, cv2.COLOR_RGB2BGR)
+            video_writer.write(bgr_array)
 
     def save_preview_video(self, frames, output_path):
         """Save a sequence of PIL.Image frames as a video using OpenCV."""
@@ -179,16 +270,8 @@ class AiModel:
         if not frames:
             raise ValueError("No frames to write to video.")
 
-        first = np.array(frames[0].convert("RGB"))
-        height, width = first.shape[:2]
-        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-        out = cv2.VideoWriter(str(output_path), fourcc, self.video_fps, (width, height))
-
-        for frame in frames:
-            rgb_array = np.array(frame.convert("RGB"))
-            bgr_array = cv2.cvtColor(rgb_array, cv2.COLOR_RGB2BGR)
-            out.write(bgr_array)
-
+        out = self.open_preview_video(output_path, frames[0].size)
+        self.write_preview_frames(out, frames)
         out.release()
 
     def classification_from_video_tracking(self, tracked_animals):
@@ -215,64 +298,121 @@ class AiModel:
         ]
         return classified_animals
 
-    def process_video_offline(self, video_path, classification=True, save_processed_video=False):
-        """Method to run detection model on provided video."""
+    def detect_video_windows(self, frames, classification=True):
+        """Generator running the detection model on frames one detection batch at a time.
+        When classification is enabled, consecutive windows are grouped until their detections
+        fill a classification batch (or the window holds as many frames as that batch), so that
+        the classifier does not run on a partial batch after every detection batch.
+        Yields (frames, detection results) tuples in frame order.
+        """
+
+        detection_batch_size = self.detection_pipeline.detection_batch_size
+        classification_batch_size = (
+            self.detection_pipeline.classification_batch_size if classification else 0
+        )
+        max_window_frames = max(detection_batch_size, classification_batch_size)
+
+        window, detection_lists, crops = [], [], 0
+        for batch in split_in_batches(frames, detection_batch_size):
+            # Run the detection model on the batch frames
+            batch_detection_lists = self.detection_pipeline.run_detection(
+                batch, AiModel.detection_threshold
+            )
+            if len(batch) == 1:
+                batch_detection_lists = [batch_detection_lists]
+
+            window.extend(batch)
+            detection_lists.extend(batch_detection_lists)
+            crops += sum(len(results["detections"].xyxy) for results in batch_detection_lists)
+            if crops >= classification_batch_size or len(window) >= max_window_frames:
+                yield window, detection_lists
+                window, detection_lists, crops = [], [], 0
+
+        if window:
+            yield window, detection_lists
+
+    def process_video_offline(
+        self, video_path, classification=True, save_processed_video=False, video_fps=None
+    ):
+        """Method to run detection model on provided video, sampled at video_fps
+        (default: AiModel.video_fps).
+        Frames are decoded, analyzed and written to the preview video one window at a time, so
+        that memory usage is bounded by the detection and classification batch sizes instead of
+        the video length.
+        """
 
         logger.debug("Selected detection device: %s", AiModel.detection_device)
 
         logger.info("Running detection on video %s ...", video_path)
+        if classification:
+            logger.info("Running classification on video %s ...", video_path)
         tracker = ObjectTracker(max_missed=10)
 
-        frames = tuple(frame for frame, _ in self.get_video_frames(video_path))
+        # Frames are decoded in background while the models run on the previous window
+        frames = (
+            frame
+            for frame, _ in prefetch(
+                self.get_video_frames(video_path, video_fps), self.video_prefetch_depth
+            )
+        )
         tracked_animals = []
-
-        # Run the detection model on the video frames
-        detection_lists = self.detection_pipeline.run_detection(frames, AiModel.detection_threshold)
-
-        preview_frames = []
         output_video_path = ""
-        if classification:
-            logger.info("Running classification on video %s ...", video_path)
-            # Classify detected animals on all frames
-            classification_lists = self.detection_pipeline.classify(
-                frames, detection_lists, AiModel.classification_threshold
-            )
-
-            for frame, classified_animals in zip(frames, classification_lists):
-                array = np.array(frame)
-                tracked_animal = tracker.update(classified_animals, array.shape[:2])
-                tracked_animals.append(tracked_animal)
-
-                if save_processed_video:
-                    classified_frame = self.build_classification_square(
-                        frame, classified_animals, "", True
+        video_writer = None
+        try:
+            for window, detection_lists in self.detect_video_windows(frames, classification):
+                preview_frames = []
+                if classification:
+                    # Classify detected animals on the window frames
+                    classification_lists = self.detection_pipeline.classify(
+                        window, detection_lists, AiModel.classification_threshold
                     )
-                    # If frame does not contain classification keep original frame
-                    # to build output video
-                    preview_frames.append(classified_frame if classified_frame else frame)
-
-            if preview_frames:
-                logger.info("Saving classification video...")
-                output_video_path = (
-                    Path("classification_output") / f"{Path(video_path).stem}_classified.mp4"
-                )
-        else:
-            # Save detection frames
-            if len(detection_lists) and save_processed_video:
-                for frame, detection_results in zip(frames, detection_lists):
-                    detection_frame = self.build_detection_square(frame, detection_results)
-                    # If frame does not contain classification keep original frame
-                    # to build output video
-                    preview_frames.append(detection_frame if detection_frame is not None else frame)
-
-                if preview_frames:
-                    logger.info("Saving detection video...")
-                    output_video_path = (
-                        Path("detection_output") / f"{Path(video_path).stem}_detected.mp4"
+                    if len(window) == 1:
+                        classification_lists = [classification_lists]
+
+                    for frame, classified_animals in zip(window, classification_lists):
+                        tracked_animal = tracker.update(
+                            classified_animals, (frame.height, frame.width)
+                        )
+                        tracked_animals.append(tracked_animal)
+
+                        if save_processed_video:
+                            classified_frame = self.build_classification_square(
+                                frame, classified_animals, "", True
+                            )
+                            # If frame does not contain classification keep original frame
+                            # to build output video
+                            preview_frames.append(classified_frame if classified_frame else frame)
+                elif save_processed_video:
+                    # Save detection frames
+                    for frame, detection_results in zip(window, detection_lists):
+                        detection_frame = self.build_detection_square(frame, detection_results)
+                        # If frame does not contain detection keep original frame
+                        # to build output video
+                        preview_frames.append(
+                            detection_frame if detection_frame is not None else frame
+                        )
+
+                if not preview_frames:
+                    continue
+                if video_writer is None:
+                    if classification:
+                        logger.info("Saving classification video...")
+                        output_video_path = (
+                            Path("classification_output")
+                            / f"{Path(video_path).stem}_classified.mp4"
+                        )
+                    else:
+                        logger.info("Saving detection video...")
+                        output_video_path = (
+                            Path("detection_output") / f"{Path(video_path).stem}_detected.mp4"
+                        )
+                    video_writer = self.open_preview_video(
+                        output_video_path, preview_frames[0].size, video_fps
                     )
-
-        if preview_frames and save_processed_video:
-            self.save_preview_video(preview_frames, output_video_path)
+                self.write_preview_frames(video_writer, preview_frames)
+        finally:
+            if video_writer is not None:
+                video_writer.release()
 
         return tracked_animals, str(output_video_path)
 
@@ -284,7 +424,9 @@ class AiModel:
         logger.info("Running detection on video %s ...", video_path)
         video_filename = os.path.basename(video_path)
 
-        for frame, frame_count in self.get_video_frames(video_path):
+        for frame, frame_count in prefetch(
+            self.get_video_frames(video_path), self.video_prefetch_depth
+        ):
 
             results = self.detection_pipeline.run_detection(frame, AiModel.detection_threshold)
 
@@ -311,55 +453,60 @@ class AiModel:
     def classify(self, img_path, results, save_classification_crop=False):
         """Method to perform classification on detection result(s)."""
 
-        logger.debug("Selected classification device: %s", AiModel.classification_device)
-
         if not results:
             logger.warning("No results to classify. Skipping classification.")
             return ""
 
-        logger.info("Running classification on %s image...", img_path)
+        return self.classify_images([img_path], [results], save_classification_crop)[0]
 
-        try:
-            img = Image.open(img_path)
-            img.load()
-        except FileNotFoundError:
-            logger.error("%s is not a valid image path. Aborting.", img_path)
-            return None, None
-        except UnidentifiedImageError:
-            logger.error("%s is not a valid image file. Aborting.", img_path)
-            return None, None
-        except OSError:
-            logger.error("%s could not be opened.", img_path)
-            return None, None
+    def classify_images(self, img_paths, results_lst, save_classification_crop=False):
+        """Method to perform classification on detection results of several images, with the
+        crops of all the images classified together. Returns a (classified_img_path,
+        classified_animals) tuple per image, (None, None) for the images that could not be
+        opened."""
 
-        img = img.convert("RGB")
+        logger.debug("Selected classification device: %s", AiModel.classification_device)
 
-        classified_animals = None
-        classified_img_path = None
-        if not (
-            classified_animals := self.detection_pipeline.classify(
-                img, results, AiModel.classification_threshold
-            )
-        ):
-            logger.debug("No classified animals, skipping img crops saving.")
-        else:
-            if save_classification_crop:
-                # Save classification image crops for debug purposes
-                for classified_animal in classified_animals:
-                    # Cropping detection result(s) from original image leveraging detected boxes
-                    cropped_image = img.crop(classified_animal["xyxy"])
-                    cropped_image_path = (
-                        module_dir_path.parent.parent
-                        / "classification_output"
-                        / f"{classified_animal['id']}_cropped_image.jpg"
-                    )
-                    cropped_image.save(cropped_image_path)
-                    logger.debug("Saved crop of image at %s.", cropped_image_path)
+        outputs = [(None, None)] * len(img_paths)
+        logger.info("Running classification on %s image(s)...", ", ".join(map(str, img_paths)))
+        imgs = {
+            idx: img for idx, img_path in enumerate(img_paths) if (img := self.open_image(img_path))
+        }
+        if not imgs:
+            return outputs
+
+        classified_animals_lst = self.detection_pipeline.classify(
+            list(imgs.values()),
+            [results_lst[idx] for idx in imgs],
+            AiModel.classification_threshold,
+        )
+        if len(imgs) == 1:
+            classified_animals_lst = [classified_animals_lst]
 
-            classified_img_path = self.build_classification_square(
-                img, classified_animals, Path(img_path).stem
-            )
-        return classified_img_path, classified_animals
+        for (idx, img), classified_animals in zip(imgs.items(), classified_animals_lst):
+            classified_img_path = None
+            if not classified_animals:
+                logger.debug("No classified animals, skipping img crops saving.")
+            else:
+                if save_classification_crop:
+                    # Save classification image crops for debug purposes
+                    for classified_animal in classified_animals:
+                        # Cropping detection result(s) from original image leveraging boxes
+                        cropped_image = img.crop(classified_animal["xyxy"])
+                        cropped_image_path = (
+                            module_dir_path.parent.parent
+                            / "classification_output"
+                            / f"{classified_animal['id']}_cropped_image.jpg"
+                        )
+                        cropped_image.save(cropped_image_path)
+                        logger.debug("Saved crop of image at %s.", cropped_image_path)
+
+                classified_img_path = self.build_classification_square(
+                    img, classified_animals, Path(img_paths[idx]).stem
+                )
+            outputs[idx] = classified_img_path, classified_animals
+
+        return outputs
 
     def build_classification_square(self, img, classified_animals, img_name, video_frame=False):
         """Build square on classified animals."""
@@ -18,10 +18,12 @@
 # Description: Animal Detection and Classification module.
 
 import logging
-from queue import Empty
+import threading
+from queue import Empty, Queue
 
 from wadas.domain.camera import media_queue
 from wadas.domain.operation_mode import OperationMode
+from wadas.domain.utils import get_batch_from_queue
 
 logger = logging.getLogger(__name__)
 
@@ -39,45 +41,66 @@ class AnimalDetectionAndClassificationMode(OperationMode):
             else OperationMode.OperationModeTypes.AnimalDetectionMode
         )
 
+    def _is_supported_media(self, cur_media):
+        """Method to check if a media from motion detection notification can be processed"""
+
+        return cur_media and (
+            OperationMode.is_image(cur_media["media_path"])
+            or OperationMode.is_video(cur_media["media_path"])
+        )
+
+    def _build_message(self, detection_event):
+        """Method to build the notification message of a detection event"""
+
+        if not detection_event.classification:
+            return f"WADAS has detected an animal from camera {detection_event.camera_id}!"
+        if not detection_event.classification_img_path:
+            return ""
+        classified_animals_str = self.format_classified_animals(detection_event.classified_animals)
+        return (
+            f"WADAS has classified '{classified_animals_str}' "
+            f"animal from camera {detection_event.camera_id}!"
+        )
+
     def run(self):
         """WADAS animal detection and classification mode"""
 
         self._initialize_processes()
         self.check_for_termination_requests()
 
+        if OperationMode.media_workers > 1:
+            self._run_media_workers(OperationMode.media_workers)
+            self.execution_completed()
+            return
+
         # Run detection model
         while self.process_queue:
             self.check_for_termination_requests()
-            # Get media (images or videos) from motion detection notification
+            # Get a micro-batch of media (images or videos) from motion detection notification
             # Timeout is set to 1 second to avoid blocking the thread
-            try:
-                cur_media = media_queue.get(timeout=1)
-            except Empty:
-                cur_media = None
+            media_batch = [
+                cur_media
+                for cur_media in get_batch_from_queue(
+                    media_queue,
+                    OperationMode.media_batch_size,
+                    OperationMode.media_batch_wait,
+                    timeout=1,
+                )
+                if self._is_supported_media(cur_media)
+            ]
+            if not media_batch:
+                continue
 
             # Media processing
-            if cur_media and (
-                OperationMode.is_image(cur_media["media_path"])
-                or OperationMode.is_video(cur_media["media_path"])
-            ):
-                logger.debug("Processing media from motion detection notification...")
-
-                detection_event = self._detect(cur_media, self.enable_classification)
+            logger.debug(
+                "Processing %s media from motion detection notification...", len(media_batch)
+            )
+            detection_events = self._detect_batch(media_batch, persist=False)
 
+            for detection_event in detection_events:
                 self.check_for_termination_requests()
                 if detection_event:
-                    if self.enable_classification:
-                        # Classification is enabled
-                        message = (
-                            (
-                                f"WADAS has classified '{self.last_classified_animals_str}' "
-                                f"animal from camera {cur_media['media_id']}!"
-                            )
-                            if detection_event.classification_img_path
-                            else ""
-                        )
-                    else:
-                        message = "WADAS has detected an animal from camera %s!" % id
+                    message = self._build_message(detection_event)
 
                     self.check_for_termination_requests()
                     # Notification
@@ -86,8 +109,10 @@ class AnimalDetectionAndClassificationMode(OperationMode):
 
                     self.check_for_termination_requests()
                     # Actuation
-                    if detection_event:
-                        self.actuate(detection_event)
+                    actuation_events = self.actuate(detection_event, persist=False)
+
+                    # Store detection and actuation events into db, if enabled
+                    self._persist_detection_event(detection_event, actuation_events)
 
                     self.check_for_termination_requests()
                     # Reproduce image or video in UI
@@ -96,3 +121,121 @@ class AnimalDetectionAndClassificationMode(OperationMode):
                     logger.debug("No animal detected.")
 
         self.execution_completed()
+
+    def _run_media_workers(self, num_workers):
+        """Process media with a pool of workers sharing the AI models.
+        Media of a camera are always processed by the same worker, and each following stage
+        (notification, actuation, db) is a single thread consuming events in order, so that
+        events of a camera are handled in the order they have been received.
+        Results are shown in UI by the actuation stage only, so that UI always shows the media
+        and the classified animals of the same event."""
+
+        logger.info("Starting %s media workers...", num_workers)
+        self.ai_model.detection_pipeline.enable_concurrent_inference()
+
+        # Worker queues are bounded, so that media exceeding workers capacity are left in media
+        # queue and subject to its load shedding
+        worker_queues = [Queue(OperationMode.media_worker_queue_size) for _ in range(num_workers)]
+        db_queue, notification_queue, actuation_queue = Queue(), Queue(), Queue()
+        workers = [
+            self._start_stage(
+                f"media_worker_{idx}",
+                worker_queue,
+                self._process_media,
+                (actuation_queue, notification_queue),
+            )
+            for idx, worker_queue in enumerate(worker_queues)
+        ]
+        notification_stage = self._start_stage(
+            "notification_stage", notification_queue, self._notify_detection_event
+        )
+        actuation_stage = self._start_stage(
+            "actuation_stage", actuation_queue, self._actuate_detection_event, (db_queue,)
+        )
+        db_stage = self._start_stage("db_stage", db_queue, self._store_detection_event)
+
+        camera_to_worker = {}
+        while self.process_queue:
+            self.check_for_termination_requests()
+            # Media of cameras whose worker is full are not dispatched until it makes room,
+            # hence polling more often while waiting for it
+            busy_cameras = {
+                camera_id
+                for camera_id, worker_idx in camera_to_worker.items()
+                if worker_queues[worker_idx].full()
+            }
+            try:
+                cur_media = media_queue.get(
+                    timeout=OperationMode.media_batch_wait if busy_cameras else 1,
+                    skip_cameras=busy_cameras,
+                )
+            except Empty:
+                cur_media = None
+
+            if self._is_supported_media(cur_media):
+                # Cameras are assigned to workers in round robin on their first media
+                worker_idx = camera_to_worker.setdefault(
+                    cur_media["camera_id"], len(camera_to_worker) % num_workers
+                )
+                worker_queues[worker_idx].put(cur_media)
+
+        # Stop stages in pipeline order, letting each one complete the events it received
+        for worker_queue in worker_queues:
+            worker_queue.put(None)
+        for worker in workers:
+            worker.join()
+        actuation_queue.put(None)
+        notification_queue.put(None)
+        actuation_stage.join()
+        db_queue.put(None)
+        notification_stage.join()
+        db_stage.join()
+
+    @staticmethod
+    def _start_stage(name, in_queue, process, out_queues=()):
+        """Start a thread processing the items of in_queue in order until None is received,
+        forwarding the non None results to out_queues"""
+
+        def run_stage():
+            while (item := in_queue.get()) is not None:
+                try:
+                    result = process(item)
+                except Exception:
+                    logger.exception("Error while processing %s in %s.", item, name)
+                    continue
+                if result is not None:
+                    for out_queue in out_queues:
+                        out_queue.put(result)
+
+        stage = threading.Thread(target=run_stage, name=name, daemon=True)
+        stage.start()
+        return stage
+
+    def _process_media(self, cur_media):
+        """Media worker stage: run detection (and classification) on a media"""
+
+        logger.debug("Processing media %s...", cur_media["media_path"])
+        if not (
+            detection_event := self._detect(cur_media, self.enable_classification, persist=False)
+        ):
+            logger.debug("No animal detected.")
+        return detection_event
+
+    def _store_detection_event(self, events):
+        """Db stage: store the detection event and its actuation events in one transaction"""
+
+        self._persist_detection_event(*events)
+
+    def _notify_detection_event(self, detection_event):
+        """Notification stage: notify the detection event"""
+
+        if message := self._build_message(detection_event):
+            self.send_notification(detection_event, message)
+
+    def _actuate_detection_event(self, detection_event):
+        """Actuation stage: trigger actuators and show results in UI, forwarding the
+        actuation events to the db stage"""
+
+        actuation_events = self.actuate(detection_event, persist=False)
+        self._show_processed_results(detection_event)
+        return detection_event, actuation_events
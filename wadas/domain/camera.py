@@ -20,19 +20,33 @@
 import logging
 from abc import abstractmethod
 from enum import Enum
-from queue import Queue
+
+from wadas.domain.media_queue import MediaQueue
 
 logger = logging.getLogger(__name__)
+# List of Cameras selected by user for image processing
+cameras = []
+
+
+def is_priority_camera(camera_id):
+    """Media of cameras with actuators attached (e.g. road signs) are processed first"""
+
+    return any(camera.id == camera_id and camera.actuators for camera in cameras)
+
+
 # Queue containing all the images received by Cameras to be processed by AiModel
-media_queue = Queue()
+media_queue = MediaQueue(is_priority_camera)
 # Media dictionary structure to be inserted in the media_queue:
 # {
 #    "media_path": <media_file_path>,
 #    "media_id": <media_id>,
 #    "camera_id": <camera_id>,
 # }
-# List of Cameras selected by user for image processing
-cameras = []
+# Media queue load shedding can add the following keys:
+#    "video_fps_scale": <scale of the video analysis frame rate>,
+#    "skip_classification": <True to run the detection model only>,
+# USB cameras can hand off images in memory, writing <media_file_path> only on detection:
+#    "frame": <MediaFrame of the image>,
 
 
 class Camera:
@@ -43,6 +57,14 @@ class Camera:
         "min_contour_area": 300,
         "detection_per_second": 1,
         "ms_sample_rate": 1000,
+        # Motion analysis resolution and color, see MotionAnalyzer
+        "analysis_width": 640,
+        "analysis_grayscale": True,
+        # Images kept in memory on media queue at the same time, 0 to always write image files
+        "max_in_memory_frames": 0,
+        # Motion gate, see MotionGate
+        "persistence_frames": 3,
+        "max_hash_distance": 6,
     }
 
     class CameraTypes(Enum):
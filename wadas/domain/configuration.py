@@ -27,15 +27,18 @@ import yaml
 from packaging.version import Version
 
 from wadas._version import __version__
+from wadas.ai.openvino_model import DEFAULT_PERFORMANCE_PROFILE
 from wadas.domain.actuator import Actuator
 from wadas.domain.ai_model import AiModel
 from wadas.domain.camera import Camera, cameras
 from wadas.domain.database import DataBase
+from wadas.domain.db_writer import DBWriter
 from wadas.domain.email_notifier import EmailNotifier
 from wadas.domain.fastapi_actuator_server import FastAPIActuatorServer
 from wadas.domain.feeder_actuator import FeederActuator
 from wadas.domain.ftp_camera import FTPCamera
 from wadas.domain.ftps_server import FTPsServer
+from wadas.domain.media_queue import MediaQueue
 from wadas.domain.notifier import Notifier
 from wadas.domain.operation_mode import OperationMode
 from wadas.domain.roadsign_actuator import RoadSignActuator
@@ -47,6 +50,8 @@ from wadas.domain.whatsapp_notifier import WhatsAppNotifier
 logger = logging.getLogger(__name__)
 
 _OPERATION_MODE_TYPE_VALUE_TO_TYPE = {mode.value: mode for mode in OperationMode.OperationModeTypes}
+_VIDEO_SAMPLING_STRATEGY_VALUES = {strategy.value for strategy in AiModel.VideoSamplingStrategies}
+_SHEDDING_POLICY_VALUES = {policy.value for policy in MediaQueue.SheddingPolicies}
 
 
 def check_version_compatibility(config_file_version):
@@ -240,9 +245,50 @@ def load_configuration_from_file(file_path):
             classification_device if classification_device in available_ai_devices else "auto"
         )
         AiModel.video_fps = wadas_config["ai_model"]["ai_video_fps"]
+        video_sampling_strategy = wadas_config["ai_model"].get("ai_video_sampling_strategy", "grab")
+        AiModel.video_sampling_strategy = (
+            AiModel.VideoSamplingStrategies(video_sampling_strategy)
+            if video_sampling_strategy in _VIDEO_SAMPLING_STRATEGY_VALUES
+            else AiModel.VideoSamplingStrategies.GRAB
+        )
+        # Performance settings are optional to keep older configuration files loadable
+        AiModel.video_prefetch_depth = wadas_config["ai_model"].get("ai_video_prefetch_depth", 8)
+        AiModel.detection_batch_size = wadas_config["ai_model"].get("ai_detection_batch_size", 8)
+        AiModel.classification_batch_size = wadas_config["ai_model"].get(
+            "ai_classification_batch_size", 32
+        )
+        AiModel.detection_performance_profile = {
+            **DEFAULT_PERFORMANCE_PROFILE,
+            **(wadas_config["ai_model"].get("ai_detection_performance_profile") or {}),
+        }
+        AiModel.classification_performance_profile = {
+            **DEFAULT_PERFORMANCE_PROFILE,
+            **(wadas_config["ai_model"].get("ai_classification_performance_profile") or {}),
+        }
+        AiModel.classification_fast_preprocessing = wadas_config["ai_model"].get(
+            "ai_classification_fast_preprocessing", False
+        )
 
         # Operation Mode
-        if operation_mode := wadas_config["operation_mode"]:
+        # Media processing settings fall back to defaults when not in configuration, so that
+        # values of a previously loaded configuration are not kept
+        operation_mode = wadas_config["operation_mode"] or {}
+        OperationMode.media_workers = operation_mode.get("media_workers", 1)
+        OperationMode.media_batch_size = operation_mode.get("media_batch_size", 1)
+        OperationMode.media_batch_wait = operation_mode.get("media_batch_wait", 0.05)
+        OperationMode.db_write_behind = operation_mode.get("db_write_behind", True)
+        DBWriter.batch_size = operation_mode.get("db_write_batch_size", 50)
+        DBWriter.flush_interval = operation_mode.get("db_write_interval", 0.5)
+        DBWriter.max_queue_size = operation_mode.get("db_write_queue_size", 1000)
+        MediaQueue.max_size = operation_mode.get("media_queue_size", 200)
+        MediaQueue.max_age = operation_mode.get("media_max_age", 0)
+        shedding_policy = operation_mode.get("media_shedding_policy", "drop_oldest")
+        MediaQueue.shedding_policy = (
+            MediaQueue.SheddingPolicies(shedding_policy)
+            if shedding_policy in _SHEDDING_POLICY_VALUES
+            else MediaQueue.SheddingPolicies.DROP_OLDEST
+        )
+        if operation_mode.get("type"):
             operation_mode_type = _OPERATION_MODE_TYPE_VALUE_TO_TYPE.get(operation_mode["type"])
             OperationMode.cur_operation_mode_type = operation_mode_type
             if (
@@ -305,16 +351,26 @@ def save_configuration_to_file(file_, project_uuid):
     # Prepare serialization for actuators per class type
     actuators = [value.serialize() for key, value in Actuator.actuators.items() if key and value]
 
-    # Prepare serialization for operation mode
-    operation_mode = ""
+    # Prepare serialization for operation mode, media processing settings are saved even when
+    # no operation mode is selected
+    operation_mode = {
+        "media_workers": OperationMode.media_workers,
+        "media_batch_size": OperationMode.media_batch_size,
+        "media_batch_wait": OperationMode.media_batch_wait,
+        "db_write_behind": OperationMode.db_write_behind,
+        "db_write_batch_size": DBWriter.batch_size,
+        "db_write_interval": DBWriter.flush_interval,
+        "db_write_queue_size": DBWriter.max_queue_size,
+        "media_queue_size": MediaQueue.max_size,
+        "media_max_age": MediaQueue.max_age,
+        "media_shedding_policy": MediaQueue.shedding_policy.value,
+    }
     if OperationMode.cur_operation_mode_type:
+        operation_mode["type"] = OperationMode.cur_operation_mode_type.value
         if OperationMode.cur_custom_classification_species:
-            operation_mode = {
-                "type": OperationMode.cur_operation_mode_type.value,
-                "custom_target_species": OperationMode.cur_custom_classification_species,
-            }
-        else:
-            operation_mode = {"type": OperationMode.cur_operation_mode_type.value}
+            operation_mode["custom_target_species"] = (
+                OperationMode.cur_custom_classification_species
+            )
 
     tunnels_to_dict = [tunnel.serialize() for tunnel in Tunnel.tunnels] if Tunnel.tunnels else []
 
@@ -335,6 +391,13 @@ def save_configuration_to_file(file_, project_uuid):
             "ai_detection_device": AiModel.detection_device,
             "ai_classification_device": AiModel.classification_device,
             "ai_video_fps": AiModel.video_fps,
+            "ai_video_prefetch_depth": AiModel.video_prefetch_depth,
+            "ai_video_sampling_strategy": AiModel.video_sampling_strategy.value,
+            "ai_detection_batch_size": AiModel.detection_batch_size,
+            "ai_classification_batch_size": AiModel.classification_batch_size,
+            "ai_detection_performance_profile": AiModel.detection_performance_profile,
+            "ai_classification_performance_profile": AiModel.classification_performance_profile,
+            "ai_classification_fast_preprocessing": AiModel.classification_fast_preprocessing,
         },
         "operation_mode": operation_mode,
         "ftps_server": FTPsServer.ftps_server.serialize() if FTPsServer.ftps_server else "",
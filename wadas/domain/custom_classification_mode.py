@@ -66,11 +66,15 @@ class CustomClassificationMode(AnimalDetectionAndClassificationMode):
 
             if cur_img:
                 logger.debug("Processing image from motion detection notification...")
-                detection_event = self._detect(cur_img)
+                detection_event = self._detect(cur_img, persist=False)
+                actuation_events = []
 
                 self.check_for_termination_requests()
                 if detection_event and self.enable_classification:
                     if detection_event.classification_img_path:
+                        classified_animals_str = self.format_classified_animals(
+                            detection_event.classified_animals
+                        )
                         # Send notification and trigger actuators if the target animal is found
                         if any(
                             classified_animal["classification"][0] == self.custom_target_species
@@ -78,20 +82,20 @@ class CustomClassificationMode(AnimalDetectionAndClassificationMode):
                         ):
                             # Notification
                             message = (
-                                f"WADAS has classified '{self.last_classified_animals_str}' "
+                                f"WADAS has classified '{classified_animals_str}' "
                                 f"animal from camera {detection_event.camera_id}!"
                             )
                             logger.info(message)
                             self.send_notification(detection_event, message)
 
                             # Actuation
-                            self.actuate(detection_event)
+                            actuation_events = self.actuate(detection_event, persist=False)
                         else:
                             logger.info(
                                 "Target animal '%s' not found, found '%s' instead. "
                                 "Skipping notification.",
                                 self.custom_target_species,
-                                self.last_classified_animals_str,
+                                classified_animals_str,
                             )
 
                         # Show processing results in UI
@@ -99,4 +103,8 @@ class CustomClassificationMode(AnimalDetectionAndClassificationMode):
                     else:
                         logger.info("No animal classified.")
 
+                if detection_event:
+                    # Store detection and actuation events into db, if enabled
+                    self._persist_detection_event(detection_event, actuation_events)
+
         self.execution_completed()
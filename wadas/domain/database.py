@@ -19,13 +19,16 @@
 
 import json
 import logging
+import threading
 from abc import ABC, abstractmethod
+from datetime import datetime
 from enum import Enum
 
 import keyring
 from mariadb import OperationalError as mariadbOperationalerror
+from packaging.version import Version
 from pymysql import OperationalError as pymysqlOperationalError
-from sqlalchemy import and_, create_engine, delete, select, text, update
+from sqlalchemy import and_, create_engine, delete, insert, select, text, update
 from sqlalchemy.exc import IntegrityError, InterfaceError
 from sqlalchemy.exc import OperationalError as SQLAlchemyOperationalError
 from sqlalchemy.exc import SQLAlchemyError
@@ -45,6 +48,7 @@ from wadas.domain.db_model import DetectionEvent as ORMDetectionEvent
 from wadas.domain.db_model import FeederActuator as ORMFeederActuator
 from wadas.domain.db_model import FTPCamera as ORMFTPCamera
 from wadas.domain.db_model import RoadSignActuator as ORMRoadSignActuator
+from wadas.domain.db_model import TunnelCountEvent as ORMTunnelCountEvent
 from wadas.domain.db_model import USBCamera as ORMUSBCamera
 from wadas.domain.db_model import User as ORMUser
 from wadas.domain.db_model import camera_actuator_association
@@ -52,11 +56,15 @@ from wadas.domain.detection_event import DetectionEvent
 from wadas.domain.feeder_actuator import FeederActuator
 from wadas.domain.ftp_camera import FTPCamera
 from wadas.domain.roadsign_actuator import RoadSignActuator
+from wadas.domain.tunnel_count_event import TunnelCountEvent
 from wadas.domain.usb_camera import USBCamera
 from wadas.domain.utils import get_precise_timestamp
 
 logger = logging.getLogger(__name__)
 
+# Session factory shared by all the db operations, bound to the engine when it is created
+session_factory = sessionmaker()
+
 
 class DBMetadata:
     def __init__(self, description: str, project_uuid):
@@ -74,6 +82,93 @@ class DBUser:
         self.role = role
 
 
+class DBIdCache:
+    """Cache of the db ids (primary keys) of not deleted cameras or actuators, keyed by their
+    domain id. Ids not found in db are not cached."""
+
+    def __init__(self, orm_class, id_column):
+        self.orm_class = orm_class
+        self.id_column = getattr(orm_class, id_column)
+        self.lock = threading.Lock()
+        self.db_ids = {}
+        # Incremented on invalidation, so that ids queried meanwhile are not cached
+        self.generation = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset cache counters"""
+
+        with self.lock:
+            self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get_stats(self):
+        """Return a snapshot of cache counters, along with cache size and hit rate"""
+
+        with self.lock:
+            stats = dict(self.stats)
+            stats["size"] = len(self.db_ids)
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+            return stats
+
+    def lookup(self, session, ids):
+        """Return the db ids of the given domain ids, querying the db with session only for
+        the ones not cached"""
+
+        db_ids, missing_ids = {}, set()
+        with self.lock:
+            for cur_id in ids:
+                if (db_id := self.db_ids.get(cur_id)) is not None:
+                    db_ids[cur_id] = db_id
+                    self.stats["hits"] += 1
+                else:
+                    missing_ids.add(cur_id)
+                    self.stats["misses"] += 1
+            generation = self.generation
+
+        if missing_ids:
+            found_ids = dict(
+                session.query(self.id_column, self.orm_class.db_id)
+                .filter(
+                    and_(self.id_column.in_(missing_ids), self.orm_class.deletion_date.is_(None))
+                )
+                .all()
+            )
+            db_ids.update(found_ids)
+            with self.lock:
+                if generation == self.generation:
+                    self.db_ids.update(found_ids)
+        return db_ids
+
+    def populate(self, session):
+        """Cache the db ids of all the not deleted objects"""
+
+        db_ids = dict(
+            session.query(self.id_column, self.orm_class.db_id)
+            .filter(self.orm_class.deletion_date.is_(None))
+            .all()
+        )
+        with self.lock:
+            self.db_ids = db_ids
+            self.generation += 1
+
+    def invalidate(self, db_id=None):
+        """Remove the object with the given db id from cache, or all the objects if db_id is
+        None"""
+
+        with self.lock:
+            if db_id is None:
+                self.db_ids.clear()
+            else:
+                self.db_ids = {
+                    cur_id: cur_db_id
+                    for cur_id, cur_db_id in self.db_ids.items()
+                    if cur_db_id != db_id
+                }
+            self.generation += 1
+            self.stats["invalidations"] += 1
+
+
 class DataBase(ABC):
     """Base Class to handle DB object."""
 
@@ -85,6 +180,14 @@ class DataBase(ABC):
     wadas_db = None  # Singleton instance of the database
     wadas_db_engine = None  # Singleton engine associated with the database
     max_reconn_retries = 3  # Max number of retry for re-connecting
+    # Connection pool settings of MySQL and MariaDB databases
+    pool_size = 5  # Connections kept open in the pool
+    max_overflow = 10  # Connections that can be opened beyond pool_size under load
+    pool_pre_ping = True  # Check connection liveness when it is checked out of the pool
+    pool_recycle = 1800  # Recycle connections older than 30 minutes
+    # Db ids of cameras and actuators, used as foreign keys of the events
+    camera_ids = DBIdCache(ORMCamera, "camera_id")
+    actuator_ids = DBIdCache(ORMActuator, "actuator_id")
 
     def __init__(self, host, enabled=True, version=__dbversion__):
         """Constructor is not public, no external code should call this directly"""
@@ -179,10 +282,13 @@ class DataBase(ABC):
                     if (DataBase.wadas_db.type == DataBase.DBTypes.SQLITE)
                     else create_engine(
                         DataBase.wadas_db.get_connection_string(),
-                        pool_recycle=1800,  # Recycle connection every 30 minutes
-                        pool_pre_ping=True,  # Check if connection is still valid
+                        pool_size=DataBase.pool_size,
+                        max_overflow=DataBase.max_overflow,
+                        pool_pre_ping=DataBase.pool_pre_ping,
+                        pool_recycle=DataBase.pool_recycle,
                     )
                 )
+                session_factory.configure(bind=DataBase.wadas_db_engine)
         return DataBase.wadas_db_engine
 
     @classmethod
@@ -214,24 +320,19 @@ class DataBase(ABC):
                 logger.warning("Failed to dispose the database engine.")
         DataBase.wadas_db_engine = None
         DataBase.wadas_db = None
+        session_factory.configure(bind=None)
+        DataBase.camera_ids.invalidate()
+        DataBase.actuator_ids.invalidate()
 
     @classmethod
     def create_session(cls, retry_count=0):
-        """Method to create a session to perform operations with the DB"""
+        """Method to create a session to perform operations with the DB.
+        Sessions take their connection from the engine pool, whose pre-ping replaces stale
+        connections, so creating a session costs no round-trip to the DB."""
 
         try:
-            if engine := cls.get_engine():
-                # If db is not SQLite, check engine status (SQLite has no pre-existing sessions)
-                if DataBase.wadas_db.type != DataBase.DBTypes.SQLITE:
-                    with engine.connect() as connection:
-                        if connection.invalidated:
-                            logger.warning("Connection invalidated, disposing engine...")
-                            engine.dispose()
-                            DataBase.wadas_db_engine = None  # Force new engine
-                            engine = cls.get_engine()
-
-                Session = sessionmaker(bind=engine)
-                return Session()
+            if cls.get_engine():
+                return session_factory()
             else:
                 logger.error("Unable to create a session as DB engine is not initialized.")
                 return None
@@ -263,6 +364,8 @@ class DataBase(ABC):
                 return result[0] if result else None
             except Exception:
                 return None
+            finally:
+                session.close()
         else:
             return None
 
@@ -276,9 +379,43 @@ class DataBase(ABC):
                 return result[0] if result else None
             except Exception:
                 return None
+            finally:
+                session.close()
         else:
             return None
 
+    @classmethod
+    def upgrade_db(cls):
+        """Method to upgrade the schema of a db created by a previous WADAS version, creating
+        the tables and indexes it misses. Returns True if the db schema is up to date."""
+
+        if not (db_version := cls.get_db_version()):
+            logger.error("Unable to upgrade db as its version is not found.")
+            return False
+        if Version(db_version.lstrip("v")) >= Version(__dbversion__.lstrip("v")):
+            return True
+
+        logger.info("Upgrading database from version %s to %s...", db_version, __dbversion__)
+        try:
+            engine = cls.get_engine()
+            Base.metadata.create_all(engine)
+            # Indexes of existing tables are not created by create_all
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(engine, checkfirst=True)
+        except SQLAlchemyError:
+            logger.exception("Unable to upgrade database schema.")
+            return False
+
+        stmt = update(ORMDBMetadata).values(
+            version=__dbversion__, applied_at=get_precise_timestamp()
+        )
+        if not cls.run_query(stmt):
+            return False
+        DataBase.wadas_db.version = __dbversion__
+        logger.info("Database upgraded to version %s.", __dbversion__)
+        return True
+
     @classmethod
     def run_query(cls, stmt):
         """Generic method to run a query starting from a statement as input and handling
@@ -319,38 +456,28 @@ class DataBase(ABC):
         if session := cls.create_session():
             try:
                 foreign_key = []
-                if isinstance(domain_object, DetectionEvent):
-                    # If Camera associated to the detection event is not in db abort insertion
+                if isinstance(domain_object, (DetectionEvent, TunnelCountEvent)):
+                    # If Camera associated to the event is not in db abort insertion
                     foreign_key.append(
-                        session.query(ORMCamera.db_id)
-                        .filter(
-                            and_(
-                                ORMCamera.camera_id == domain_object.camera_id,
-                                ORMCamera.deletion_date.is_(None),
-                            )
+                        cls.camera_ids.lookup(session, [domain_object.camera_id]).get(
+                            domain_object.camera_id
                         )
-                        .scalar()
                     )
-                    if not foreign_key:
+                    if not foreign_key[0]:
                         logger.error(
-                            "Unable to add Detection event into db as %s "
-                            "camera id is not found in db.",
+                            "Unable to add %s into db as %s camera id is not found in db.",
+                            type(domain_object).__name__,
                             domain_object.camera_id,
                         )
                         return
                 if isinstance(domain_object, ActuationEvent):
                     # If Actuator associated to the actuation event is not in db abort insertion
                     foreign_key.append(
-                        session.query(ORMActuator.db_id)
-                        .filter(
-                            and_(
-                                ORMActuator.actuator_id == domain_object.actuator_id,
-                                ORMActuator.deletion_date.is_(None),
-                            )
+                        cls.actuator_ids.lookup(session, [domain_object.actuator_id]).get(
+                            domain_object.actuator_id
                         )
-                        .scalar()
                     )
-                    if not foreign_key:
+                    if not foreign_key[0]:
                         logger.error(
                             "Unable to add Actuation event into db as %s actuator id is not found"
                             " in db.",
@@ -453,6 +580,162 @@ class DataBase(ABC):
                 "Unable to update detection event into db as session could not be created."
             )
 
+    @staticmethod
+    def detection_event_record(
+        detection_event: DetectionEvent, store_classified_animals=True, actuation_events=()
+    ):
+        """Method to convert a detection event, together with its classified animals and its
+        actuation events, into a JSON serializable record to be stored with
+        persist_detection_events"""
+
+        detections = detection_event.detected_animals.get("detections")
+        return {
+            "camera_id": detection_event.camera_id,
+            "time_stamp": detection_event.time_stamp.isoformat(),
+            "original_image": detection_event.original_image,
+            "detection_img_path": detection_event.detection_img_path,
+            "detected_animals": len(detections.xyxy) if detections is not None else 0,
+            "classification": detection_event.classification,
+            "classification_img_path": detection_event.classification_img_path,
+            "classified_animals": [
+                [
+                    classified_animal["classification"][0],
+                    float(classified_animal["classification"][1]),
+                ]
+                for classified_animal in (detection_event.classified_animals or [])
+                if store_classified_animals
+            ],
+            "actuation_events": [
+                {
+                    "actuator_id": actuation_event.actuator_id,
+                    "time_stamp": actuation_event.time_stamp.isoformat(),
+                    "command": next(iter(json.loads(actuation_event.command.value))),
+                }
+                for actuation_event in actuation_events
+            ],
+        }
+
+    @classmethod
+    def persist_detection_event(
+        cls, detection_event: DetectionEvent, store_classified_animals=True, actuation_events=()
+    ):
+        """Method to insert a detection event into the db together with its classified animals
+        and its actuation events, as a single transaction.
+        Returns True if the detection event has been stored."""
+
+        return bool(
+            cls.persist_detection_events(
+                [
+                    cls.detection_event_record(
+                        detection_event, store_classified_animals, actuation_events
+                    )
+                ]
+            )
+        )
+
+    @classmethod
+    def persist_detection_events(cls, records):
+        """Method to insert into the db a batch of detection event records (see
+        detection_event_record) as a single transaction.
+        Returns the number of stored detection events, 0 if the transaction fails, or None if the
+        db connection is lost and the batch can be written again later."""
+
+        logger.debug("Inserting %s detection event(s) into db...", len(records))
+        if not (session := cls.create_session()):
+            logger.error(
+                "Failed to insert detection events into db as session could not been created."
+            )
+            return None
+
+        try:
+            # Look up the ids of all the cameras and actuators of the batch at once
+            camera_db_ids = cls.camera_ids.lookup(
+                session, {record["camera_id"] for record in records}
+            )
+            actuator_db_ids = cls.actuator_ids.lookup(
+                session,
+                {
+                    actuation_event["actuator_id"]
+                    for record in records
+                    for actuation_event in record["actuation_events"]
+                },
+            )
+
+            stored_records = []
+            for record in records:
+                if not (camera_db_id := camera_db_ids.get(record["camera_id"])):
+                    logger.error(
+                        "Unable to add DetectionEvent into db as %s camera id is not found in db.",
+                        record["camera_id"],
+                    )
+                    continue
+
+                orm_detection_event = ORMDetectionEvent(
+                    camera_id=camera_db_id,
+                    time_stamp=datetime.fromisoformat(record["time_stamp"]),
+                    original_image=record["original_image"],
+                    detection_img_path=record["detection_img_path"],
+                    detected_animals=record["detected_animals"],
+                    classification=record["classification"],
+                    classification_img_path=record["classification_img_path"],
+                )
+                session.add(orm_detection_event)
+                stored_records.append((orm_detection_event, record))
+            # Detection events ids are needed by their classified animals and actuation events
+            session.flush()
+
+            classified_animals = [
+                {
+                    "detection_event_id": orm_detection_event.db_id,
+                    "classified_animal": classified_animal,
+                    "probability": probability,
+                }
+                for orm_detection_event, record in stored_records
+                for classified_animal, probability in record["classified_animals"]
+            ]
+            actuation_events = []
+            for orm_detection_event, record in stored_records:
+                for actuation_event in record["actuation_events"]:
+                    if not (actuator_db_id := actuator_db_ids.get(actuation_event["actuator_id"])):
+                        logger.error(
+                            "Unable to add Actuation event into db as %s actuator id is not found"
+                            " in db.",
+                            actuation_event["actuator_id"],
+                        )
+                        continue
+                    actuation_events.append(
+                        {
+                            "actuator_id": actuator_db_id,
+                            "time_stamp": datetime.fromisoformat(actuation_event["time_stamp"]),
+                            "detection_event_id": orm_detection_event.db_id,
+                            "command": actuation_event["command"],
+                        }
+                    )
+            # Rows of the whole batch are inserted at once (executemany)
+            if classified_animals:
+                session.execute(insert(ORMClassifiedAnimals), classified_animals)
+            if actuation_events:
+                session.execute(insert(ORMActuationEvent), actuation_events)
+
+            session.commit()
+            logger.debug("%s detection event(s) successfully added to the db!", len(records))
+            return len(stored_records)
+        except (
+            InterfaceError,
+            SQLAlchemyOperationalError,
+            mariadbOperationalerror,
+            pymysqlOperationalError,
+        ):
+            session.rollback()
+            logger.error("Database connection lost. Insert operation failed.")
+            return None
+        except SQLAlchemyError:
+            session.rollback()
+            logger.exception("Error while inserting detection events into db.")
+            return 0
+        finally:
+            session.close()
+
     @classmethod
     def update_camera(cls, camera, delete_camera=False):
         """Method to reflect camera fields update in db given a camera object"""
@@ -489,6 +772,9 @@ class DataBase(ABC):
         else:
             stmt = update(ORMCamera).where(ORMCamera.db_id == camera_db_id).values(enabled=enabled)
             cls.run_query(stmt)
+        # Invalidate once the update is committed, so that the cache is not filled meanwhile
+        # with the db id of a camera being deleted
+        cls.camera_ids.invalidate(camera_db_id)
         return True
 
     @classmethod
@@ -532,6 +818,9 @@ class DataBase(ABC):
                 .values(enabled=enabled)
             )
             cls.run_query(stmt)
+        # Invalidate once the update is committed, so that the cache is not filled meanwhile
+        # with the db id of an actuator being deleted
+        cls.actuator_ids.invalidate(actuator_db_id)
         return True
 
     @classmethod
@@ -566,6 +855,8 @@ class DataBase(ABC):
                     # Add the actuator to the camera actuators list
                     camera.actuators.append(actuator)
                     session.commit()
+                    cls.camera_ids.invalidate(camera.db_id)
+                    cls.actuator_ids.invalidate(actuator.db_id)
 
                 except InterfaceError:
                     session.rollback()
@@ -607,6 +898,8 @@ class DataBase(ABC):
                     )
                 )
                 cls.run_query(stmt)
+                cls.camera_ids.invalidate(camera_db_id)
+                cls.actuator_ids.invalidate(actuator_db_id)
             else:
                 logger.debug("Could not create db session, skipping actuator association insert.")
 
@@ -615,16 +908,12 @@ class DataBase(ABC):
         """Method to return camera database id (primary key)"""
 
         if session := cls.create_session():
-            return (
-                session.query(ORMCamera.db_id)
-                .filter(
-                    and_(
-                        ORMCamera.camera_id == camera_id,
-                        ORMCamera.deletion_date.is_(None),  # Avoid to return id of deleted camera
-                    )
-                )
-                .scalar()
-            )  # Use scalar() to retrieve the value directly
+            try:
+                # Ids of deleted cameras are not returned
+                return cls.camera_ids.lookup(session, [camera_id]).get(camera_id)
+            finally:
+                # Give the connection back to the pool
+                session.close()
         else:
             logger.debug(
                 "Could not get camera id %s since session has not been created.", camera_id
@@ -636,16 +925,11 @@ class DataBase(ABC):
         """Method to return actuator database id (primary key)"""
 
         if session := cls.create_session():
-            return (
-                session.query(ORMActuator.db_id)
-                .filter(
-                    and_(
-                        ORMActuator.actuator_id == actuator_id,
-                        ORMActuator.deletion_date.is_(None),  # Avoid to return id of deleted camera
-                    )
-                )
-                .scalar()
-            )
+            try:
+                # Ids of deleted actuators are not returned
+                return cls.actuator_ids.lookup(session, [actuator_id]).get(actuator_id)
+            finally:
+                session.close()
         else:
             logger.debug(
                 "Could not get actuator id %s since session has not been created.", actuator_id
@@ -664,16 +948,19 @@ class DataBase(ABC):
             return None
 
         if session := cls.create_session():
-            return (
-                session.query(ORMDetectionEvent.db_id)
-                .filter(
-                    and_(
-                        ORMDetectionEvent.camera_id == camera_db_id,
-                        ORMDetectionEvent.time_stamp == detection_event.time_stamp,
+            try:
+                return (
+                    session.query(ORMDetectionEvent.db_id)
+                    .filter(
+                        and_(
+                            ORMDetectionEvent.camera_id == camera_db_id,
+                            ORMDetectionEvent.time_stamp == detection_event.time_stamp,
+                        )
                     )
-                )
-                .scalar()
-            )  # Use scalar() to retrieve the value directly
+                    .scalar()
+                )  # Use scalar() to retrieve the value directly
+            finally:
+                session.close()
         else:
             logger.error(
                 "Could not retrieve detection event id as connection could not be created."
@@ -736,6 +1023,15 @@ class DataBase(ABC):
                 classification=domain_object.classification,
                 classification_img_path=domain_object.classification_img_path,
             )
+        elif isinstance(domain_object, TunnelCountEvent):
+            return ORMTunnelCountEvent(
+                camera_id=foreign_key[0],
+                tunnel_id=domain_object.tunnel_id,
+                time_stamp=domain_object.time_stamp,
+                animal=domain_object.animal,
+                direction=domain_object.direction,
+                count=domain_object.count,
+            )
         elif isinstance(domain_object, DBMetadata):
             return ORMDBMetadata(
                 version=domain_object.version,
@@ -798,12 +1094,16 @@ class DataBase(ABC):
         if cameras:
             for camera in cameras:
                 cls.insert_into_db(camera)
+        cls.populate_id_cache()
 
     @classmethod
     def sanitize_db(cls):
         """Method to align db tables with domain model"""
 
         if session := cls.create_session():
+            # Cameras and actuators can be deleted or replaced while sanitizing
+            cls.camera_ids.invalidate()
+            cls.actuator_ids.invalidate()
             try:
                 # Check if actuators in model are reflected into db
                 for actuator_id in Actuator.actuators:
@@ -902,9 +1202,29 @@ class DataBase(ABC):
                 logger.exception("Unexpected error occurred while sanitizing the in db.")
             finally:
                 session.close()
+            cls.populate_id_cache()
         else:
             logger.error("Could not sanitize db as session has not been created.")
 
+    @classmethod
+    def populate_id_cache(cls):
+        """Method to cache the db ids of all the cameras and actuators in db"""
+
+        if session := cls.create_session():
+            try:
+                cls.camera_ids.populate(session)
+                cls.actuator_ids.populate(session)
+            except SQLAlchemyError:
+                logger.exception("Unable to cache cameras and actuators db ids.")
+            finally:
+                session.close()
+
+    @classmethod
+    def get_id_cache_stats(cls):
+        """Method to return the hit and miss counters of the db id caches"""
+
+        return {"cameras": cls.camera_ids.get_stats(), "actuators": cls.actuator_ids.get_stats()}
+
     @classmethod
     def get_users(cls):
         """Method to retrieve users from db"""
@@ -1078,6 +1398,17 @@ class DataBase(ABC):
     def serialize(self):
         """Method to serialize DataBase object into file."""
 
+    @staticmethod
+    def serialize_pool_settings():
+        """Method to serialize the connection pool settings of MySQL and MariaDB databases"""
+
+        return {
+            "pool_size": DataBase.pool_size,
+            "max_overflow": DataBase.max_overflow,
+            "pool_pre_ping": DataBase.pool_pre_ping,
+            "pool_recycle": DataBase.pool_recycle,
+        }
+
     @classmethod
     def deserialize(cls, data):
         """Method to deserialize DataBase object from file."""
@@ -1107,6 +1438,11 @@ class DataBase(ABC):
                 logger.error("Wrong deserialized db type!")
                 return False
 
+        DataBase.pool_size = data.get("pool_size", 5)
+        DataBase.max_overflow = data.get("max_overflow", 10)
+        DataBase.pool_pre_ping = data.get("pool_pre_ping", True)
+        DataBase.pool_recycle = data.get("pool_recycle", 1800)
+
         return cls.initialize(
             db_type,
             data["host"],
@@ -1177,6 +1513,7 @@ class MySQLDataBase(DataBase):
             "database_name": self.database_name,
             "enabled": self.enabled,
             "version": self.version,
+            **DataBase.serialize_pool_settings(),
         }
 
 
@@ -1240,6 +1577,7 @@ class MariaDBDataBase(DataBase):
             "database_name": self.database_name,
             "enabled": self.enabled,
             "version": self.version,
+            **DataBase.serialize_pool_settings(),
         }
 
 
@@ -27,6 +27,7 @@ from sqlalchemy.types import DateTime, TypeDecorator
 from wadas._version import __dbversion__
 from wadas.domain.actuator import Actuator as DomainActuator
 from wadas.domain.camera import Camera as DomainCamera
+from wadas.domain.tunnel_count_event import TunnelCountEvent as DomainTunnelCountEvent
 
 Base = declarative_base()
 
@@ -80,6 +81,9 @@ class Camera(Base):
     detection_events = relationship(
         "DetectionEvent", back_populates="camera", cascade="all, delete-orphan"
     )
+    tunnel_count_events = relationship(
+        "TunnelCountEvent", back_populates="camera", cascade="all, delete-orphan"
+    )
     actuators = relationship(
         "Actuator",
         secondary=camera_actuator_association,
@@ -194,6 +198,20 @@ class ActuationEvent(Base):
     detection_event = relationship("DetectionEvent", back_populates="actuation_events")
 
 
+class TunnelCountEvent(Base):
+    __tablename__ = "tunnel_count_events"
+
+    db_id = Column(Integer, primary_key=True, autoincrement=True, name="id")
+    camera_id = Column(Integer, ForeignKey("cameras.id"), nullable=False)
+    tunnel_id = Column(String(255), nullable=False)
+    time_stamp = Column(MySQLDATETIME6(timezone=True), nullable=False)
+    animal = Column(String(255), nullable=False)
+    direction = Column(SqlEnum(DomainTunnelCountEvent.Directions), nullable=False)
+    count = Column(Integer, nullable=False)
+
+    camera = relationship("Camera", back_populates="tunnel_count_events")
+
+
 # Database service tables, not mapped with any WADAS class
 class User(Base):
     __tablename__ = "users"
@@ -218,4 +236,15 @@ class DBMetadata(Base):
 
 # Indexes
 Index("ix_detection_events_camera_time", DetectionEvent.camera_id, DetectionEvent.time_stamp)
+Index("ix_detection_events_time", DetectionEvent.time_stamp)
+Index("ix_classified_animals_detection_event", ClassifiedAnimals.detection_event_id)
+# Text columns can only be indexed on a prefix by MySQL and MariaDB
+Index(
+    "ix_classified_animals_animal_detection_event",
+    ClassifiedAnimals.classified_animal,
+    ClassifiedAnimals.detection_event_id,
+    mysql_length={"classified_animal": 64},
+    mariadb_length={"classified_animal": 64},
+)
 Index("ix_actuation_events_actuator_time", ActuationEvent.actuator_id, ActuationEvent.time_stamp)
+Index("ix_actuation_events_detection_event", ActuationEvent.detection_event_id)
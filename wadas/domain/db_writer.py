@@ -0,0 +1,245 @@
+# This file is part of WADAS project.
+#
+# WADAS is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# WADAS is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with WADAS. If not, see <https://www.gnu.org/licenses/>.
+#
+# Author(s): Stefano Dell'Osa, Alessandro Palla, Cesare Di Mauro, Antonio Farina
+# Date: 2026-10-18
+# Description: Write-behind database writer module.
+
+import itertools
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from queue import Full, Queue
+
+from wadas.domain.database import DataBase
+from wadas.domain.utils import get_batch_from_queue
+
+logger = logging.getLogger(__name__)
+
+
+class DBWriter:
+    """Write-behind writer storing detection event records (see
+    DataBase.detection_event_record) into the db from a background thread, so that processing
+    media does not wait for the db.
+    Records are written in batches, each as a single transaction. If a batch transaction fails
+    its records are written one at a time, so that a bad record does not lose the whole batch.
+    Batches that cannot be written as the db is unreachable are spooled to disk, and written
+    again once the db is back."""
+
+    # Maximum number of records waiting to be written, records beyond it are spooled to disk
+    max_queue_size = 1000
+    # Records are written once batch_size of them are pending, or flush_interval seconds after
+    # the first one has been queued
+    batch_size = 50
+    flush_interval = 0.5
+    # Seconds to wait before retrying a batch after the db connection is lost, doubled at
+    # each retry
+    retry_delay = 1
+    spool_dir = Path("db_spool")
+
+    def __init__(self):
+        self.queue = Queue(self.max_queue_size)
+        self.thread = None
+        self.spool_lock = threading.Lock()
+        self.spool_ids = itertools.count()
+        self.spool_pending = True
+        # Counters are updated by both producers and writer thread
+        self.stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset writer counters"""
+
+        with self.stats_lock:
+            self.stats = {
+                "queued": 0,
+                "written": 0,
+                "batches": 0,
+                "retries": 0,
+                "spooled": 0,
+                "replayed": 0,
+                "dropped": 0,
+            }
+
+    def get_stats(self):
+        """Return a snapshot of writer counters, along with the records waiting to be written"""
+
+        with self.stats_lock:
+            return {**self.stats, "pending": self.queue.qsize()}
+
+    def _update_stats(self, **counts):
+        """Add counts to writer counters"""
+
+        with self.stats_lock:
+            for key, count in counts.items():
+                self.stats[key] += count
+
+    def start(self):
+        """Start the writer thread, writing first the records spooled by previous runs"""
+
+        if self.thread:
+            return
+        self.thread = threading.Thread(target=self._run, name="db_writer", daemon=True)
+        self.thread.start()
+        logger.info("DB writer started.")
+
+    def stop(self):
+        """Stop the writer thread once all the queued records have been written or spooled"""
+
+        if not self.thread:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        logger.info("DB writer stopped.")
+
+    def put(self, record):
+        """Queue a record to be written. If the queue is full the record is spooled to disk
+        instead of blocking the caller."""
+
+        self._update_stats(queued=1)
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            logger.warning("DB writer queue full, spooling detection event to disk.")
+            self._spool([record])
+
+    def _run(self):
+        """Write queued records in batches until None is received"""
+
+        self._replay_spool()
+        stopping = False
+        while not stopping:
+            batch = get_batch_from_queue(
+                self.queue, self.batch_size, self.flush_interval, timeout=self.flush_interval
+            )
+            if None in batch:
+                stopping = True
+                batch.remove(None)
+                # Flush whatever is left in the queue before stopping
+                while not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+            if batch and self._write(batch, stopping) and self.spool_pending and not stopping:
+                self._replay_spool()
+
+    @staticmethod
+    def _persist(records):
+        """Store records into db as a single transaction or, if the transaction fails, one
+        record at a time. Returns the number of stored records and the records left to store as
+        the db connection has been lost."""
+
+        if (written := DataBase.persist_detection_events(records)) is None:
+            return 0, records
+        if written or len(records) == 1:
+            return written, []
+
+        logger.warning("Writing %s detection event(s) one at a time.", len(records))
+        for idx, record in enumerate(records):
+            if (stored := DataBase.persist_detection_events([record])) is None:
+                return written, records[idx:]
+            written += stored
+        return written, []
+
+    def _write(self, records, stopping=False):
+        """Write records with retries on db connection loss, spooling them to disk if the db
+        cannot be reached. Returns True if the records reached the db."""
+
+        for retry in range(DataBase.max_reconn_retries + 1):
+            if retry:
+                self._update_stats(retries=1)
+                logger.warning(
+                    "Database connection lost. Retrying... (%s/%s)",
+                    retry,
+                    DataBase.max_reconn_retries,
+                )
+                # Do not delay shutdown, records are spooled if the db is still unreachable
+                if not stopping:
+                    time.sleep(self.retry_delay * 2 ** (retry - 1))
+                if engine := DataBase.wadas_db_engine:
+                    engine.dispose()
+
+            written, remaining = self._persist(records)
+            self._update_stats(written=written, dropped=len(records) - len(remaining) - written)
+            records = remaining
+            if not records:
+                self._update_stats(batches=1)
+                return True
+
+        logger.error("Unable to write %s detection event(s) into db.", len(records))
+        self._spool(records)
+        return False
+
+    def _spool(self, records):
+        """Save records to a new spool file"""
+
+        with self.spool_lock:
+            try:
+                self.spool_dir.mkdir(parents=True, exist_ok=True)
+                spool_path = (
+                    self.spool_dir / f"{time.time_ns():020d}_{next(self.spool_ids):06d}.json"
+                )
+                with open(spool_path, "w") as f:
+                    json.dump(records, f)
+            except OSError:
+                logger.exception("Unable to spool %s detection event(s).", len(records))
+                self._update_stats(dropped=len(records))
+                return
+            self._update_stats(spooled=len(records))
+            self.spool_pending = True
+            logger.info("%s detection event(s) spooled to %s.", len(records), spool_path)
+
+    @staticmethod
+    def _rewrite_spool(spool_path, records):
+        """Replace the records of a spool file with the ones still to be written"""
+
+        try:
+            with open(spool_path, "w") as f:
+                json.dump(records, f)
+        except OSError:
+            logger.exception("Unable to update spooled detection events %s.", spool_path)
+
+    def _replay_spool(self):
+        """Write the spooled records into db, in the order they have been spooled.
+        The spool lock is only held to access spool files, so that records spooled by
+        producers are not delayed by db writes."""
+
+        with self.spool_lock:
+            spool_paths = sorted(self.spool_dir.glob("*.json"))
+            # Files spooled from now on are replayed at the next call
+            self.spool_pending = False
+
+        for spool_path in spool_paths:
+            try:
+                with self.spool_lock, open(spool_path) as f:
+                    records = json.load(f)
+            except (OSError, ValueError):
+                logger.exception("Unable to read spooled detection events %s.", spool_path)
+                continue
+
+            written, remaining = self._persist(records)
+            self._update_stats(replayed=written, dropped=len(records) - len(remaining) - written)
+            if written:
+                logger.info("%s spooled detection event(s) written into db.", written)
+            if remaining:
+                # Db still unreachable, keep the records not written yet for a later attempt
+                if len(remaining) < len(records):
+                    with self.spool_lock:
+                        self._rewrite_spool(spool_path, remaining)
+                self.spool_pending = True
+                return
+            with self.spool_lock:
+                spool_path.unlink()
@@ -0,0 +1,90 @@
+# This file is part of WADAS project.
+#
+# WADAS is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# WADAS is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with WADAS. If not, see <https://www.gnu.org/licenses/>.
+#
+# Author(s): Stefano Dell'Osa, Alessandro Palla, Cesare Di Mauro, Antonio Farina
+# Date: 2026-10-18
+# Description: In-memory camera frame module.
+
+import logging
+import threading
+
+import cv2
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+class MediaFrame:
+    """Decoded camera frame travelling on media queue along with its media path, so that
+    the image file is only written if animals are detected in it.
+    Frames are reference counted: a frame is released as soon as no media refers to it,
+    whether it has been processed or dropped by media queue."""
+
+    _lock = threading.Lock()
+    _live_frames = 0
+
+    def __init__(self, image, reserved=False):
+        """Wrap a BGR image. reserved is True if the frame has been already counted by
+        create."""
+
+        self.image = image
+        if not reserved:
+            with MediaFrame._lock:
+                MediaFrame._live_frames += 1
+        self._counted = True
+
+    def __del__(self):
+        # Frames whose construction failed are not counted
+        if getattr(self, "_counted", False):
+            with MediaFrame._lock:
+                MediaFrame._live_frames -= 1
+
+    @classmethod
+    def live_frames(cls):
+        """Return the number of frames currently in memory"""
+
+        with cls._lock:
+            return cls._live_frames
+
+    @classmethod
+    def create(cls, image, max_frames):
+        """Return a new frame wrapping a BGR image, or None if max_frames frames are already in
+        memory, in which case the image should be handed off as a file."""
+
+        with cls._lock:
+            if cls._live_frames >= max_frames:
+                return None
+            # Frame is counted along with the check, so that concurrent cameras cannot exceed
+            # max_frames
+            cls._live_frames += 1
+        try:
+            return cls(image, reserved=True)
+        except BaseException:
+            with cls._lock:
+                cls._live_frames -= 1
+            raise
+
+    def to_pil(self):
+        """Return the frame as RGB PIL image"""
+
+        return Image.fromarray(cv2.cvtColor(self.image, cv2.COLOR_BGR2RGB))
+
+    def save(self, path):
+        """Write the frame into an image file"""
+
+        if not cv2.imwrite(str(path), self.image):
+            logger.error("Unable to write frame into %s.", path)
+            return False
+        return True
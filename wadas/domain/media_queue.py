@@ -0,0 +1,251 @@
+# This file is part of WADAS project.
+#
+# WADAS is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# WADAS is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with WADAS. If not, see <https://www.gnu.org/licenses/>.
+#
+# Author(s): Stefano Dell'Osa, Alessandro Palla, Cesare Di Mauro, Antonio Farina
+# Date: 2026-10-18
+# Description: Bounded and priority aware media queue module.
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from enum import Enum
+from queue import Empty
+
+logger = logging.getLogger(__name__)
+
+
+class MediaQueue:
+    """Bounded queue of the media received by cameras, with the same get/put interface
+    of queue.Queue.
+    Media are kept in a queue per camera and served in round robin among cameras, so that a
+    chatty camera cannot starve the others. Media of priority cameras (e.g. with actuators
+    attached) are always served first. When the queue is full the oldest media of the camera
+    with most pending media is dropped. Dropped and expired media are discarded, removing
+    their files."""
+
+    class SheddingPolicies(Enum):
+        # Only drop the oldest media when the queue is full
+        DROP_OLDEST = "drop_oldest"
+        # Above the shedding threshold, videos are analyzed at a lower frame rate
+        DOWNSAMPLE_VIDEO = "downsample_video"
+        # Above the shedding threshold, media are only processed by the detection model
+        SKIP_CLASSIFICATION = "skip_classification"
+
+    # Maximum number of pending media, 0 for an unbounded queue
+    max_size = 200
+    # Pending media older than max_age seconds are discarded, 0 to never expire media
+    max_age = 0
+    shedding_policy = SheddingPolicies.DROP_OLDEST
+    # Fraction of max_size above which the shedding policy is applied to incoming media
+    shedding_threshold = 0.8
+    # Scale applied to the video analysis frame rate by DOWNSAMPLE_VIDEO policy
+    downsample_video_scale = 0.5
+
+    def __init__(self, is_priority_camera=None):
+        self.is_priority_camera = is_priority_camera or (lambda camera_id: False)
+        self.lock = threading.Condition()
+        # Pending (enqueue time, media) per camera, and cameras with pending media to serve
+        self.camera_queues = {}
+        self.priority_cameras = deque()
+        self.cameras = deque()
+        self.size = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset queue counters"""
+
+        with self.lock:
+            self.stats = {
+                "put": 0,
+                "served": 0,
+                "dropped": 0,
+                "expired": 0,
+                "shed": 0,
+                "max_depth": 0,
+                "total_wait": 0.0,
+                "max_wait": 0.0,
+            }
+
+    def get_stats(self):
+        """Return a snapshot of queue counters, along with current depth and average wait"""
+
+        with self.lock:
+            stats = dict(self.stats)
+            stats["depth"] = self.size
+            stats["average_wait"] = (
+                stats["total_wait"] / stats["served"] if stats["served"] else 0.0
+            )
+            return stats
+
+    def put(self, media):
+        """Enqueue a media, applying the shedding policy if the queue is overloaded"""
+
+        camera_id = media.get("camera_id")
+        priority = self.is_priority_camera(camera_id)
+        dropped = None
+        with self.lock:
+            if self.max_size and self.size >= self.shedding_threshold * self.max_size:
+                self._shed(media)
+            if self.max_size and self.size >= self.max_size:
+                dropped = self._drop_oldest()
+
+            if not (camera_queue := self.camera_queues.get(camera_id)):
+                camera_queue = self.camera_queues[camera_id] = deque()
+                (self.priority_cameras if priority else self.cameras).append(camera_id)
+            camera_queue.append((time.monotonic(), media))
+            self.size += 1
+            self.stats["put"] += 1
+            self.stats["max_depth"] = max(self.stats["max_depth"], self.size)
+            # Consumers skipping some cameras may not be interested in this media
+            self.lock.notify_all()
+        # Media files are removed out of the lock, not to block cameras and media consumers
+        if dropped:
+            self.discard_media(dropped)
+
+    def get(self, block=True, timeout=None, skip_cameras=()):
+        """Remove and return the next media to process, ignoring the media of skip_cameras.
+        Raises queue.Empty if no media is available within timeout seconds."""
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        expired = []
+        try:
+            with self.lock:
+                while True:
+                    while not self._has_media(skip_cameras):
+                        if not block:
+                            raise Empty
+                        if deadline is None:
+                            self.lock.wait()
+                        elif (remaining := deadline - time.monotonic()) > 0:
+                            self.lock.wait(remaining)
+                        else:
+                            raise Empty
+
+                    enqueued, media = self._pop_next(skip_cameras)
+                    wait = time.monotonic() - enqueued
+                    if self.max_age and wait > self.max_age:
+                        self.stats["expired"] += 1
+                        logger.warning(
+                            "Discarding %s from camera %s, pending since %.1f seconds.",
+                            media.get("media_path"),
+                            media.get("camera_id"),
+                            wait,
+                        )
+                        expired.append(media)
+                        continue
+
+                    self.stats["served"] += 1
+                    self.stats["total_wait"] += wait
+                    self.stats["max_wait"] = max(self.stats["max_wait"], wait)
+                    return media
+        finally:
+            for media in expired:
+                self.discard_media(media)
+
+    def get_nowait(self, skip_cameras=()):
+        return self.get(block=False, skip_cameras=skip_cameras)
+
+    def qsize(self):
+        with self.lock:
+            return self.size
+
+    def empty(self):
+        return not self.qsize()
+
+    def clear(self):
+        """Remove all the pending media"""
+
+        with self.lock:
+            self.camera_queues.clear()
+            self.priority_cameras.clear()
+            self.cameras.clear()
+            self.size = 0
+
+    @staticmethod
+    def discard_media(media):
+        """Release a media which is not going to be processed any further: in-memory frames
+        are released, media files are removed"""
+
+        if media.pop("frame", None) is not None:
+            return
+        try:
+            os.remove(media["media_path"])
+        except OSError:
+            logger.warning("Could not remove %s", media["media_path"])
+
+    def _has_media(self, skip_cameras):
+        """Return True if there are pending media of cameras not in skip_cameras"""
+
+        if not skip_cameras:
+            return bool(self.size)
+        return any(camera_id not in skip_cameras for camera_id in self.camera_queues)
+
+    def _pop_next(self, skip_cameras=()):
+        """Pop the oldest media of the next camera to serve not in skip_cameras,
+        priority cameras first"""
+
+        cameras, idx = next(
+            (cameras, idx)
+            for cameras in (self.priority_cameras, self.cameras)
+            for idx, camera_id in enumerate(cameras)
+            if camera_id not in skip_cameras
+        )
+        camera_id = cameras[idx]
+        del cameras[idx]
+        camera_queue = self.camera_queues[camera_id]
+        item = camera_queue.popleft()
+        if camera_queue:
+            cameras.append(camera_id)
+        else:
+            del self.camera_queues[camera_id]
+        self.size -= 1
+        return item
+
+    def _drop_oldest(self):
+        """Drop and return the oldest media of the camera with most pending media,
+        sparing priority cameras as long as possible"""
+
+        cameras = self.cameras or self.priority_cameras
+        camera_id = max(cameras, key=lambda cur_id: len(self.camera_queues[cur_id]))
+        camera_queue = self.camera_queues[camera_id]
+        _, media = camera_queue.popleft()
+        if not camera_queue:
+            cameras.remove(camera_id)
+            del self.camera_queues[camera_id]
+        self.size -= 1
+        self.stats["dropped"] += 1
+        logger.warning(
+            "Media queue full, dropping %s from camera %s.", media.get("media_path"), camera_id
+        )
+        return media
+
+    def _shed(self, media):
+        """Reduce the processing cost of a media according to the shedding policy"""
+
+        if self.shedding_policy == MediaQueue.SheddingPolicies.DOWNSAMPLE_VIDEO:
+            # Images are not affected by video downsampling
+            if not re.search(
+                r"\.(avi|mov|mp4|mkv|wmv)$", str(media.get("media_path")), re.IGNORECASE
+            ):
+                return
+            media["video_fps_scale"] = self.downsample_video_scale
+        elif self.shedding_policy == MediaQueue.SheddingPolicies.SKIP_CLASSIFICATION:
+            media["skip_classification"] = True
+        else:
+            return
+        self.stats["shed"] += 1
@@ -0,0 +1,128 @@
+# This file is part of WADAS project.
+#
+# WADAS is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# WADAS is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with WADAS. If not, see <https://www.gnu.org/licenses/>.
+#
+# Author(s): Stefano Dell'Osa, Alessandro Palla, Cesare Di Mauro, Antonio Farina
+# Date: 2026-10-18
+# Description: Motion analysis module of camera video streams.
+
+import logging
+import time
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+
+class MotionAnalyzer:
+    """Background subtraction based motion analysis of camera video streams.
+    Motion is analyzed on a downscaled (and optionally grayscale) copy of the frames, so that
+    its cost does not depend on camera resolution. Full resolution frames are only needed for
+    the images sent to the detection model."""
+
+    def __init__(
+        self,
+        threshold=180,
+        min_contour_area=300,
+        analysis_width=640,
+        grayscale=True,
+        cpu_budget=0,
+        apply_roi=None,
+    ):
+        """
+        Args:
+            threshold (int, optional): Foreground mask threshold, to remove shadows.
+            min_contour_area (int, optional): Minimum area of motion contours, in pixels of the
+                                              full resolution frame.
+            analysis_width (int, optional): Width of the frames copy motion is analyzed on,
+                                            0 to analyze full resolution frames.
+            grayscale (bool, optional): Whether to analyze a grayscale copy of the frames.
+            cpu_budget (float, optional): Fraction of a CPU core motion analysis can use,
+                                          frames are skipped to stay within it. 0 for no limit.
+            apply_roi (callable, optional): Function restricting the foreground mask to the
+                                            regions of interest, see MotionGate.apply_roi.
+        """
+        self.threshold = threshold
+        self.min_contour_area = min_contour_area
+        self.analysis_width = analysis_width
+        self.grayscale = grayscale
+        self.cpu_budget = cpu_budget
+        self.apply_roi = apply_roi
+        self.background_sub = cv2.createBackgroundSubtractorMOG2()
+        # Scale of analyzed frames with respect to full resolution ones, set on first frame
+        self.scale = None
+        self.next_analysis_time = 0
+        self.stats = {"analyzed": 0, "skipped": 0, "cpu_time": 0.0}
+
+    def get_stats(self):
+        """Return a snapshot of analysis counters, along with the average cost per frame"""
+
+        stats = dict(self.stats)
+        stats["average_cpu_time"] = (
+            stats["cpu_time"] / stats["analyzed"] if stats["analyzed"] else 0.0
+        )
+        return stats
+
+    def is_due(self):
+        """Check whether next frame can be analyzed within the CPU budget.
+        Frames that are not analyzed can be grabbed without being decoded."""
+
+        if self.cpu_budget and time.monotonic() < self.next_analysis_time:
+            self.stats["skipped"] += 1
+            return False
+        return True
+
+    def prepare(self, frame):
+        """Return the downscaled (and optionally grayscale) copy of a frame to analyze"""
+
+        if self.scale is None:
+            width = frame.shape[1]
+            self.scale = min(1.0, self.analysis_width / width) if self.analysis_width else 1.0
+        if self.grayscale and frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.scale < 1.0:
+            frame = cv2.resize(
+                frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA
+            )
+        return frame
+
+    def analyze(self, frame):
+        """Analyze motion of a frame.
+        Returns the analyzed copy of the frame and its motion contours, in the coordinates of
+        the analyzed copy (see to_frame_box)."""
+
+        start_cpu_time, start_time = time.thread_time(), time.monotonic()
+
+        analyzed_frame = self.prepare(frame)
+        foreground_mask = self.background_sub.apply(analyzed_frame)
+        # Apply global threshold to remove shadows
+        _, mask_thresh = cv2.threshold(foreground_mask, self.threshold, 255, cv2.THRESH_BINARY)
+        if self.apply_roi:
+            mask_thresh = self.apply_roi(mask_thresh)
+        contours, _ = cv2.findContours(mask_thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        # Contour areas scale with the square of frame scale
+        min_contour_area = self.min_contour_area * self.scale**2
+        contours = [cnt for cnt in contours if cv2.contourArea(cnt) > min_contour_area]
+
+        cpu_time = time.thread_time() - start_cpu_time
+        self.stats["analyzed"] += 1
+        self.stats["cpu_time"] += cpu_time
+        if self.cpu_budget:
+            self.next_analysis_time = start_time + cpu_time / self.cpu_budget
+        return analyzed_frame, contours
+
+    def to_frame_box(self, contour):
+        """Return the (x, y, w, h) bounding box of a contour in full resolution coordinates"""
+
+        return tuple(int(value / self.scale) for value in cv2.boundingRect(contour))
@@ -26,6 +26,7 @@ from PySide6.QtCore import QThread, Signal
 from PySide6.QtGui import QImage
 
 from wadas.domain.camera import Camera
+from wadas.domain.motion_analyzer import MotionAnalyzer
 
 
 class MotionDetectionThread(QThread):
@@ -46,22 +47,22 @@ class MotionDetectionThread(QThread):
             print("Error: Unable to open camera.")
             return
 
-        background_sub = cv2.createBackgroundSubtractorMOG2()
-        min_contour_area = Camera.detection_params["min_contour_area"]
+        # Motion is analyzed on a downscaled copy of the frames, boxes are drawn on the frame
+        motion_analyzer = MotionAnalyzer(
+            Camera.detection_params["threshold"],
+            Camera.detection_params["min_contour_area"],
+            Camera.detection_params.get("analysis_width", 640),
+            Camera.detection_params.get("analysis_grayscale", True),
+        )
         while self.running:
             ret, frame = cap.read()
             if not ret:
                 break
 
-            # Apply background subtraction
-            foreground_mask = background_sub.apply(frame)
-            contours, _ = cv2.findContours(
-                foreground_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
-            )
+            _, contours = motion_analyzer.analyze(frame)
             for cnt in contours:
-                if cv2.contourArea(cnt) > min_contour_area:
-                    x, y, w, h = cv2.boundingRect(cnt)
-                    cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 0, 255), 2)
+                x, y, w, h = motion_analyzer.to_frame_box(cnt)
+                cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 0, 255), 2)
 
             # Convert frame to QImage
             frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
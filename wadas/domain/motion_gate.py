@@ -0,0 +1,153 @@
+# This file is part of WADAS project.
+#
+# WADAS is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# WADAS is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with WADAS. If not, see <https://www.gnu.org/licenses/>.
+#
+# Author(s): Stefano Dell'Osa, Alessandro Palla, Cesare Di Mauro, Antonio Farina
+# Date: 2026-10-18
+# Description: Motion detection gate module.
+
+import logging
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def difference_hash(image, hash_size=8):
+    """Return the perceptual difference hash of a grayscale image, as a boolean array"""
+
+    resized = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    return resized[:, 1:] > resized[:, :-1]
+
+
+class MotionGate:
+    """Second stage gate of the motion detected on camera video streams, to discard motion
+    that is not worth sending to the detection model (e.g. wind blown vegetation).
+    A frame passes the gate when its motion, restricted to the regions of interest, persists
+    for persistence_frames consecutive frames and its motion area looks different (perceptual
+    hash) from the same area of the last frame that passed the gate."""
+
+    # Default number of consecutive frames with overlapping motion to pass the gate
+    persistence_frames = 3
+    # Default maximum hash distance (out of 64 bits) of a motion area considered unchanged
+    max_hash_distance = 6
+
+    def __init__(self, roi=None, persistence_frames=None, max_hash_distance=None):
+        """
+        Args:
+            roi (list, optional): Polygons of the regions of interest, as lists of (x, y) points
+                                  relative to frame size (from 0 to 1). Motion outside them is
+                                  ignored. Whole frame is analyzed if no polygon is provided.
+            persistence_frames (int, optional): Consecutive frames with overlapping motion.
+            max_hash_distance (int, optional): Hash distance of unchanged motion areas.
+        """
+        self.roi = roi or []
+        if persistence_frames is not None:
+            self.persistence_frames = persistence_frames
+        if max_hash_distance is not None:
+            self.max_hash_distance = max_hash_distance
+        self.roi_mask = None
+        self.motion_frames = 0
+        self.last_motion_box = None
+        self.reference_frame = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset gate counters"""
+
+        self.stats = {
+            "frames": 0,
+            "motion_frames": 0,
+            "passed": 0,
+            "not_persistent": 0,
+            "unchanged": 0,
+        }
+
+    def get_stats(self):
+        """Return a snapshot of gate counters, along with the fraction of motion frames passed"""
+
+        stats = dict(self.stats)
+        stats["pass_rate"] = (
+            stats["passed"] / stats["motion_frames"] if stats["motion_frames"] else 0.0
+        )
+        return stats
+
+    def apply_roi(self, mask):
+        """Return the motion mask restricted to the regions of interest"""
+
+        if not self.roi:
+            return mask
+        if self.roi_mask is None or self.roi_mask.shape != mask.shape:
+            height, width = mask.shape[:2]
+            self.roi_mask = np.zeros(mask.shape[:2], dtype=np.uint8)
+            polygons = [
+                np.array([(x * width, y * height) for x, y in polygon], dtype=np.int32)
+                for polygon in self.roi
+            ]
+            cv2.fillPoly(self.roi_mask, polygons, 255)
+        return cv2.bitwise_and(mask, self.roi_mask)
+
+    def check(self, frame, contours):
+        """Check whether a frame with the given motion contours passes the gate.
+        It has to be called on every analyzed frame, also without contours, to keep track of
+        motion persistence."""
+
+        self.stats["frames"] += 1
+        if not len(contours):
+            self.motion_frames = 0
+            self.last_motion_box = None
+            return False
+
+        self.stats["motion_frames"] += 1
+        boxes = np.array([cv2.boundingRect(contour) for contour in contours])
+        motion_box = (
+            boxes[:, 0].min(),
+            boxes[:, 1].min(),
+            (boxes[:, 0] + boxes[:, 2]).max(),
+            (boxes[:, 1] + boxes[:, 3]).max(),
+        )
+        if self.last_motion_box is not None and self._overlap(motion_box, self.last_motion_box):
+            self.motion_frames += 1
+        else:
+            self.motion_frames = 1
+        self.last_motion_box = motion_box
+        if self.motion_frames < self.persistence_frames:
+            self.stats["not_persistent"] += 1
+            return False
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        if self.reference_frame is not None and self.reference_frame.shape == gray.shape:
+            x1, y1, x2, y2 = motion_box
+            distance = np.count_nonzero(
+                difference_hash(gray[y1:y2, x1:x2])
+                != difference_hash(self.reference_frame[y1:y2, x1:x2])
+            )
+            if distance <= self.max_hash_distance:
+                self.stats["unchanged"] += 1
+                return False
+
+        self.stats["passed"] += 1
+        return True
+
+    def set_reference(self, frame):
+        """Set the frame sent to the detection model, to compare the next motion areas with"""
+
+        self.reference_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+    @staticmethod
+    def _overlap(box1, box2):
+        """Check whether two (x1, y1, x2, y2) boxes overlap"""
+
+        return box1[0] < box2[2] and box2[0] < box1[2] and box1[1] < box2[3] and box2[1] < box1[3]
@@ -29,8 +29,9 @@ from PySide6.QtCore import QObject, Signal
 from wadas.domain.actuation_event import ActuationEvent
 from wadas.domain.actuator import Actuator
 from wadas.domain.ai_model import AiModel
-from wadas.domain.camera import Camera, cameras
+from wadas.domain.camera import Camera, cameras, media_queue
 from wadas.domain.database import DataBase
+from wadas.domain.db_writer import DBWriter
 from wadas.domain.detection_event import DetectionEvent
 from wadas.domain.fastapi_actuator_server import (
     FastAPIActuatorServer,
@@ -68,6 +69,19 @@ class OperationMode(QObject):
     play_video = Signal(str)
 
     flag_stop_update_actuators_thread = False
+    # Minimum interval, in seconds, between actuator(s) view updates
+    actuators_view_min_interval = 0.5
+
+    # Number of workers processing media in parallel, 1 processes media serially
+    media_workers = 1
+    # Maximum number of media waiting for each worker, further media are left in media queue
+    media_worker_queue_size = 2
+    # Images collected from media queue within media_batch_wait seconds are processed together,
+    # up to media_batch_size at a time
+    media_batch_size = 1
+    media_batch_wait = 0.05
+    # Detection events are written into db by a background writer, not to wait for the db
+    db_write_behind = True
 
     def __init__(self):
         super(OperationMode, self).__init__()
@@ -75,10 +89,14 @@ class OperationMode(QObject):
         self.ai_model = None
         self.last_detection = ""
         self.last_classified_animals_str = ""
+        # Last detection is shown in UI while media workers process other events
+        self.last_detection_lock = threading.Lock()
         self.camera_thread = []
         self.ftp_thread = None
         self.actuators_server_thread = None
         self.actuators_view_thread = None
+        self.actuators_activity = threading.Event()
+        self.db_writer = None
         self.enable_classification = False
 
     def init_model(self):
@@ -125,11 +143,22 @@ class OperationMode(QObject):
         image_formats = r"\.(png|jpg|jpeg)$"
         return bool(re.search(image_formats, str(media_path), re.IGNORECASE))
 
-    def _detect(self, cur_media, classify=False):
-        """Method to run the animal detection process on a specific image"""
+    def _is_classification_enabled(self, cur_media):
+        """Method to check if classification has to run on a media, as it can be skipped by
+        media queue load shedding"""
 
+        return self.enable_classification and not cur_media.get("skip_classification", False)
+
+    def _detect(self, cur_media, classify=False, persist=True):
+        """Method to run the animal detection process on a specific image.
+        When persist is False the detection event is not stored into db,
+        see _persist_detection_event."""
+
+        enable_classification = self._is_classification_enabled(cur_media)
         if OperationMode.is_image(cur_media["media_path"]):
-            results, detected_img_path = self.ai_model.process_image(cur_media["media_path"], True)
+            results, detected_img_path = self.ai_model.process_image(
+                cur_media["media_path"], True, cur_media.get("frame")
+            )
 
             if results and detected_img_path:
                 detection_event = DetectionEvent(
@@ -138,16 +167,15 @@ class OperationMode(QObject):
                     cur_media["media_path"],
                     detected_img_path,
                     results,
-                    self.enable_classification,
+                    enable_classification,
                 )
-                self.last_detection = detected_img_path
                 # Insert detection event into db, if enabled
-                if db := DataBase.get_enabled_db():
+                if persist and (db := DataBase.get_enabled_db()):
                     db.insert_into_db(detection_event)
 
-                if self.enable_classification:
+                if enable_classification:
                     # Classify animal
-                    self._classify(detection_event)
+                    self._classify(detection_event, persist)
 
                 return detection_event
             else:
@@ -155,11 +183,14 @@ class OperationMode(QObject):
         else:
             # Video processing
             tracked_animals, video_path = self.ai_model.process_video_offline(
-                cur_media["media_path"], self.enable_classification, save_processed_video=True
+                cur_media["media_path"],
+                enable_classification,
+                save_processed_video=True,
+                video_fps=self.ai_model.video_fps * cur_media.get("video_fps_scale", 1),
             )
             if video_path:
-                detection_path = video_path if not self.enable_classification else ""
-                classification_path = video_path if self.enable_classification else ""
+                detection_path = video_path if not enable_classification else ""
+                classification_path = video_path if enable_classification else ""
                 classified_animals = (
                     self.ai_model.classification_from_video_tracking(tracked_animals)
                     if tracked_animals
@@ -183,53 +214,157 @@ class OperationMode(QObject):
                         "img_id": "",
                         "labels": [],
                     },  # TODO: evaluate if store actual detection results in video processing
-                    self.enable_classification,
+                    enable_classification,
                     classification_path,
                     classified_animals,
                 )
-                self.last_detection = video_path
-                self._format_classified_animals_string(classified_animals)
-
                 # Insert detection event into db, if enabled
-                if db := DataBase.get_enabled_db():
+                if persist and (db := DataBase.get_enabled_db()):
                     db.insert_into_db(detection_event)
 
                 return detection_event
             else:
                 return None
 
-    def _format_classified_animals_string(self, classified_animals):
-        """Prepare a list of classified animals to print in UI"""
+    @staticmethod
+    def format_classified_animals(classified_animals):
+        """Format a list of classified animals as a string to print in UI and notifications"""
 
         full_str = ", ".join(
             animal["classification"][0]
             for animal in classified_animals
             if animal.get("classification")
         )
-        self.last_classified_animals_str = (
-            full_str[:100] + "..." if len(full_str) > 100 else full_str
+        return full_str[:100] + "..." if len(full_str) > 100 else full_str
+
+    def _detect_batch(self, media_batch, persist=True):
+        """Method to run the animal detection (and classification, if enabled) process on a
+        batch of media. Images are processed together with batched inference, videos one at a
+        time. Returns the detection event of each media (None if no animal was detected)."""
+
+        if len(media_batch) == 1:
+            return [self._detect(media_batch[0], self.enable_classification, persist)]
+
+        detection_events = [None] * len(media_batch)
+        images_idx = [
+            idx
+            for idx, cur_media in enumerate(media_batch)
+            if OperationMode.is_image(cur_media["media_path"])
+        ]
+        if images_idx:
+            images_events = self._detect_images([media_batch[idx] for idx in images_idx], persist)
+            for idx, detection_event in zip(images_idx, images_events):
+                detection_events[idx] = detection_event
+        for idx, cur_media in enumerate(media_batch):
+            if idx not in images_idx:
+                detection_events[idx] = self._detect(cur_media, self.enable_classification, persist)
+        return detection_events
+
+    def _detect_images(self, images, persist=True):
+        """Method to run the animal detection process on several images at once"""
+
+        detection_events = []
+        processed_images = self.ai_model.process_images(
+            [cur_media["media_path"] for cur_media in images],
+            True,
+            [cur_media.get("frame") for cur_media in images],
+        )
+        for cur_media, (results, detected_img_path) in zip(images, processed_images):
+            if not (results and detected_img_path):
+                detection_events.append(None)
+                continue
+
+            detection_event = DetectionEvent(
+                cur_media["camera_id"],
+                get_precise_timestamp(),
+                cur_media["media_path"],
+                detected_img_path,
+                results,
+                self._is_classification_enabled(cur_media),
+            )
+            # Insert detection event into db, if enabled
+            if persist and (db := DataBase.get_enabled_db()):
+                db.insert_into_db(detection_event)
+            detection_events.append(detection_event)
+
+        # Classify animals of all the images at once
+        self._classify_batch(
+            [event for event in detection_events if event and event.classification], persist
         )
 
-    def _classify(self, detection_event: DetectionEvent):
+        return detection_events
+
+    def _update_last_detection(self, detection_event):
+        """Set the detection event shown in UI, updating its media and classified animals
+        together"""
+
+        with self.last_detection_lock:
+            self.last_detection = (
+                detection_event.classification_img_path or detection_event.detection_img_path
+            )
+            self.last_classified_animals_str = self.format_classified_animals(
+                detection_event.classified_animals or []
+            )
+
+    def get_last_detection(self):
+        """Return the media and the classified animals of the last detection event"""
+
+        with self.last_detection_lock:
+            return self.last_detection, self.last_classified_animals_str
+
+    def _persist_detection_event(self, detection_event: DetectionEvent, actuation_events=()):
+        """Method to store into db, if enabled, a detection event processed by
+        _detect with persist=False, together with its image classification results and the
+        actuation events triggered by actuate with persist=False, in a single transaction"""
+
+        if db := DataBase.get_enabled_db():
+            store_classified_animals = bool(
+                detection_event.classification_img_path
+            ) and self.is_image(detection_event.classification_img_path)
+            if self.db_writer:
+                self.db_writer.put(
+                    db.detection_event_record(
+                        detection_event, store_classified_animals, actuation_events or ()
+                    )
+                )
+            else:
+                db.persist_detection_event(
+                    detection_event, store_classified_animals, actuation_events or ()
+                )
+
+    def _classify(self, detection_event: DetectionEvent, persist=True):
         """Method to run the animal classification process
         on a specific image starting from the detection output"""
 
+        self._classify_batch([detection_event], persist)
+
+    def _classify_batch(self, detection_events, persist=True):
+        """Method to run the animal classification process on several images at once
+        starting from their detection output"""
+
         # Classify if detection has identified animals
-        if len(detection_event.detected_animals["detections"].xyxy):
-            logger.info("Running classification on detection result(s)...")
-            (
-                classified_img_path,
-                classified_animals,
-            ) = self.ai_model.classify(
-                detection_event.original_image, detection_event.detected_animals
-            )
+        if not (
+            detection_events := [
+                detection_event
+                for detection_event in detection_events
+                if len(detection_event.detected_animals["detections"].xyxy)
+            ]
+        ):
+            return
+
+        logger.info("Running classification on detection result(s)...")
+        classifications = self.ai_model.classify_images(
+            [detection_event.original_image for detection_event in detection_events],
+            [detection_event.detected_animals for detection_event in detection_events],
+        )
+        for detection_event, (classified_img_path, classified_animals) in zip(
+            detection_events, classifications
+        ):
             if classified_img_path and classified_animals:
-                self.last_detection = classified_img_path
-                self._format_classified_animals_string(classified_animals)
                 detection_event.classified_animals = classified_animals
                 detection_event.classification_img_path = classified_img_path
                 # Update detection event into db, if enabled
-                if db := DataBase.get_enabled_db():
+                if persist and (db := DataBase.get_enabled_db()):
                     db.update_detection_event(detection_event)
             else:
                 logger.debug("No classified animals or classification results below threshold.")
@@ -238,7 +373,8 @@ class OperationMode(QObject):
         """Method to show Ai inference results in WADAS UI"""
 
         if detection_event:
-            if self.enable_classification:
+            self._update_last_detection(detection_event)
+            if detection_event.classification:
                 # Classification is enabled
                 if detection_event.classification_img_path:
                     # Trigger image update in WADAS mainwindow with classification result
@@ -289,6 +425,7 @@ class OperationMode(QObject):
 
         self.init_model()
         self.check_for_termination_requests()
+        self.start_db_writer()
         self._initialize_cameras()
         self.start_actuator_server()
 
@@ -297,9 +434,12 @@ class OperationMode(QObject):
 
         Notifier.send_notifications(detection_event, message)
 
-    def actuate(self, detection_event: DetectionEvent):
-        """Method to trigger actuators associated to the camera, when enabled"""
+    def actuate(self, detection_event: DetectionEvent, persist=True):
+        """Method to trigger actuators associated to the camera, when enabled.
+        Returns the actuation events, which are not stored into db when persist is False,
+        see _persist_detection_event."""
 
+        actuation_events = []
         cur_camera = None
         for cur_camera in cameras:
             if cur_camera.id == detection_event.camera_id:
@@ -311,13 +451,17 @@ class OperationMode(QObject):
                         actuator.id, get_precise_timestamp(), detection_event
                     )
                     actuator.actuate(actuation_event)
+                    actuation_events.append(actuation_event)
                     # Insert actuation event into db, if enabled
-                    if db := DataBase.get_enabled_db():
+                    if persist and (db := DataBase.get_enabled_db()):
                         db.insert_into_db(actuation_event)
+        return actuation_events
 
     def execution_completed(self):
         """Method to perform end of execution steps."""
 
+        self.stop_db_writer()
+        logger.info("Media queue statistics: %s", media_queue.get_stats())
         self.run_finished.emit()
         self.stop_ftp_server()
         logger.info("Done with processing.")
@@ -330,12 +474,41 @@ class OperationMode(QObject):
             FTPsServer.ftps_server.server.close()
             self.ftp_thread.join()
 
+    def start_db_writer(self):
+        """Method to upgrade the db schema, if needed, and start the background db writer,
+        if enabled"""
+
+        if db := DataBase.get_enabled_db():
+            db.upgrade_db()
+        if self.db_write_behind and DataBase.get_enabled_db() and not self.db_writer:
+            self.db_writer = DBWriter()
+            self.db_writer.start()
+
+    def stop_db_writer(self):
+        """Method to stop the background db writer, once pending detection events are written"""
+
+        if self.db_writer:
+            self.db_writer.stop()
+            logger.info("DB writer statistics: %s", self.db_writer.get_stats())
+            logger.info("DB id cache statistics: %s", DataBase.get_id_cache_stats())
+            self.db_writer = None
+
     def _scheduled_update_actuators_trigger(self):
-        """Method to trigger the actuator(s) view update every 5 secs"""
+        """Method to trigger the actuator(s) view update on actuators activity, and periodically
+        to show actuators that timed out"""
 
+        timeout = (
+            FastAPIActuatorServer.actuator_server.actuator_timeout_threshold / 2
+            if FastAPIActuatorServer.actuator_server
+            else 5
+        )
         while not self.flag_stop_update_actuators_thread:
-            time.sleep(5)
-            self.update_actuator_status.emit()
+            if self.actuators_activity.wait(timeout):
+                # Coalesce the activity of several actuators into a single view update
+                time.sleep(self.actuators_view_min_interval)
+            self.actuators_activity.clear()
+            if not self.flag_stop_update_actuators_thread:
+                self.update_actuator_status.emit()
 
     def start_actuator_server(self):
         """Method to start the HTTPS Actuator Server"""
@@ -351,6 +524,8 @@ class OperationMode(QObject):
     def start_update_actuators_thread(self):
         """Start the thread responsible for keeping the actuator(s) view updated"""
 
+        self.flag_stop_update_actuators_thread = False
+        Actuator.activity_listeners.add(self.actuators_activity.set)
         update_thread = threading.Thread(target=self._scheduled_update_actuators_trigger)
         if update_thread:
             update_thread.start()
@@ -363,6 +538,8 @@ class OperationMode(QObject):
         """Method to stop the thread responsible for keeping the actuator(s) view updated"""
 
         self.flag_stop_update_actuators_thread = True
+        Actuator.activity_listeners.discard(self.actuators_activity.set)
+        self.actuators_activity.set()
         if self.actuators_view_thread:
             self.actuators_view_thread.join()
 
@@ -141,12 +141,16 @@ class TestModelMode(OperationMode):
             logger.info("Running classification on detection result(s)...")
 
             self._classify(detection_event)
+            self._update_last_detection(detection_event)
             if detection_event.classification_img_path:
                 # Trigger image update in WADAS mainwindow
                 self.update_image.emit(detection_event.classification_img_path)
                 self.update_info.emit()
+                classified_animals_str = self.format_classified_animals(
+                    detection_event.classified_animals
+                )
                 message = (
-                    f"WADAS has classified '{self.last_classified_animals_str}' "
+                    f"WADAS has classified '{classified_animals_str}' "
                     f"animal from camera {detection_event.classification_img_path}!"
                 )
             else:
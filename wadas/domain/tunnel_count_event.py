@@ -0,0 +1,39 @@
+# This file is part of WADAS project.
+#
+# WADAS is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# WADAS is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with WADAS. If not, see <https://www.gnu.org/licenses/>.
+#
+# Author(s): Stefano Dell'Osa, Alessandro Palla, Cesare Di Mauro, Antonio Farina
+# Date: 2026-10-18
+# Description: Tunnel count event module.
+
+import logging
+from enum import Enum
+
+logger = logging.getLogger(__name__)
+
+
+class TunnelCountEvent:
+    """Class to embed the number of animals crossing a tunnel entrance into a dedicated object."""
+
+    class Directions(Enum):
+        ENTERING = "entering"
+        EXITING = "exiting"
+
+    def __init__(self, tunnel_id, camera_id, time_stamp, animal, direction, count):
+        self.tunnel_id = tunnel_id
+        self.camera_id = camera_id
+        self.time_stamp = time_stamp
+        self.animal = animal
+        self.direction = direction
+        self.count = count
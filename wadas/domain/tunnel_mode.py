@@ -18,22 +18,191 @@
 # Description: Module containing Tunnel mode methods.
 
 import logging
+from pathlib import Path
+from queue import Empty
 
+import cv2
+
+from wadas.ai.object_counter import ObjectCounter, TrackingRegion
+from wadas.domain.ai_model import AiModel
+from wadas.domain.camera import media_queue
+from wadas.domain.database import DataBase
 from wadas.domain.operation_mode import OperationMode
+from wadas.domain.tunnel import Tunnel
+from wadas.domain.tunnel_count_event import TunnelCountEvent
+from wadas.domain.utils import get_precise_timestamp
 
 logger = logging.getLogger(__name__)
 
 
 class TunnelMode(OperationMode):
+    """Tunnel Mode class: counts the animals entering and exiting the enabled tunnels from the
+    media of their entrance cameras."""
+
+    # Detection model counting the animals, relative to models folder
+    model_path = Path("detection", "MDV6b-yolov9c_openvino_model")
+    # Only one video frame every frame_stride is counted
+    frame_stride = 1
+
     def __init__(self):
-        super().init()
+        super(TunnelMode, self).__init__()
         self.type = OperationMode.OperationModeTypes.TunnelMode
+        self.process_queue = True
+        self.object_counter = None
+        # Tunnel, entrance direction and counting state of each entrance camera
+        self.entrances = {}
+        # Counts already stored into db, per camera
+        self.stored_counts = {}
+
+    def _initialize_counter(self):
+        """Method to initialize the object counter shared by all the tunnel cameras"""
+
+        self.object_counter = ObjectCounter(
+            model=str(self.model_path),
+            region=None,
+            classes=[0],
+            device=AiModel.detection_device,
+            performance_profile=AiModel.detection_performance_profile,
+            prefetch_depth=AiModel.video_prefetch_depth,
+            frame_stride=self.frame_stride,
+            show=False,
+        )
+
+        for tunnel in Tunnel.tunnels:
+            if not tunnel.enabled:
+                continue
+            for camera_id, direction in (
+                (tunnel.camera_entrance_1, tunnel.entrance_1_direction),
+                (tunnel.camera_entrance_2, tunnel.entrance_2_direction),
+            ):
+                self.entrances[camera_id] = (
+                    tunnel,
+                    direction,
+                    self.object_counter.new_camera_state(direction),
+                )
+                self.stored_counts[camera_id] = {}
+        logger.info("Counting animals from %d tunnel camera(s)...", len(self.entrances))
+
+    @staticmethod
+    def entering_count_key(direction: TrackingRegion):
+        """Method returning the object counter key ("IN" or "OUT") of the animals entering a
+        tunnel whose entrance is on the given side of the frame. Object counter counts as "IN"
+        the objects moving down or right."""
+
+        return "IN" if direction in (TrackingRegion.DOWN, TrackingRegion.RIGHT) else "OUT"
+
+    def _collect_media(self, streams, timeout):
+        """Method to start counting the next media of the tunnel cameras not counting any,
+        waiting up to timeout seconds for the first one. Media of busy cameras are left in
+        media queue, so that its bounds and load shedding apply to them."""
+
+        try:
+            cur_media = media_queue.get(timeout=timeout, skip_cameras=streams)
+            while True:
+                if cur_media["camera_id"] in self.entrances and (
+                    self.is_video(cur_media["media_path"]) or self.is_image(cur_media["media_path"])
+                ):
+                    streams[cur_media["camera_id"]] = (
+                        cur_media,
+                        self._get_media_frames(cur_media),
+                    )
+                else:
+                    logger.debug(
+                        "Skipping %s as camera %s is not a tunnel entrance.",
+                        cur_media["media_path"],
+                        cur_media["camera_id"],
+                    )
+                    media_queue.discard_media(cur_media)
+                cur_media = media_queue.get_nowait(skip_cameras=streams)
+        except Empty:
+            pass
+
+    def _get_media_frames(self, cur_media):
+        """Generator of the frames of a media to count"""
+
+        media_path = cur_media["media_path"]
+        if self.is_video(media_path):
+            yield from self.object_counter.get_video_frames(media_path)
+        elif (media_frame := cur_media.get("frame")) is not None:
+            yield media_frame.image
+        elif (frame := cv2.imread(str(media_path))) is not None:
+            yield frame
+
+    def _count_frames(self, frames):
+        """Method to count the animals in the next frame of several cameras at once"""
+
+        camera_ids = list(frames)
+        self.object_counter.count_batch(
+            [frames[camera_id] for camera_id in camera_ids],
+            [self.entrances[camera_id][2] for camera_id in camera_ids],
+        )
+
+    def _store_counts(self, camera_id):
+        """Method to store into db, if enabled, the animals counted by a camera since last call"""
+
+        tunnel, direction, camera_state = self.entrances[camera_id]
+        entering_key = self.entering_count_key(direction)
+        time_stamp = get_precise_timestamp()
+        stored_counts = self.stored_counts[camera_id]
+        for animal, counts in camera_state["classwise_count"].items():
+            for key, count in counts.items():
+                if not (delta := count - stored_counts.get((animal, key), 0)):
+                    continue
+                stored_counts[(animal, key)] = count
+                tunnel_count_event = TunnelCountEvent(
+                    tunnel.id,
+                    camera_id,
+                    time_stamp,
+                    animal,
+                    (
+                        TunnelCountEvent.Directions.ENTERING
+                        if key == entering_key
+                        else TunnelCountEvent.Directions.EXITING
+                    ),
+                    delta,
+                )
+                logger.info(
+                    "%d %s %s tunnel %s from camera %s.",
+                    delta,
+                    animal,
+                    tunnel_count_event.direction.value,
+                    tunnel.id,
+                    camera_id,
+                )
+                if db := DataBase.get_enabled_db():
+                    db.insert_into_db(tunnel_count_event)
 
     def run(self):
         """Method to run Tunnel Mode."""
         logger.info("Starting Tunnel Mode...")
 
-        # TODO: implement logic
-        logger.info("Tunnel Mode not yet implemented.")
+        self._initialize_counter()
+        self.check_for_termination_requests()
+        self.start_db_writer()
+        self._initialize_cameras()
+        self.start_actuator_server()
+
+        streams = {}  # Media being counted and its frames, per camera
+        while self.process_queue:
+            self.check_for_termination_requests()
+            # Block for new media only when there are no frames to count
+            self._collect_media(streams, 0 if streams else 1)
+
+            # Count the next frame of every camera with a single inference
+            frames = {}
+            for camera_id, (cur_media, media_frames) in list(streams.items()):
+                if (frame := next(media_frames, None)) is not None:
+                    frames[camera_id] = frame
+                else:
+                    del streams[camera_id]
+                    self._store_counts(camera_id)
+                    media_queue.discard_media(cur_media)
+                    self.update_info.emit()
+            if frames:
+                self._count_frames(frames)
+
+        # Store the animals counted from media interrupted by stop request
+        for camera_id, (_, media_frames) in streams.items():
+            media_frames.close()
+            self._store_counts(camera_id)
         self.execution_completed()
-        return
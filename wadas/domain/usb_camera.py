@@ -27,6 +27,9 @@ import cv2
 
 from wadas.domain.actuator import Actuator
 from wadas.domain.camera import Camera, media_queue
+from wadas.domain.media_frame import MediaFrame
+from wadas.domain.motion_analyzer import MotionAnalyzer
+from wadas.domain.motion_gate import MotionGate
 from wadas.domain.utils import get_timestamp
 
 logger = logging.getLogger(__name__)
@@ -47,6 +50,8 @@ class USBCamera(Camera):
         vid="",
         path="",
         actuators=None,
+        motion_roi=None,
+        motion_cpu_budget=0,
     ):
         if actuators is None:
             actuators = []
@@ -61,6 +66,11 @@ class USBCamera(Camera):
         self.vid = vid
         self.path = path
         self.actuators = actuators
+        # Regions of interest of motion detection, see MotionGate
+        self.motion_roi = motion_roi or []
+        # Fraction of a CPU core motion analysis can use, 0 for no limit
+        self.motion_cpu_budget = motion_cpu_budget
+        self.motion_gate = None
 
     def detect_motion_from_video(self):
         """Method to run motion detection on camera video stream.
@@ -82,9 +92,6 @@ class USBCamera(Camera):
             logger.error("Error opening video stream.")
             return
 
-        # Create Background Subtractor MOG2 object
-        background_sub = cv2.createBackgroundSubtractorMOG2()
-
         # Camera info for debug mode
         length = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
@@ -100,45 +107,40 @@ class USBCamera(Camera):
 
         last_detection_time = 0
         ms_sample_rate = Camera.detection_params["ms_sample_rate"]
-        threshold = Camera.detection_params["threshold"]
-        min_contour_area = Camera.detection_params["min_contour_area"]
         detection_per_second = Camera.detection_params["detection_per_second"]
+        max_in_memory_frames = Camera.detection_params.get("max_in_memory_frames", 0)
+        self.motion_gate = MotionGate(
+            self.motion_roi,
+            Camera.detection_params.get("persistence_frames"),
+            Camera.detection_params.get("max_hash_distance"),
+        )
+        # Motion is analyzed on a downscaled copy of the frames
+        motion_analyzer = MotionAnalyzer(
+            Camera.detection_params["threshold"],
+            Camera.detection_params["min_contour_area"],
+            Camera.detection_params.get("analysis_width", 640),
+            Camera.detection_params.get("analysis_grayscale", True),
+            self.motion_cpu_budget,
+            self.motion_gate.apply_roi,
+        )
 
         # Read until video is completed
         while cap.isOpened() and not self.stop_thread:
+            # Frames exceeding the CPU budget of the camera are grabbed without being decoded
+            if not motion_analyzer.is_due():
+                if not cap.grab():
+                    break
+                continue
+
             # Capture frame-by-frame
             ret, frame = cap.read()
             cap.set(cv2.CAP_PROP_POS_MSEC, ms_sample_rate)
 
             if ret:
-                # Apply background subtraction
-                foreground_mask = background_sub.apply(frame)
-
-                # apply global threshold to remove shadows
-                retval, mask_thresh = cv2.threshold(
-                    foreground_mask,
-                    threshold,
-                    255,
-                    cv2.THRESH_BINARY,
-                )
-
-                """TODO: check if following interpolation helps refine the motion detection
-                # set the kernal
-                kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
-                # Apply erosion
-                # mask_eroded = cv2.morphologyEx(mask_thresh, cv2.MORPH_OPEN, kernel)"""
-
-                # Find contours
-                contours, hierarchy = cv2.findContours(
-                    mask_thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
-                )
-
-                # filtering contours using list comprehension
-                approved_contours = [
-                    cnt for cnt in contours if cv2.contourArea(cnt) > min_contour_area
-                ]
-                frame_out = frame.copy()
-                if len(approved_contours) > 0:
+                analyzed_frame, contours = motion_analyzer.analyze(frame)
+
+                # Only persistent motion that changed the scene goes to the detection model
+                if self.motion_gate.check(analyzed_frame, contours):
                     # Limit the amount of frame processed per second
                     current_detection_time = time.time()
                     if (current_detection_time - last_detection_time) < detection_per_second:
@@ -147,24 +149,34 @@ class USBCamera(Camera):
                     logger.debug("Motion detected from camera %s!", self.id)
                     last_detection_time = current_detection_time
 
-                    # Adding detected image into the AI queue for animal detection
+                    # Adding full resolution image into the AI queue for animal detection
                     img_path = os.path.join(
                         "wadas_motion_detection",
                         f"camera_{self.id}_{get_timestamp()}.jpg",
                     )
-                    cv2.imwrite(img_path, frame_out)
-                    media_queue.put(
-                        {
-                            "media_path": img_path,
-                            "media_id": f"camera_{self.id}_{get_timestamp()}.jpg",
-                            "camera_id": self.id,
-                        }
-                    )
+                    cur_media = {
+                        "media_path": img_path,
+                        "media_id": f"camera_{self.id}_{get_timestamp()}.jpg",
+                        "camera_id": self.id,
+                    }
+                    # Hand off the frame in memory if possible, the image is written on detection
+                    if media_frame := MediaFrame.create(frame, max_in_memory_frames):
+                        cur_media["frame"] = media_frame
+                    else:
+                        cv2.imwrite(img_path, frame)
+                    self.motion_gate.set_reference(analyzed_frame)
+                    media_queue.put(cur_media)
             else:
                 break
 
         # When everything done, release the video capture and writer object
         cap.release()
+        logger.info(
+            "Motion statistics of camera %s: analysis %s, gate %s",
+            self.id,
+            motion_analyzer.get_stats(),
+            self.motion_gate.get_stats(),
+        )
 
     def run(self):
         """Method to create new thread for Camera class."""
@@ -200,6 +212,8 @@ class USBCamera(Camera):
             "vid": self.vid,
             "path": self.path,
             "actuators": actuators,
+            "motion_cpu_budget": self.motion_cpu_budget,
+            "motion_roi": self.motion_roi,
         }
 
     @staticmethod
@@ -219,4 +233,6 @@ class USBCamera(Camera):
             data["vid"],
             data["path"],
             actuators,
+            data.get("motion_roi", []),
+            data.get("motion_cpu_budget", 0),
         )
@@ -23,8 +23,10 @@ import logging
 import os
 import re
 import socket
+import time
 import uuid
 from logging.handlers import RotatingFileHandler
+from queue import Empty
 
 
 def get_timestamp():
@@ -59,6 +61,26 @@ def convert_to_timestamp_string(dt: datetime) -> str:
     return dt.strftime("%Y%m%d-%H%M%S")
 
 
+def get_batch_from_queue(queue, max_batch_size, max_wait, timeout=None):
+    """Get a micro-batch of items from a queue.
+    Waits up to timeout seconds for the first item, then keeps collecting items until the batch
+    holds max_batch_size items or max_wait seconds have passed since the first one.
+    Returns an empty list if no item arrived within timeout.
+    """
+    try:
+        batch = [queue.get(timeout=timeout)]
+    except Empty:
+        return []
+
+    deadline = time.monotonic() + max_wait
+    while len(batch) < max_batch_size:
+        try:
+            batch.append(queue.get(timeout=max(deadline - time.monotonic(), 0)))
+        except Empty:
+            break
+    return batch
+
+
 def initialize_asyncio_logger(handler=None, level=logging.DEBUG):
     if not handler:
         handler = RotatingFileHandler(
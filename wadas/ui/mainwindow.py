@@ -553,11 +553,12 @@ class MainWindow(QMainWindow):
             self.ui.label_classification_enablement.setText("")
 
         if OperationMode.cur_operation_mode:
-            path = Path(OperationMode.cur_operation_mode.last_detection)
-            self.ui.label_last_detection.setText(os.path.join(path.parent.name, path.name))
-            self.ui.label_classified_animal.setText(
-                str(OperationMode.cur_operation_mode.last_classified_animals_str)
+            last_detection, classified_animals_str = (
+                OperationMode.cur_operation_mode.get_last_detection()
             )
+            path = Path(last_detection)
+            self.ui.label_last_detection.setText(os.path.join(path.parent.name, path.name))
+            self.ui.label_classified_animal.setText(str(classified_animals_str))
 
         if db := DataBase.get_enabled_db():
             self.ui.label_database.setText(db.type.value)